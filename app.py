@@ -3,7 +3,7 @@ import streamlit as st
 from datetime import datetime
 
 from config import DATA_FILE, ETF_DETAILS_FILE, INTERMEDIARI
-from data_manager import load_etf_data, load_etf_details, load_etf_name
+from data_manager import load_etf_data, load_etf_details, load_etf_name, load_session_data, apply_session_data, SESSION_QUERIES
 
 from views.dashboard import render_dashboard
 from views.gestione_eft import render_gestione_etf
@@ -27,41 +27,19 @@ if 'etf_data' not in st.session_state:
 if 'etf_details' not in st.session_state:
     st.session_state.etf_details = load_etf_details()  
      
-if 'etf_transactions' not in st.session_state:
-    from database import get_etf_transaction_updated
-    st.session_state.etf_transactions = get_etf_transaction_updated()
-
-if 'bottom_3_etf' not in st.session_state:
-    from database import get_bottom_3_etf
-    st.session_state.bottom_3_etf = get_bottom_3_etf()
-
-if 'top_3_etf' not in st.session_state:
-    from database import get_top_3_etf
-    st.session_state.top_3_etf = get_top_3_etf()
-
-if 'portfolio_kpi_etf' not in st.session_state:
-    from database import get_portfolio_kpi_etf
-    st.session_state.kpi_etf = get_portfolio_kpi_etf()
-
-if 'distribuzione_etf' not in st.session_state:
-    from database import get_distribuzione_etf
-    st.session_state.distribuzione_etf = get_distribuzione_etf()
-
-if 'distribuzione_settore' not in st.session_state:
-    from database import get_distribuzione_settore
-    st.session_state.distribuzione_settore = get_distribuzione_settore()
-
-if 'distribuzione_valuta_mercato' not in st.session_state:
-    from database import get_distribuzione_valuta_mercato
-    st.session_state.distribuzione_valuta_mercato = get_distribuzione_valuta_mercato()
-
-if 'distribuzione_area_geografica' not in st.session_state:
-    from database import get_distribuzione_area_geografica
-    st.session_state.distribuzione_area_geografica = get_distribuzione_area_geografica()
-
-if 'prezzo_medio_acquisto' not in st.session_state:
-    from database import get_prezzo_medio_acquisto
-    st.session_state.prezzo_medio_acquisto = get_prezzo_medio_acquisto()
+# Query della dashboard caricate in parallelo: quelle mancanti e quelle fallite
+# al caricamento precedente, che vengono ritentate a ogni rerun
+falliti_precedenti = {
+    key for key, info in st.session_state.get("bootstrap_report", {}).items() if info["error"]
+}
+chiavi_mancanti = [key for key in SESSION_QUERIES if key not in st.session_state or key in falliti_precedenti]
+if chiavi_mancanti:
+    dati_sessione, report_sessione = load_session_data(chiavi_mancanti)
+    apply_session_data(st.session_state, dati_sessione, report_sessione)
+    st.session_state.bootstrap_report = report_sessione
+    falliti = [key for key, info in report_sessione.items() if info["error"]]
+    if falliti:
+        st.warning(f"⚠️ Dati non disponibili: {', '.join(falliti)}")
 
 # Navigazione principale con sidebar menu
 def main():
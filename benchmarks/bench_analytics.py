@@ -0,0 +1,218 @@
+"""
+Benchmark delle analisi del portafoglio su dati sintetici, senza rete:
+Supabase e Yahoo Finance sono sostituiti da benchmarks/stand_ins.py.
+Per ogni dimensione misura tempo (mediana) e picco di memoria (tracemalloc) di
+calculate_metrics, calculate_CAGR, dei rapporti di metrics.py, della lettura
+delle transazioni, della valorizzazione del portafoglio e della pipeline
+DataFrame/Styler della dashboard.
+I risultati vengono confrontati con la baseline versionata in
+benchmarks/baseline.json: un caso più lento (o più esoso di memoria) oltre la
+soglia è una regressione e il processo termina con codice 1. La baseline si
+aggiorna solo esplicitamente con --update-baseline, nello stesso commit della
+modifica che cambia le prestazioni.
+
+Uso:
+    python benchmarks/bench_analytics.py [--sizes 10 1000 100000] [--tickers 50] [--runs 3]
+    python benchmarks/bench_analytics.py --sizes 10 1000 100000 1000000 --update-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from stand_ins import offline  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+# Sotto questa differenza assoluta una variazione di tempo è rumore
+NOISE_SECONDS = 0.005
+
+
+def timed(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def build_cases(rows, tickers):
+    """
+    Casi misurati per una dimensione: nome -> funzione senza argomenti.
+    Le tabelle hanno circa `rows` righe; lo storico prezzi ha rows/tickers
+    giorni (almeno 60) per ciascun ticker.
+    """
+    import streamlit as st
+    from metrics import (calculate_metrics, PositionMetrics, sharpe_ratio, sortino_ratio, max_drawdown,
+                         risk_metrics, correlation_matrix, drawdown_episodes)
+    from finance_info import calculate_CAGR, get_portfolio_valuation
+    import finance_info
+    import database
+    from views.dashboard import DashboardFrames
+
+    names = synthetic.tickers(tickers)
+    days = max(rows // tickers, 60)
+    history = synthetic.make_price_history(names, days=days)
+    transactions = synthetic.make_transactions(rows, names, days=days)
+    session = synthetic.make_session_data(rows, names)
+
+    records = session["etf_transactions"]
+    positions = pd.DataFrame(records)
+    prices = history.pivot(index="date", columns="ticker", values="close")
+    prices.index = pd.to_datetime(prices.index)
+    returns = prices.pct_change().iloc[1:]
+    portfolio = prices.mean(axis=1)
+    portfolio_returns = portfolio.pct_change().dropna()
+    # Come in get_drawdowns: ETF quotati in date diverse e valore del portafoglio
+    # che parte più tardi, uniti in outer join (NaN iniziali di lunghezza diversa)
+    listed = prices.copy()
+    for position in range(listed.shape[1]):
+        listed.iloc[:position * len(listed) // (2 * listed.shape[1]), position] = np.nan
+    drawdown_frame = listed.join(portfolio.iloc[len(portfolio) // 3:].rename("Portafoglio"), how="outer")
+
+    def cagr():
+        st.session_state.etf_transactions = records
+        calculate_CAGR()
+
+    def ratios():
+        for column in returns:
+            sharpe_ratio(returns[column])
+            sortino_ratio(returns[column])
+            max_drawdown(prices[column])
+        sharpe_ratio(portfolio_returns)
+        sortino_ratio(portfolio_returns)
+        max_drawdown(portfolio)
+
+    def dashboard():
+        frames = DashboardFrames(session)
+        frames.prezzo_medio_acquisto_styled._compute()
+        frames.posizioni_styled._compute()
+
+    tables = {"transaction": transactions, "etf_price_history": history}
+
+    def read_transactions():
+        database.query_cache.clear()
+        database.get_transactions_frame()
+
+    def valuation():
+        # Archivio locale già allineato: misura lettura transazioni e valorizzazione completa
+        database.query_cache.clear()
+        finance_info._portfolio_valuation = None
+        get_portfolio_valuation()
+
+    return tables, history, {
+        "calculate_metrics": lambda: calculate_metrics(records),
+        "PositionMetrics.from_frame": lambda: PositionMetrics.from_frame(positions),
+        "calculate_CAGR": cagr,
+        "sharpe/sortino/max_drawdown": ratios,
+        "risk_metrics": lambda: risk_metrics(returns, window=min(252, days // 2)),
+        "correlation_matrix": lambda: correlation_matrix(prices),
+        "drawdown_episodes": lambda: drawdown_episodes(drawdown_frame),
+        "dashboard pipeline": dashboard,
+        "get_transactions_frame": read_transactions,
+        "get_portfolio_valuation": valuation,
+    }
+
+
+def run(sizes, tickers, runs):
+    results = {}
+    for rows in sizes:
+        tables, history, cases = build_cases(rows, tickers)
+        with offline(tables, history):
+            # Primo allineamento dell'archivio prezzi temporaneo fuori dalle misure
+            cases["get_portfolio_valuation"]()
+            for name, function in cases.items():
+                seconds = timed(function, runs)
+                peak = peak_memory(function)
+                results[f"{name}@{rows}"] = {"seconds": seconds, "peak_mb": peak / 2 ** 20}
+                print(f"{name:<30} {rows:>9} {seconds:>10.4f}s {peak / 2 ** 20:>9.1f}MB", file=sys.__stdout__)
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """Casi più lenti o con picco di memoria oltre la soglia rispetto alla baseline."""
+    found = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        slower = current["seconds"] - previous["seconds"]
+        if slower > NOISE_SECONDS and current["seconds"] > previous["seconds"] * (1 + threshold):
+            found.append(f"{key}: tempo {previous['seconds']:.4f}s -> {current['seconds']:.4f}s")
+        if current["peak_mb"] > max(previous["peak_mb"] * (1 + threshold), previous["peak_mb"] + 1):
+            found.append(f"{key}: memoria {previous['peak_mb']:.1f}MB -> {current['peak_mb']:.1f}MB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000])
+    parser.add_argument("--tickers", type=int, default=50, help="Ticker sintetici (default: 50)")
+    parser.add_argument("--runs", type=int, default=3, help="Ripetizioni per misura (default: 3)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Peggioramento relativo tollerato (default: 0.25)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Salva le misure come nuova baseline")
+    args = parser.parse_args()
+
+    # Streamlit fuori da `streamlit run` avvisa a ogni accesso a session_state
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    print(f"{'caso':<30} {'righe':>9} {'tempo':>11} {'picco':>11}")
+    # I messaggi di finance_info non devono falsare le misure né l'output
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run(args.sizes, args.tickers, args.runs)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline salvata in {args.baseline}")
+        return
+    if not baseline:
+        print(f"\n⚠️ Nessuna baseline in {args.baseline}: eseguire con --update-baseline")
+        sys.exit(1)
+
+    found = regressions(results, baseline, args.threshold)
+    if found:
+        print(f"\n⚠️ Regressioni oltre il {args.threshold:.0%}:")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\n✅ Nessuna regressione rispetto a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
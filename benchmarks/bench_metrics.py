@@ -0,0 +1,64 @@
+"""
+Benchmark di calculate_metrics: confronta il percorso a lista di dizionari
+con il percorso a colonne (PositionMetrics) e con l'aggiornamento dei soli
+prezzi, su portafogli sintetici fino a un milione di transazioni.
+
+Uso:
+    python benchmarks/bench_metrics.py [--sizes 1000 100000 1000000] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import calculate_metrics, PositionMetrics  # noqa: E402
+
+
+def synthetic_frame(rows, tickers=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Ticker": rng.choice([f"ETF{i:03d}" for i in range(tickers)], rows),
+        "Quantità": rng.integers(1, 100, rows).astype(np.float64),
+        "Prezzo di acquisto": rng.uniform(10, 500, rows),
+        "Prezzo corrente": rng.uniform(10, 500, rows),
+        "Data acquisto": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, rows), unit="D"),
+    })
+
+
+def timed(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=3, help="Ripetizioni per misura (default: 3)")
+    args = parser.parse_args()
+
+    print(f"{'righe':>10} {'lista dict':>12} {'colonne':>12} {'solo prezzi':>12}")
+    for rows in args.sizes:
+        frame = synthetic_frame(rows)
+        records = frame.to_dict("records")
+        metrics = PositionMetrics.from_frame(frame)
+        new_prices = {ticker: 100.0 for ticker in frame["Ticker"].unique()[:5]}
+
+        legacy = timed(lambda: calculate_metrics(records), args.runs)
+        columnar = timed(lambda: PositionMetrics.from_frame(frame), args.runs)
+        prices_only = timed(lambda: metrics.update_ticker_prices(new_prices), args.runs)
+        print(f"{rows:>10} {legacy:>11.4f}s {columnar:>11.4f}s {prices_only:>11.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark dell'avvio dell'app: misura in processi nuovi il tempo di import
+dei moduli caricati da app.py (cold start, al netto di streamlit) e il tempo della prima esecuzione
+completa dello script Streamlit (first paint), e salva ogni misura in uno
+storico JSONL per seguirne l'andamento nel tempo.
+
+Uso:
+    python benchmarks/bench_startup.py [--runs 5] [--history cache/bench_startup.jsonl]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduli importati da app.py prima di eseguire qualsiasi pagina
+APP_MODULES = [
+    "config", "data_manager",
+    "views.dashboard", "views.gestione_eft", "views.metriche", "views.rendimento_annuo",
+    "views.impostazioni", "views.simula_eft", "views.sidebar",
+    "database", "finance_info", "metrics",
+]
+# Librerie pesanti che non devono essere caricate all'avvio
+HEAVY_MODULES = ["yfinance", "plotly", "supabase"]
+
+# Streamlit viene importato per primo e misurato a parte: alcune librerie
+# (es. plotly) le carica già lui, quindi contano solo quelle aggiunte dai moduli dell'app
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_seconds = time.perf_counter() - start
+baseline = set(sys.modules)
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules and m not in baseline]
+print(json.dumps({{"streamlit_seconds": streamlit_seconds, "seconds": elapsed, "loaded": loaded}}))
+"""
+
+FIRST_PAINT_SCRIPT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file("app.py", default_timeout=120)
+app.run()
+print(json.dumps({"seconds": time.perf_counter() - start, "exceptions": len(app.exception)}))
+"""
+
+
+def run_python(code, env):
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Ripetizioni per misura (default: 5)")
+    parser.add_argument("--history", default=os.path.join(ROOT, "cache", "bench_startup.jsonl"),
+                        help="File JSONL dello storico delle misure")
+    parser.add_argument("--skip-first-paint", action="store_true", help="Misura solo il cold start")
+    args = parser.parse_args()
+
+    # Niente credenziali: il benchmark non deve dipendere dalla rete
+    env = dict(os.environ, SUPABASE_URL="", SUPABASE_KEY="", PYTHONDONTWRITEBYTECODE="1")
+
+    cold = [run_python(COLD_START_SCRIPT.format(modules=APP_MODULES, heavy=HEAVY_MODULES), env)
+            for _ in range(args.runs)]
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "streamlit_import_median_s": statistics.median(run["streamlit_seconds"] for run in cold),
+        "cold_start_median_s": statistics.median(run["seconds"] for run in cold),
+        "heavy_modules_loaded": sorted({name for run in cold for name in run["loaded"]}),
+    }
+    if not args.skip_first_paint:
+        paint = [run_python(FIRST_PAINT_SCRIPT, env) for _ in range(args.runs)]
+        result["first_paint_median_s"] = statistics.median(run["seconds"] for run in paint)
+        result["first_paint_exceptions"] = max(run["exceptions"] for run in paint)
+
+    previous = None
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            lines = [line for line in f if line.strip()]
+        if lines:
+            previous = json.loads(lines[-1])
+    os.makedirs(os.path.dirname(args.history), exist_ok=True)
+    with open(args.history, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+    for key, value in result.items():
+        line = f"{key:28} {value}"
+        if previous and key.endswith("_s") and previous.get(key):
+            line += f"  ({(value / previous[key] - 1) * 100:+.1f}% vs {previous.get('commit')})"
+        print(line)
+    if result["heavy_modules_loaded"]:
+        print(f"⚠️  Moduli pesanti caricati all'avvio: {', '.join(result['heavy_modules_loaded'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Sostituti locali di Supabase e Yahoo Finance per eseguire i benchmark senza rete:
+    FakeSupabase      tabelle in memoria con il sottoinsieme del query builder
+                      usato da database.py (select, filtri, order, range, upsert, delete)
+                      e le funzioni di supabase/migrations chiamate con rpc()
+    offline(...)      installa FakeSupabase, un ReplayProvider e archivi prezzi
+                      in una cartella temporanea, ripristinando tutto all'uscita
+"""
+import contextlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Query su una tabella in memoria, valutata con pandas all'execute()."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.count = None
+        self.filters = []
+        self.orders = []
+        self.window = None
+        self.payload = None
+        self.on_conflict = None
+
+    def select(self, columns="*", count=None):
+        self.columns, self.count = columns, count
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(("in", column, tuple(values)))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(("gte", column, str(value)))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(("lte", column, str(value)))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, not desc))
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, count):
+        self.window = (0, count)
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def _selected(self, df):
+        mask = np.ones(len(df), dtype=bool)
+        for op, column, value in self.filters:
+            if op == "eq":
+                mask &= (df[column] == value).to_numpy(dtype=bool)
+            elif op == "in":
+                mask &= df[column].isin(value).to_numpy(dtype=bool)
+            elif op == "gte":
+                mask &= (df[column].astype(str) >= value).to_numpy(dtype=bool)
+            else:
+                mask &= (df[column].astype(str) <= value).to_numpy(dtype=bool)
+        return mask
+
+    def _filtered(self, df):
+        # Le pagine successive della stessa query riusano filtro e ordinamento
+        key = (self.table, tuple(self.filters), tuple(self.orders))
+        if key not in self.db.results:
+            selected = df[self._selected(df)] if self.filters else df
+            if self.orders:
+                columns = [column for column, _ in self.orders]
+                selected = selected.sort_values(columns, ascending=[asc for _, asc in self.orders], kind="stable")
+            self.db.results[key] = selected
+        return self.db.results[key]
+
+    def execute(self):
+        self.db.requests += 1
+        df = self.db.tables.get(self.table, pd.DataFrame())
+        if self.action == "select":
+            selected = self._filtered(df)
+            total = len(selected)
+            if self.window:
+                selected = selected.iloc[self.window[0]:self.window[1]]
+            if self.columns != "*":
+                selected = selected[[column.strip() for column in self.columns.split(",")]]
+            data = selected.astype(object).where(selected.notna(), None).to_dict("records")
+            return FakeResponse(data, total if self.count else None)
+
+        self.db.results.clear()
+        if self.action == "delete":
+            self.db.tables[self.table] = df[~self._selected(df)].reset_index(drop=True)
+            return FakeResponse([])
+
+        rows = pd.DataFrame(self.payload if isinstance(self.payload, list) else [self.payload])
+        merged = pd.concat([df, rows], ignore_index=True)
+        if self.action == "upsert" and self.on_conflict:
+            keys = [key.strip() for key in self.on_conflict.split(",")]
+            merged = merged.drop_duplicates(keys, keep="last").reset_index(drop=True)
+        self.db.tables[self.table] = merged
+        return FakeResponse(rows.to_dict("records"))
+
+
+class FakeRpc:
+    """Chiamata a una funzione del database, eseguita all'execute()."""
+
+    def __init__(self, db, function, params):
+        self.db = db
+        self.function = function
+        self.params = params
+
+    def execute(self):
+        self.db.requests += 1
+        return FakeResponse(self.function(self.db, **self.params))
+
+
+def replace_etf_holdings(db, p_etf_ticker, p_holdings):
+    """Come la funzione SQL: cancella e reinserisce le holding dell'ETF in un solo passo."""
+    df = db.tables.get("etf_holdings", pd.DataFrame(columns=["etf_ticker"]))
+    kept = df[df["etf_ticker"] != p_etf_ticker]
+    rows = pd.DataFrame(p_holdings).assign(etf_ticker=p_etf_ticker)
+    db.tables["etf_holdings"] = pd.concat([kept, rows], ignore_index=True)
+    db.results.clear()
+    return {"inserted": len(rows), "removed": len(df) - len(kept)}
+
+
+class FakeSupabase:
+    """Client Supabase in memoria: tabelle e viste sono DataFrame (o liste di dizionari)."""
+
+    functions = {"replace_etf_holdings": replace_etf_holdings}
+
+    def __init__(self, tables=None):
+        self.tables = {name: pd.DataFrame(rows) for name, rows in (tables or {}).items()}
+        self.results = {}
+        self.requests = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, self.functions[name], params or {})
+
+
+def write_replay(root, history, suffix=".MI"):
+    """Scrive lo storico nel formato di ReplayProvider (<root>/history/<SIMBOLO>.csv)."""
+    os.makedirs(os.path.join(root, "history"), exist_ok=True)
+    for ticker, rows in history.groupby("ticker"):
+        pd.DataFrame({
+            "Date": rows["date"].to_numpy(),
+            "Close": rows["close"].to_numpy(),
+            "Dividends": rows["dividends"].to_numpy(),
+        }).to_csv(os.path.join(root, "history", f"{ticker}{suffix}.csv"), index=False)
+
+
+@contextlib.contextmanager
+def offline(tables=None, history=None):
+    """
+    Esegue il blocco con Supabase, Yahoo Finance e gli archivi locali sostituiti:
+    nessuna richiesta di rete e nessuna scrittura nella cache reale dell'app.
+
+    Args:
+        tables (dict): Nome tabella o vista -> righe iniziali
+        history (DataFrame): Storico servito dal ReplayProvider
+
+    Yields:
+        FakeSupabase: Il client installato in database._client
+    """
+    import database
+    import finance_info
+    import market_data
+    from price_store import PriceStore
+    from symbol_resolver import SymbolResolver
+
+    client = FakeSupabase(tables)
+    saved = (database._client, finance_info.price_store, finance_info.fx_store,
+             finance_info.symbol_resolver, finance_info._portfolio_valuation, market_data._provider)
+    with tempfile.TemporaryDirectory() as root:
+        if history is not None:
+            write_replay(os.path.join(root, "replay"), history)
+        database._client = client
+        finance_info.price_store = PriceStore(os.path.join(root, "prices"))
+        finance_info.fx_store = PriceStore(os.path.join(root, "fx"))
+        finance_info.symbol_resolver = SymbolResolver(os.path.join(root, "symbols.json"), 3600, 3600)
+        finance_info._portfolio_valuation = None
+        market_data.set_provider(market_data.ReplayProvider(os.path.join(root, "replay")))
+        database.query_cache.clear()
+        finance_info.analytics_cache.clear()
+        try:
+            yield client
+        finally:
+            (database._client, finance_info.price_store, finance_info.fx_store,
+             finance_info.symbol_resolver, finance_info._portfolio_valuation, provider) = saved
+            market_data.set_provider(provider)
+            database.query_cache.clear()
+            finance_info.analytics_cache.clear()
@@ -0,0 +1,174 @@
+"""
+Dati sintetici per i benchmark: storico prezzi, transazioni, holding e le
+righe che l'app tiene in st.session_state, con la stessa forma e gli stessi
+nomi di colonna delle tabelle e delle viste Supabase.
+Tutto è deterministico a parità di `seed`.
+"""
+import numpy as np
+import pandas as pd
+
+SETTORI = ["Tecnologia", "Finanza", "Sanità", "Industria", "Energia", "Beni di consumo", "Liquidità"]
+AREE = ["Stati Uniti", "Europa", "Giappone", "Mercati Emergenti", "Regno Unito", "Pacifico"]
+VALUTE = ["USD", "EUR", "JPY", "GBP", "CHF"]
+
+
+def tickers(count):
+    """Ticker base sintetici (ETF000, ETF001, ...)."""
+    return [f"ETF{i:03d}" for i in range(count)]
+
+
+def make_price_history(names, days=2520, start="2015-01-01", seed=0):
+    """
+    Storico giornaliero a moto browniano geometrico, nei soli giorni lavorativi,
+    con un dividendo trimestrale per circa metà dei ticker.
+
+    Args:
+        names (list): Ticker
+        days (int): Giorni lavorativi per ticker
+        start (str): Prima data
+        seed (int): Seme del generatore
+
+    Returns:
+        DataFrame: Colonne ticker, date, close, dividends come "etf_price_history"
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days)
+    drift = rng.uniform(0.0, 0.0006, len(names))
+    volatility = rng.uniform(0.006, 0.02, len(names))
+    shocks = rng.standard_normal((days, len(names))) * volatility + drift
+    close = rng.uniform(20, 300, len(names)) * np.exp(np.cumsum(shocks, axis=0))
+
+    dividends = np.zeros_like(close)
+    paying = rng.random(len(names)) < 0.5
+    # Stacco il primo giorno lavorativo di ogni trimestre
+    quarters = dates.to_period("Q")
+    ex_dates = np.flatnonzero(np.r_[False, quarters[1:] != quarters[:-1]])
+    dividends[np.ix_(ex_dates, paying)] = close[np.ix_(ex_dates, paying)] * 0.004
+
+    return pd.DataFrame({
+        "ticker": np.repeat(np.asarray(names, dtype=object), days),
+        "date": np.tile(dates.strftime("%Y-%m-%d").to_numpy(), len(names)),
+        "close": close.T.ravel().round(4),
+        "dividends": dividends.T.ravel().round(4),
+    })
+
+
+def make_transactions(rows, names, start="2015-01-01", days=2520, seed=0):
+    """
+    Transazioni della tabella "transaction": acquisti e qualche vendita in euro.
+
+    Args:
+        rows (int): Numero di transazioni
+        names (list): Ticker
+        start (str), days (int): Finestra delle date operazione
+        seed (int): Seme del generatore
+
+    Returns:
+        DataFrame: Colonne di TRANSACTION_DTYPES più riferimento_ordine e protocollo
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days)
+    selling = rng.random(rows) < 0.1
+    quantity = rng.integers(1, 50, rows).astype(np.float64)
+    amount = quantity * rng.uniform(20, 300, rows)
+    return pd.DataFrame({
+        "ticker": rng.choice(np.asarray(names, dtype=object), rows),
+        "isin": None,
+        "tipo_operazione": np.where(selling, "Vendita", "Acquisto"),
+        "data_operazione": np.sort(rng.choice(dates, rows)).astype("datetime64[s]").astype(str),
+        "quantita": quantity,
+        "importo_euro": np.where(selling, amount, -amount).round(2),
+        "importo_divisa": None,
+        "divisa": "EUR",
+        "riferimento_ordine": np.arange(rows).astype(str),
+        "protocollo": np.arange(rows),
+    })
+
+
+def make_holdings(names, per_etf=200, seed=0):
+    """
+    Holding per ETF come le righe dei CSV iShares passati a insert_holdings.
+
+    Args:
+        names (list): Ticker degli ETF
+        per_etf (int): Holding per ETF
+        seed (int): Seme del generatore
+
+    Returns:
+        dict: etf_ticker -> lista di dizionari
+    """
+    rng = np.random.default_rng(seed)
+    holdings = {}
+    for etf in names:
+        weights = rng.dirichlet(np.ones(per_etf)) * 100
+        holdings[etf] = [{
+            "Ticker dell'emittente": f"H{i:05d}",
+            "Nome": f"Società {i}",
+            "Settore": SETTORI[rng.integers(len(SETTORI))],
+            "Asset Class": "Azioni",
+            "Ponderazione (%)": f"{weight:.4f}".replace(".", ","),
+            "Area Geografica": AREE[rng.integers(len(AREE))],
+            "Cambio": "-",
+            "Valuta di mercato": VALUTE[rng.integers(len(VALUTE))],
+        } for i, weight in enumerate(weights)]
+    return holdings
+
+
+def make_session_data(rows, names, seed=0):
+    """
+    Righe di st.session_state usate dalla dashboard: posizioni
+    ("etf_transactions"), prezzo medio di acquisto, top/bottom 3, KPI per ETF
+    e le quattro distribuzioni.
+
+    Args:
+        rows (int): Righe delle posizioni
+        names (list): Ticker
+        seed (int): Seme del generatore
+
+    Returns:
+        dict: Chiave di session_state -> lista di dizionari
+    """
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 100, rows).astype(np.float64)
+    purchase = rng.uniform(20, 300, rows).round(2)
+    current = (purchase * rng.uniform(0.6, 1.6, rows)).round(2)
+    positions = pd.DataFrame({
+        "Ticker": rng.choice(np.asarray(names, dtype=object), rows),
+        "Quantità": quantity,
+        "Prezzo di acquisto": purchase,
+        "Prezzo corrente": current,
+        "Data acquisto": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, rows), unit="D"),
+    })
+    positions["Costo"] = (positions["Quantità"] * positions["Prezzo di acquisto"]).round(2)
+    positions["Market Value"] = (positions["Quantità"] * positions["Prezzo corrente"]).round(2)
+    positions["Crescita"] = (positions["Market Value"] - positions["Costo"]).round(2)
+    positions["Crescita %"] = (positions["Crescita"] / positions["Costo"] * 100).round(2)
+    positions["Data acquisto"] = positions["Data acquisto"].dt.strftime("%Y-%m-%d")
+
+    by_ticker = positions.groupby("Ticker").agg(
+        quantita=("Quantità", "sum"), costo_investito_eur=("Costo", "sum"), price=("Prezzo corrente", "last")
+    ).reset_index().rename(columns={"Ticker": "ticker"})
+    by_ticker["prezzo_medio_acquisto"] = by_ticker["costo_investito_eur"] / by_ticker["quantita"]
+    by_ticker["ultima_operazione"] = "Acquisto"
+    value = by_ticker["quantita"] * by_ticker["price"]
+
+    def distribution(labels, column):
+        weights = rng.dirichlet(np.ones(len(labels))) * 100
+        return [{column: label, "distribuzione_pct": round(weight, 2)} for label, weight in zip(labels, weights)]
+
+    return {
+        "etf_transactions": positions.to_dict("records"),
+        "prezzo_medio_acquisto": by_ticker.to_dict("records"),
+        "distribuzione_etf": pd.DataFrame({
+            "ticker": by_ticker["ticker"], "distribuzione_pct": (value / value.sum() * 100).round(2)
+        }).to_dict("records"),
+        "top_3_etf": by_ticker.nlargest(3, "price")[["ticker", "price"]].to_dict("records"),
+        "bottom_3_etf": by_ticker.nsmallest(3, "price")[["ticker", "price"]].to_dict("records"),
+        "kpi_etf": pd.DataFrame({
+            "ticker": by_ticker["ticker"], "costo_investito_eur": by_ticker["costo_investito_eur"],
+            "market_value_attuale": value
+        }).to_dict("records"),
+        "distribuzione_settore": distribution(SETTORI, "settore"),
+        "distribuzione_valuta_mercato": distribution(VALUTE, "valuta_mercato"),
+        "distribuzione_area_geografica": distribution(AREE, "area_geografica"),
+    }
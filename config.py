@@ -3,5 +3,65 @@ ETF_DETAILS_FILE = "etf_details.csv"
 INTERMEDIARI = ["Directa", "Fineco", "Degiro", "IBKR", "Altro"]
 
 VALUTE_SUPPORTATE = ["EUR", "USD", "GBP", "CHF"]
+VALUTA_BASE = "EUR"  # valuta in cui vengono valutati prezzi e flussi
 TEMI = ["Light", "Dark", "Auto"]
-FORMATI_DATA = ["DD/MM/YYYY", "MM/DD/YYYY", "YYYY-MM-DD"]
\ No newline at end of file
+FORMATI_DATA = ["DD/MM/YYYY", "MM/DD/YYYY", "YYYY-MM-DD"]
+
+# Richieste contemporanee al caricamento iniziale della sessione
+BOOTSTRAP_MAX_WORKERS = 6
+
+# Cache condivisa delle letture Supabase
+QUERY_CACHE_TTL = 300  # secondi
+QUERY_CACHE_MAX_ENTRIES = 64
+
+# Sync incrementale dello storico: se le righe salvate sono meno di questa
+# frazione dei giorni lavorativi attesi lo storico ha buchi e va riscaricato
+HISTORY_GAP_TOLERANCE = 0.9
+
+# Cache locali su disco
+CACHE_DIR = "cache"
+SYMBOL_CACHE_FILE = f"{CACHE_DIR}/yahoo_symbols.json"
+SYMBOL_CACHE_TTL = 30 * 24 * 3600  # secondi
+SYMBOL_CACHE_NEGATIVE_TTL = 6 * 3600  # secondi
+PRICE_STORE_DIR = f"{CACHE_DIR}/prices"
+FX_STORE_DIR = f"{CACHE_DIR}/fx"  # cambi giornalieri verso VALUTA_BASE
+
+# Cache dei risultati delle analisi (correlazioni, metriche di rischio, ...)
+ANALYTICS_CACHE_TTL = 3600  # secondi
+ANALYTICS_CACHE_MAX_ENTRIES = 128
+RISK_FREE_RATE = 0.0  # tasso privo di rischio annuo per Sharpe e Sortino
+VAR_SIMULATIONS = 20000  # scenari Monte Carlo per VaR e CVaR
+# Tipi di operazione (sottostringhe, senza maiuscole) che sono flussi di un
+# investimento per l'XIRR: bonifici, bolli, cedole e ritenute restano esclusi
+XIRR_OPERAZIONI = ("acquisto", "vendita", "dividend")
+# Benchmark disponibili: nome -> ticker di un ETF che lo replica (storico salvato con gli altri ETF)
+BENCHMARKS = {
+    "MSCI World": "SWDA",
+    "MSCI ACWI": "SSAC",
+    "S&P 500": "CSPX",
+    "MSCI Emerging Markets": "EIMI",
+}
+
+# Provider dei dati di mercato (vedi market_data.py)
+MARKET_DATA_RATE = 2.0  # richieste al secondo
+MARKET_DATA_BURST = 5
+MARKET_DATA_TIMEOUT = 15  # secondi per richiesta
+MARKET_DATA_RETRIES = 2
+MARKET_DATA_BACKOFF = 0.5  # secondi, raddoppia a ogni tentativo
+MARKET_DATA_BREAKER_THRESHOLD = 5  # errori consecutivi prima di sospendere
+MARKET_DATA_BREAKER_RESET = 60  # secondi di sospensione
+
+# Aggiornamenti in background (vedi scheduler.py), intervalli in secondi
+SCHEDULER_INTERVALS = {
+    "prices": 15 * 60,
+    "history": 24 * 3600,
+    "holdings": 24 * 3600,
+    "fx": 24 * 3600,
+}
+SCHEDULER_STATE_FILE = f"{CACHE_DIR}/scheduler_state.json"
+SCHEDULER_LOCK_DIR = f"{CACHE_DIR}/locks"
+SCHEDULER_LOCK_STALE = 2 * 3600  # secondi dopo cui un lock abbandonato viene ignorato
+HOLDINGS_CSV_DIR = "etf_csv"
+# File riscritto dai job dopo ogni aggiornamento riuscito: le cache degli
+# altri processi (es. Streamlit) vengono svuotate quando cambia
+DATA_STAMP_FILE = f"{CACHE_DIR}/data_version"
@@ -1,7 +1,27 @@
 import json
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import pandas as pd
-from config import DATA_FILE, ETF_DETAILS_FILE
+from config import DATA_FILE, ETF_DETAILS_FILE, BOOTSTRAP_MAX_WORKERS
+
+# Chiave di session_state -> vista Supabase letta con database.read_view
+SESSION_QUERIES = {
+    "etf_transactions": "etf_transaction_updated",
+    "top_3_etf": "v_top_3_etf_guadagni",
+    "bottom_3_etf": "v_bottom_3_etf_guadagni",
+    "kpi_etf": "v_portfolio_ticker_kpi",
+    "distribuzione_etf": "v_dist_etf",
+    "distribuzione_settore": "v_dist_settore",
+    "distribuzione_valuta_mercato": "v_dist_valuta_mercato",
+    "distribuzione_area_geografica": "v_dist_area_geografica",
+    "prezzo_medio_acquisto": "v_portfolio_positions",
+}
+
+# Chiave di session_state con il numero di versione dei dati caricati da SESSION_QUERIES
+DATA_VERSION_KEY = "versione_dati"
 
 def load_etf_data():
     if os.path.exists(DATA_FILE):
@@ -24,4 +44,71 @@ def load_etf_name():
     return etf_list
 
 def save_etf_details(df):
-    df.to_csv(ETF_DETAILS_FILE, index=False)
\ No newline at end of file
+    df.to_csv(ETF_DETAILS_FILE, index=False)
+
+def read_holdings_csv(file):
+    """Legge il file CSV delle holding esportato da iShares (percorso o file caricato)."""
+    return pd.read_csv(file, sep=';', skiprows=7, encoding='latin-1')
+
+def _timed_query(func):
+    start = time.perf_counter()
+    try:
+        return func(), time.perf_counter() - start, None
+    except Exception as e:
+        return [], time.perf_counter() - start, str(e)
+
+def load_session_data(keys=None, max_workers=BOOTSTRAP_MAX_WORKERS):
+    """
+    Esegue in parallelo le query della dashboard su un pool di thread limitato.
+    Una query fallita non blocca le altre: il suo valore diventa una lista vuota
+    e l'errore viene riportato nel report (le viste vengono lette con
+    database.read_view, che non nasconde gli errori).
+    Parametri:
+        keys (list): Chiavi di SESSION_QUERIES da caricare (default: tutte)
+        max_workers (int): Numero massimo di richieste contemporanee
+    Ritorna:
+        tuple: (dati, report) dove dati è {chiave: righe} e report è
+            {chiave: {"seconds": durata, "error": messaggio o None}}
+    """
+    import database
+
+    keys = list(SESSION_QUERIES) if keys is None else list(keys)
+    if not keys:
+        return {}, {}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        futures = {
+            key: executor.submit(_timed_query, partial(database.read_view, SESSION_QUERIES[key]))
+            for key in keys
+        }
+        results = {key: future.result() for key, future in futures.items()}
+
+    data = {key: rows for key, (rows, _, _) in results.items()}
+    report = {key: {"seconds": seconds, "error": error} for key, (_, seconds, error) in results.items()}
+    for key, info in report.items():
+        if info["error"]:
+            logging.error(f"Bootstrap {key} fallito in {info['seconds']:.2f}s: {info['error']}")
+        else:
+            logging.info(f"Bootstrap {key}: {info['seconds']:.2f}s")
+    logging.info(f"Bootstrap completato in {time.perf_counter() - start:.2f}s")
+    return data, report
+
+def apply_session_data(session_state, data, report=None):
+    """
+    Copia in session_state i dati caricati da load_session_data e incrementa
+    la versione dei dati, così le tabelle derivate vengono ricalcolate.
+    Con il report, le query fallite non sovrascrivono i dati già presenti
+    (una lista vuota viene usata solo se la chiave manca del tutto).
+    Parametri:
+        session_state: st.session_state (o un dizionario)
+        data (dict): {chiave: righe} come ritornato da load_session_data
+        report (dict): Report di load_session_data (opzionale)
+    """
+    if report:
+        data = {
+            key: rows for key, rows in data.items()
+            if not report[key]["error"] or key not in session_state
+        }
+    session_state.update(data)
+    session_state[DATA_VERSION_KEY] = session_state.get(DATA_VERSION_KEY, 0) + 1
@@ -1,21 +1,91 @@
 import os
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
+import threading
 import logging
 import pandas as pd
 from utils import normalize_data
-# Carica le variabili dal file .env
-load_dotenv() 
+from config import QUERY_CACHE_TTL, QUERY_CACHE_MAX_ENTRIES, DATA_STAMP_FILE
+from query_cache import QueryCache, FileStamp
 # Reference Supabase: https://supabase.com/docs/reference/python/eq
 
-url: str = os.getenv("SUPABASE_URL","")
-key: str = os.getenv("SUPABASE_KEY","")
-supabase: Client = create_client(supabase_url=url, supabase_key=key)
+# Il client viene creato alla prima query, non all'import del modulo
+_client = None
+_client_lock = threading.Lock()
+
+def get_supabase():
+    """
+    Ritorna il client Supabase, creandolo alla prima chiamata
+    con le variabili SUPABASE_URL e SUPABASE_KEY (anche da file .env).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from dotenv import load_dotenv
+                from supabase import create_client
+                # Carica le variabili dal file .env
+                load_dotenv()
+                url: str = os.getenv("SUPABASE_URL","")
+                key: str = os.getenv("SUPABASE_KEY","")
+                _client = create_client(supabase_url=url, supabase_key=key)
+    return _client
+
+# Cache condivisa tra le sessioni per le letture delle viste, svuotata anche
+# quando un job dello scheduler aggiorna i dati da un altro processo
+query_cache = QueryCache(ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_MAX_ENTRIES,
+                         stamp=FileStamp(DATA_STAMP_FILE))
+
+# Tabella scritta -> viste che ne dipendono e vanno invalidate
+TABLE_DEPENDENCIES = {
+    "transaction": [
+        "etf_transaction_updated", "v_portfolio_ticker_kpi", "v_portfolio_positions",
+        "v_top_3_etf_guadagni", "v_bottom_3_etf_guadagni", "v_dist_etf",
+        "v_dist_settore", "v_dist_valuta_mercato", "v_dist_area_geografica",
+    ],
+    "etf_prices": [
+        "etf_transaction_updated", "v_portfolio_ticker_kpi", "v_portfolio_positions",
+        "v_top_3_etf_guadagni", "v_bottom_3_etf_guadagni", "v_dist_etf",
+        "v_dist_settore", "v_dist_valuta_mercato", "v_dist_area_geografica",
+    ],
+    "etf_holdings": [
+        "unique_tickers_view", "v_dist_settore", "v_dist_valuta_mercato", "v_dist_area_geografica",
+    ],
+    "etf_price_history": ["etf_price_history"],
+}
+
+def invalidate_table(table):
+    """Elimina dalla cache le viste che dipendono dalla tabella scritta."""
+    query_cache.invalidate(table, *TABLE_DEPENDENCIES.get(table, []))
+
+def clear_query_cache():
+    """Svuota la cache delle letture (es. dopo modifiche fatte fuori dall'app)."""
+    query_cache.clear()
+
+def _cached_select(view):
+    """
+    Legge tutte le righe di una vista passando dalla cache condivisa.
+    Le righe ritornate sono condivise tra le sessioni e non vanno modificate.
+    """
+    rows = query_cache.get_or_load(
+        (view,),
+        lambda: get_supabase().table(view).select("*").execute().data
+    )
+    return list(rows)
+
+def read_view(view):
+    """
+    Come le funzioni get_* ma senza intercettare gli errori: un errore di rete
+    o di Supabase viene sollevato invece di diventare una lista vuota.
+    Usata dal caricamento della sessione per distinguere una query fallita da una vista vuota.
+    Parametri:
+        view (str): Nome della vista
+    Ritorna:
+        list: Righe della vista (condivise, da non modificare)
+    """
+    return _cached_select(view)
 '''
 # Esempio SELECT
 response = (
-    supabase.table("etf_data")
+    get_supabase().table("etf_data")
     .select("*")
     .execute()
 )
@@ -24,21 +94,21 @@ print(response)
 
 # Esempio INSERT
 response = (
-    supabase.table("etf_data")
+    get_supabase().table("etf_data")
     .insert({"id": 1, "name": "Pluto"})
     .execute()
 )
 
 # Esempio UPDATE
 response = (
-    supabase.table("instruments")
+    get_supabase().table("instruments")
     .update({"name": "piano"})
     .eq("id", 1)
     .execute()
 )
 # Esempio DELETE
 response = (
-    supabase.table("countries")
+    get_supabase().table("countries")
     .delete()
     .eq("id", 1)
     .execute()
@@ -80,11 +150,12 @@ def insert_directa_transaction(transaction_data):
         try:
             # on_conflict: indica la colonna (o le colonne) che devono essere uniche.
             # ignore_duplicates=True: se trova un conflitto, NON aggiorna e NON dà errore, semplicemente ignora la riga.
-            response = supabase.table("transaction").upsert(
+            response = get_supabase().table("transaction").upsert(
                 batch_data, 
                 on_conflict="ticker, data_operazione, riferimento_ordine, protocollo",
                 ignore_duplicates=True
             ).execute()
+            invalidate_table("transaction")
                  
         except Exception as e:
             print(f"Errore durante l'upsert: {e}")
@@ -109,51 +180,128 @@ def get_numeric_value(value, default=0.0):
         return float(value.replace(",", "."))
     return default
 
+# PostgREST tronca le risposte oltre questo numero di righe (max-rows)
+PAGE_SIZE = 1000
+
+def iter_pages(table, columns="*", order=None, filters=None, in_filters=None,
+               date_column=None, start=None, end=None, page_size=PAGE_SIZE):
+    """
+    Generatore che legge una tabella a pagine con .range(), selezionando solo
+    le colonne richieste. Ogni pagina viene scaricata solo quando serve.
+    Parametri:
+        table (str): Nome della tabella o vista
+        columns (str | list): Colonne da selezionare
+        order (list): Colonne di ordinamento, necessarie per una paginazione stabile
+        filters (dict): Filtri di uguaglianza colonna=valore
+        in_filters (dict): Filtri colonna=lista di valori ammessi
+        date_column (str): Colonna su cui applicare la finestra start/end
+        start, end (str | date): Estremi inclusi della finestra temporale
+        page_size (int): Righe per richiesta (al più il max-rows di PostgREST)
+    Ritorna:
+        generator: Liste di dizionari, una per pagina
+    """
+    if not isinstance(columns, str):
+        columns = ",".join(columns)
+    offset = 0
+    while True:
+        query = get_supabase().table(table).select(columns)
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        for column, values in (in_filters or {}).items():
+            query = query.in_(column, list(values))
+        if date_column and start is not None:
+            query = query.gte(date_column, str(start))
+        if date_column and end is not None:
+            query = query.lte(date_column, str(end))
+        for column in order or []:
+            query = query.order(column)
+        page = query.range(offset, offset + page_size - 1).execute().data
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+def _select_all(table, columns, **filters):
+    """
+    Legge tutte le righe di una tabella paginando con .range(),
+    così da non essere troncati dal limite max-rows di PostgREST.
+    Parametri:
+        table (str): Nome della tabella o vista
+        columns (str): Colonne da selezionare (es. "ticker")
+        filters: Filtri di uguaglianza colonna=valore
+    Ritorna:
+        list: Lista di dizionari con tutte le righe
+    """
+    return [row for page in iter_pages(table, columns, order=[columns], filters=filters) for row in page]
+
+def pages_to_frame(pages, dtypes):
+    """
+    Costruisce un DataFrame tipizzato pagina per pagina: ogni pagina viene
+    convertita subito in colonne compatte e la lista di dizionari scartata.
+    Parametri:
+        pages (iterable): Pagine prodotte da iter_pages
+        dtypes (dict): Colonna -> dtype pandas ("datetime64[ns]", "float64", "category", ...)
+    Ritorna:
+        DataFrame: Righe di tutte le pagine con le colonne tipizzate
+    """
+    frames = []
+    for page in pages:
+        frame = pd.DataFrame.from_records(page, columns=list(dtypes))
+        for column, dtype in dtypes.items():
+            if dtype.startswith("datetime64"):
+                frame[column] = pd.to_datetime(frame[column], errors="coerce").astype(dtype)
+            elif dtype == "float64":
+                frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+            elif dtype != "category":
+                frame[column] = frame[column].astype(dtype)
+        frames.append(frame)
+
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+    else:
+        df = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    for column, dtype in dtypes.items():
+        if dtype == "category":
+            df[column] = df[column].astype("category")
+    return df
+
 # Funzione per inserire una lista di holding nel database
 def insert_holdings(etf_ticker, holdings):
     """
-    Inserisce una lista di holding per un ETF nel database Supabase.
+    Sostituisce le holding di un ETF nel database Supabase con una sola chiamata
+    alla funzione "replace_etf_holdings", che cancella e reinserisce in un'unica
+    transazione: se l'inserimento fallisce l'ETF mantiene le holding precedenti.
+    Il ticker dell'emittente non è univoco nei file iShares (es. AIR è sia Airbus
+    sia AAR Corp), quindi ogni riga del file resta una holding distinta; la
+    migrazione in supabase/migrations rimuove il vincolo su (etf_ticker, ticker).
     Parametri:
         etf_ticker (str): Il ticker dell'ETF di riferimento
         holdings (list of dict): Lista di holding, ogni dict deve avere le chiavi:
             Ticker, Nome, Settore, Asset Class, Valore di mercato, Ponderazione (%),
             Valore nozionale, Nominale, Prezzo, Area Geografica, Cambio, Valuta di mercato
-    """
-    # Cerco se esistono già dati per questo etf_ticker e li elim
-    response = (
-        supabase.table("etf_holdings")
-        .select("*")
-        .eq("etf_ticker", etf_ticker)
-        .execute()
-    )
-    if len(response.data) > 0:
-        #Se esiste li elimino tutti prima di reinserirli
-        print("Dati holdings trovati, procedo con la cancellazione per poi reinserirli.")
-        response = (
-            supabase.table("etf_holdings")
-            .delete()
-            .eq("etf_ticker", etf_ticker)
-            .execute()
-        )
-    else:
-        print("Nessun dato trovato, procediamo con l'inserimento.")
-    
-    results = []
-    for row in holdings:
-        data = {
-           "etf_ticker": etf_ticker,
-            "ticker": get_valid_value(row.get("Ticker dell'emittente"), etf_ticker),
-            "nome": get_valid_value(row.get("Nome")),
-            "settore": get_valid_value(row.get("Settore")),
-            "asset_class": get_valid_value(row.get("Asset Class")),
-            "ponderazione": get_numeric_value(row.get("Ponderazione (%)"), None),
-            "area_geografica": get_valid_value(row.get("Area Geografica")),
-            "cambio": get_valid_value(row.get("Cambio"), 'EUR'),
-            "valuta_mercato": get_valid_value(row.get("Valuta di mercato"))
-        }
+    Ritorna:
+        dict: Righe {"inserted": inserite, "removed": cancellate}
+    """
+    rows = [{
+        "etf_ticker": etf_ticker,
+        "ticker": get_valid_value(row.get("Ticker dell'emittente"), etf_ticker),
+        "nome": get_valid_value(row.get("Nome")),
+        "settore": get_valid_value(row.get("Settore")),
+        "asset_class": get_valid_value(row.get("Asset Class")),
+        "ponderazione": get_numeric_value(row.get("Ponderazione (%)"), None),
+        "area_geografica": get_valid_value(row.get("Area Geografica")),
+        "cambio": get_valid_value(row.get("Cambio"), 'EUR'),
+        "valuta_mercato": get_valid_value(row.get("Valuta di mercato"))
+    } for row in holdings]
+
+    response = get_supabase().rpc(
+        "replace_etf_holdings", {"p_etf_ticker": etf_ticker, "p_holdings": rows}
+    ).execute()
+    invalidate_table("etf_holdings")
 
-        res = supabase.table("etf_holdings").insert(data).execute()
-        results.append(res)
+    results = {"inserted": int(response.data["inserted"]), "removed": int(response.data["removed"])}
+    logging.info(f"Holdings {etf_ticker}: {results}")
     return results
 
 def get_portfolio_kpi_etf():
@@ -164,8 +312,7 @@ def get_portfolio_kpi_etf():
         list: Lista di dizionari contenenti le KPI del portafoglio ETF
     """
     try:
-        response = supabase.table("v_portfolio_ticker_kpi").select("*").execute()
-        return response.data
+        return _cached_select("v_portfolio_ticker_kpi")
     except Exception as e:
         logging.error(f"Errore durante il recupero delle KPI del portafoglio ETF: {e}")
         return []
@@ -178,8 +325,7 @@ def get_etf_list():
         list: Lista di dizionari contenenti i ticker degli ETF
     """
     try:
-        response = supabase.table("unique_tickers_view").select("*").execute()
-        return response.data
+        return _cached_select("unique_tickers_view")
     except Exception as e:
         logging.error(f"Errore durante il recupero della lista ETF: {e}")
         return []
@@ -192,8 +338,7 @@ def get_etf_transaction_updated():
         list: Lista di dizionari contenenti ETF e dettagli di transazione
     """
     try:
-        response = supabase.table("etf_transaction_updated").select("*").execute()
-        return response.data
+        return _cached_select("etf_transaction_updated")
     except Exception as e:
         logging.error(f"Errore durante il recupero della lista ETF: {e}")
         return []
@@ -206,8 +351,7 @@ def get_top_3_etf():
         list: Lista di dizionari contenenti i top 3 ETF
     """
     try:
-        response = supabase.table("v_top_3_etf_guadagni").select("*").execute()
-        return response.data
+        return _cached_select("v_top_3_etf_guadagni")
     except Exception as e:
         logging.error(f"Errore durante il recupero dei top 3 ETF: {e}")
         return []
@@ -220,8 +364,7 @@ def get_bottom_3_etf():
         list: Lista di dizionari contenenti i bottom 3 ETF
     """
     try:
-        response = supabase.table("v_bottom_3_etf_guadagni").select("*").execute()
-        return response.data
+        return _cached_select("v_bottom_3_etf_guadagni")
     except Exception as e:
         logging.error(f"Errore durante il recupero dei bottom 3 ETF: {e}")
         return [] 
@@ -233,8 +376,7 @@ def get_distribuzione_etf():
         list: Lista di dizionari contenenti la distribuzione per ETF
     """
     try:
-        response = supabase.table("v_dist_etf").select("*").execute()
-        return response.data
+        return _cached_select("v_dist_etf")
     except Exception as e:
         logging.error(f"Errore durante il recupero della distribuzione ETF: {e}")
         return []
@@ -247,8 +389,7 @@ def get_distribuzione_settore():
         list: Lista di dizionari contenenti la distribuzione per settore
     """
     try:
-        response = supabase.table("v_dist_settore").select("*").execute()
-        return response.data
+        return _cached_select("v_dist_settore")
     except Exception as e:
         logging.error(f"Errore durante il recupero della distribuzione settore: {e}")
         return []
@@ -261,8 +402,7 @@ def get_distribuzione_valuta_mercato():
         list: Lista di dizionari contenenti la distribuzione per valuta di mercato
     """
     try:
-        response = supabase.table("v_dist_valuta_mercato").select("*").execute()
-        return response.data
+        return _cached_select("v_dist_valuta_mercato")
     except Exception as e:
         logging.error(f"Errore durante il recupero della distribuzione valuta mercato: {e}")
         return []
@@ -275,22 +415,165 @@ def get_distribuzione_area_geografica():
         list: Lista di dizionari contenenti la distribuzione per area geografica
     """
     try:
-        response = supabase.table("v_dist_area_geografica").select("*").execute()
-        return response.data
+        return _cached_select("v_dist_area_geografica")
     except Exception as e:
         logging.error(f"Errore durante il recupero della distribuzione area geografica: {e}")
         return [] 
      
+# Tipi delle colonne lette dalle tabelle storiche
+HISTORY_DTYPES = {
+    "ticker": "category",
+    "date": "datetime64[ns]",
+    "close": "float64",
+    "dividends": "float64",
+}
+TRANSACTION_DTYPES = {
+    "ticker": "category",
+    "isin": "object",
+    "tipo_operazione": "category",
+    "data_operazione": "datetime64[ns]",
+    "quantita": "float64",
+    "importo_euro": "float64",
+    "importo_divisa": "float64",
+    "divisa": "category",
+}
+
+def iter_etf_history(columns=("ticker", "date", "close"), tickers=None, start=None, end=None,
+                     page_size=PAGE_SIZE):
+    """
+    Generatore a pagine sullo storico prezzi "etf_price_history".
+    Parametri:
+        columns (tuple): Colonne da selezionare
+        tickers (list): Ticker da includere (default: tutti)
+        start, end (str | date): Finestra temporale inclusa sulla colonna "date"
+    Ritorna:
+        generator: Liste di dizionari, una per pagina
+    """
+    return iter_pages(
+        "etf_price_history", columns,
+        order=["ticker", "date"],
+        in_filters={"ticker": tickers} if tickers else None,
+        date_column="date", start=start, end=end,
+        page_size=page_size
+    )
+
+def get_etf_history_frame(columns=("ticker", "date", "close"), tickers=None, start=None, end=None):
+    """
+    Recupera lo storico prezzi completo come DataFrame tipizzato, leggendo a pagine.
+    Il risultato passa dalla cache condivisa ed è invalidato da insert_etf_history.
+    Parametri:
+        columns (tuple): Colonne da selezionare (chiavi di HISTORY_DTYPES)
+        tickers (list): Ticker da includere (default: tutti)
+        start, end (str | date): Finestra temporale inclusa
+    Ritorna:
+        DataFrame: Storico con colonne tipizzate (non va modificato in place)
+    """
+    columns = tuple(columns)
+    tickers = tuple(sorted(tickers)) if tickers else None
+    dtypes = {column: HISTORY_DTYPES.get(column, "object") for column in columns}
+    try:
+        return query_cache.get_or_load(
+            ("etf_price_history", columns, tickers, str(start), str(end)),
+            lambda: pages_to_frame(iter_etf_history(columns, tickers, start, end), dtypes)
+        )
+    except Exception as e:
+        logging.error(f"Errore durante il recupero dello storico ETF: {e}")
+        return pages_to_frame([], dtypes)
+
+def iter_transactions(columns=tuple(TRANSACTION_DTYPES), tickers=None, start=None, end=None,
+                      page_size=PAGE_SIZE):
+    """
+    Generatore a pagine sulla tabella "transaction", ordinata per data operazione.
+    Parametri:
+        columns (tuple): Colonne da selezionare
+        tickers (list): Ticker da includere (default: tutti)
+        start, end (str | date): Finestra temporale inclusa su "data_operazione"
+    Ritorna:
+        generator: Liste di dizionari, una per pagina
+    """
+    return iter_pages(
+        "transaction", columns,
+        order=["data_operazione", "ticker", "riferimento_ordine", "protocollo"],
+        in_filters={"ticker": tickers} if tickers else None,
+        date_column="data_operazione", start=start, end=end,
+        page_size=page_size
+    )
+
+def get_transactions_frame(columns=tuple(TRANSACTION_DTYPES), tickers=None, start=None, end=None):
+    """
+    Recupera le transazioni come DataFrame tipizzato, leggendo a pagine.
+    Parametri:
+        columns (tuple): Colonne da selezionare (chiavi di TRANSACTION_DTYPES)
+        tickers (list): Ticker da includere (default: tutti)
+        start, end (str | date): Finestra temporale inclusa
+    Ritorna:
+        DataFrame: Transazioni con colonne tipizzate (non va modificato in place)
+    """
+    columns = tuple(columns)
+    tickers = tuple(sorted(tickers)) if tickers else None
+    dtypes = {column: TRANSACTION_DTYPES.get(column, "object") for column in columns}
+    try:
+        return query_cache.get_or_load(
+            ("transaction", columns, tickers, str(start), str(end)),
+            lambda: pages_to_frame(iter_transactions(columns, tickers, start, end), dtypes)
+        )
+    except Exception as e:
+        logging.error(f"Errore durante il recupero delle transazioni: {e}")
+        return pages_to_frame([], dtypes)
+
+def get_history_sync_state(ticker):
+    """
+    Recupera lo stato dello storico salvato per un ticker con due richieste leggere
+    (prima e ultima data, più il conteggio delle righe).
+    
+    Parametri:
+        ticker (str): Il ticker dell'ETF
+    Ritorna:
+        dict: {"first_date", "last_date", "rows"} con date di tipo date
+        None: Se non ci sono dati salvati o in caso di errore
+    """
+    try:
+        last = (
+            get_supabase().table("etf_price_history")
+            .select("date", count="exact")
+            .eq("ticker", ticker)
+            .order("date", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if not last.data:
+            return None
+        first = (
+            get_supabase().table("etf_price_history")
+            .select("date")
+            .eq("ticker", ticker)
+            .order("date")
+            .limit(1)
+            .execute()
+        )
+        return {
+            "first_date": pd.Timestamp(first.data[0]["date"]).date(),
+            "last_date": pd.Timestamp(last.data[0]["date"]).date(),
+            "rows": last.count
+        }
+    except Exception as e:
+        logging.error(f"Errore durante il recupero dello stato storico per {ticker}: {e}")
+        return None
+
 def get_etf_history():
     """
     Recupera lo storico dei prezzi degli ETF dal database Supabase.
+    La lettura è paginata, quindi non viene troncata dal limite di PostgREST.
     
     Ritorna:
         list: Lista di dizionari contenenti lo storico per ETF
     """
     try:
-        response = supabase.table("etf_price_history").select("*").execute()
-        return response.data
+        rows = query_cache.get_or_load(
+            ("etf_price_history",),
+            lambda: [row for page in iter_etf_history(columns="*") for row in page]
+        )
+        return list(rows)
     except Exception as e:
         logging.error(f"Errore durante il recupero dello storico ETF: {e}")
         return []      
@@ -303,8 +586,7 @@ def get_prezzo_medio_acquisto():
         list: Lista di dizionari contenenti il prezzo medio di acquisto per ETF
     """
     try:
-        response = supabase.table("v_portfolio_positions").select("*").execute()
-        return response.data
+        return _cached_select("v_portfolio_positions")
     except Exception as e:
         logging.error(f"Errore durante il recupero del prezzo medio di acquisto: {e}")
         return []   
@@ -324,40 +606,65 @@ def insert_update_etf_price(ticker, price):
             "ticker": ticker,
             "price": price
         }
-        response = supabase.table("etf_prices").upsert(
+        response = get_supabase().table("etf_prices").upsert(
             data, 
             on_conflict="ticker"
         ).execute()
+        invalidate_table("etf_prices")
         return response
     except Exception as e:
         logging.error(f"Errore durante l'inserimento/aggiornamento del prezzo per {ticker}: {e}")
         return None
     
+def insert_update_etf_prices(prices):
+    """
+    Inserisce o aggiorna i prezzi di più ETF nella tabella "etf_prices"
+    con un unico upsert.
+    
+    Parametri:
+        prices (dict): Dizionario ticker -> prezzo corrente
+    Ritorna:
+        response: Risultato dell'operazione di upsert, None in caso di errore
+    """
+    if not prices:
+        return None
+    try:
+        batch_data = [{"ticker": ticker, "price": float(price)} for ticker, price in prices.items()]
+        response = get_supabase().table("etf_prices").upsert(
+            batch_data,
+            on_conflict="ticker"
+        ).execute()
+        invalidate_table("etf_prices")
+        return response
+    except Exception as e:
+        logging.error(f"Errore durante l'aggiornamento massivo dei prezzi: {e}")
+        return None
+    
 def insert_etf_history(history_df):
     """
-    Inserisce lo storico dei prezzi di un ETF nella tabella "etf_price_history".
+    Inserisce lo storico dei prezzi di un ETF nella tabella "etf_price_history",
+    insieme ai dividendi staccati (0 nei giorni senza stacco).
     
     Parametri:
-        ticker (str): Il ticker dell'ETF
-        history_df (DataFrame): DataFrame contenente lo storico dei prezzi con colonne 'date' e 'close'
+        history_df (DataFrame): Storico con colonne 'ticker', 'date', 'close' e opzionalmente 'dividends'
     Ritorna:
         response: Risultato dell'operazione di insert
     """
     try:
-        batch_data = []
-        for _, row in history_df.iterrows():
-            data = {
-                "ticker": row['ticker'],
-                "date": row['date'].strftime("%Y-%m-%d"),
-                "close": row['close']
-            }
-            batch_data.append(data)
+        dividends = history_df['dividends'] if 'dividends' in history_df.columns else 0.0
+        batch_data = pd.DataFrame({
+            "ticker": history_df['ticker'].astype(str),
+            "date": pd.to_datetime(history_df['date']).dt.strftime("%Y-%m-%d"),
+            "close": history_df['close'].astype(float),
+            "dividends": pd.Series(dividends, index=history_df.index).fillna(0.0).astype(float)
+        }).to_dict('records')
         
         if batch_data:
-            response = supabase.table("etf_price_history").upsert(
+            response = get_supabase().table("etf_price_history").upsert(
                 batch_data, 
                 on_conflict="ticker, date, close"
             ).execute()
+            invalidate_table("etf_price_history")
             return response
     except Exception as e:
         logging.error(f"Errore durante l'inserimento dello storico")
@@ -367,10 +674,11 @@ def insert_update_etf_transaction(nuova_transazione):
     Inserisce o aggiorna il prezzo
     """
     try:
-        response = supabase.table("transaction").upsert(
+        response = get_supabase().table("transaction").upsert(
         nuova_transazione, 
             on_conflict="data_operazione, ticker, riferimento_ordine, protocollo"
         ).execute()
+        invalidate_table("transaction")
         return response
     except Exception as e:
         logging.error(f"Errore durante l'inserimento/aggiornamento del prezzo")
@@ -412,7 +720,7 @@ if __name__ == "__main__":
     print("Test inserimento holdings su etf_holdings...")
     #insert_results = insert_holdings(test_etf_ticker, test_holdings)
     response = (
-        supabase.table("etf_holdings")
+        get_supabase().table("etf_holdings")
         .select("*")
         .eq("etf_ticker", "CSPX")
         .execute()
@@ -420,7 +728,7 @@ if __name__ == "__main__":
     if len(response.data) > 0:
         print("Dati holdings trovati:")
         response = (
-            supabase.table("etf_holdings")
+            get_supabase().table("etf_holdings")
             .delete()
             .eq("etf_ticker", "CSPX")
             .execute()
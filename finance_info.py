@@ -1,76 +1,274 @@
-import yfinance as yf
 from datetime import datetime
+import threading
 import pandas as pd
-import streamlit as st
 import numpy as np
+from config import SYMBOL_CACHE_FILE, SYMBOL_CACHE_TTL, SYMBOL_CACHE_NEGATIVE_TTL, PRICE_STORE_DIR, FX_STORE_DIR
+from config import ANALYTICS_CACHE_TTL, ANALYTICS_CACHE_MAX_ENTRIES, DATA_STAMP_FILE
+from symbol_resolver import SymbolResolver
+from price_store import PriceStore
+from query_cache import QueryCache, FileStamp
+from market_data import period_start
 
-def aggiorna_prezzi_eft():
+# Simbolo Yahoo funzionante per ogni ticker, salvato su disco
+symbol_resolver = SymbolResolver(SYMBOL_CACHE_FILE, SYMBOL_CACHE_TTL, SYMBOL_CACHE_NEGATIVE_TTL)
+# Copia locale a colonne dello storico prezzi, usata dalle analisi
+price_store = PriceStore(PRICE_STORE_DIR)
+# Cambi giornalieri verso la valuta base, un "ticker" per valuta
+fx_store = PriceStore(FX_STORE_DIR)
+# Risultati delle analisi, con chiave che include l'ultima data di ogni ticker
+analytics_cache = QueryCache(ttl=ANALYTICS_CACHE_TTL, max_entries=ANALYTICS_CACHE_MAX_ENTRIES,
+                             stamp=FileStamp(DATA_STAMP_FILE))
+
+def _download_last_close(symbols):
+    """
+    Scarica in un'unica richiesta l'ultima chiusura di più simboli.
+    
+    Args:
+        symbols (dict): simbolo Yahoo -> ticker base
+    
+    Returns:
+        dict: ticker -> prezzo, None se il download non è riuscito
+    """
+    from market_data import get_provider
+    try:
+        close = get_provider().download_close(list(symbols), period="5d")
+    except Exception as e:
+        print(f"⚠️  Download prezzi non riuscito: {str(e)}")
+        return None
+    if close is None or close.empty:
+        return {}
+    
+    last_close = close.ffill().iloc[-1].dropna()
+    return {
+        symbols[symbol]: float(price)
+        for symbol, price in last_close.items()
+        if symbol in symbols and price != 0
+    }
+
+def get_etf_prices(tickers, suffixes=('.MI', '.DE')) -> dict:
+    """
+    Recupera l'ultimo prezzo di chiusura di più ETF con download multi-simbolo.
+    I ticker con simbolo già risolto vengono scaricati tutti insieme; gli altri
+    vengono cercati un suffisso alla volta (tutti i mancanti di .MI insieme su .DE).
+    
+    Args:
+        tickers (list): Ticker base degli ETF (es: ['CSPXJ', 'EIMI'])
+        suffixes (tuple): Suffissi di borsa da provare in ordine
+    
+    Returns:
+        dict: ticker -> prezzo per i ticker trovati
     """
-    Aggiorna i prezzi correnti di tutti gli ETF
+    prices = {}
+    pending = []
+    cached_symbols = {}
+    for ticker in dict.fromkeys(tickers):
+        symbols, cached = symbol_resolver.candidates(ticker, suffixes)
+        if not cached:
+            pending.append(ticker)
+        elif symbols:
+            cached_symbols[symbols[0]] = ticker
+    
+    download_ok = True
+    if cached_symbols:
+        found = _download_last_close(cached_symbols)
+        download_ok = found is not None
+        prices.update(found or {})
+        for ticker in cached_symbols.values():
+            if ticker not in prices and download_ok:
+                # Il simbolo salvato non risponde più: lo ricerco da capo
+                symbol_resolver.forget(ticker)
+                pending.append(ticker)
+    
+    for suffix in suffixes:
+        if not pending:
+            break
+        found = _download_last_close({f"{ticker}{suffix}": ticker for ticker in pending})
+        if found is None:
+            download_ok = False
+            continue
+        for ticker, price in found.items():
+            prices[ticker] = price
+            symbol_resolver.store(ticker, f"{ticker}{suffix}")
+        pending = [ticker for ticker in pending if ticker not in found]
+    
+    # Esito negativo solo se le richieste sono andate a buon fine
+    if download_ok:
+        for ticker in pending:
+            symbol_resolver.store(ticker, None)
+    return prices
+
+def refresh_etf_prices(tickers=None) -> dict:
     """
-    from database import get_etf_list, insert_update_etf_price
-    from finance_info import get_etf_price
+    Aggiorna i prezzi correnti degli ETF con un download batch e un unico
+    upsert su "etf_prices", senza interagire con l'interfaccia.
+    
+    Args:
+        tickers (list): Ticker da aggiornare (default: tutti quelli in portafoglio)
+    
+    Returns:
+        dict: {"updated": {ticker: prezzo}, "failed": {ticker: motivo}, "seconds": durata}
+    """
+    from database import get_etf_list, insert_update_etf_prices
     import logging
+    import time
     
     logger = logging.getLogger(__name__)
-    logger.info("Inizio aggiornamento prezzi ETF")
+    started = time.perf_counter()
+    if tickers is None:
+        tickers = [etf.get('etf_ticker') if isinstance(etf, dict) else etf for etf in get_etf_list()]
+    logger.info(f"Trovati {len(tickers)} ETF da aggiornare")
     
-    etf_list = get_etf_list()
-    logger.info(f"Trovati {len(etf_list)} ETF da aggiornare")
+    prices = get_etf_prices(tickers)
+    failed = {ticker: "Prezzo non disponibile" for ticker in tickers if ticker not in prices}
     
-    success_count = 0
-    for etf in etf_list:
-        etf_ticker = etf.get('etf_ticker') if isinstance(etf, dict) else etf
-        logger.debug(f"Elaborazione ETF: {etf_ticker}")
-        
-        price = get_etf_price(etf_ticker)
-        if price is not None:
-            response = insert_update_etf_price(etf_ticker, price)
-            if response is not None:
-                logger.info(f"Prezzo aggiornato: {etf_ticker} = {price}")
-                success_count += 1
-            else:
-                st.error(f"❌ Impossibile aggiornare il prezzo per {etf_ticker}")
-                logger.error(f"Errore DB per {etf_ticker}")
-        else:
-            st.error(f"❌ Impossibile recuperare il prezzo per {etf_ticker}")
-            logger.warning(f"Prezzo non disponibile per {etf_ticker}")
+    if prices and insert_update_etf_prices(prices) is None:
+        failed.update({ticker: "Errore DB" for ticker in prices})
+        prices = {}
+    
+    report = {"updated": prices, "failed": failed, "seconds": time.perf_counter() - started}
+    logger.info(f"Aggiornamento completato: {len(prices)}/{len(tickers)} successi in {report['seconds']:.1f}s")
+    return report
+
+def aggiorna_prezzi_eft():
+    """
+    Aggiorna i prezzi correnti di tutti gli ETF e mostra l'esito
+    """
+    import streamlit as st
+    from data_manager import load_session_data, apply_session_data
+    from scheduler import run_job, JobAlreadyRunning
+    
+    # Stesso lock e stato del job "prices" dello scheduler in background
+    try:
+        stato = run_job("prices")
+    except JobAlreadyRunning:
+        st.info("⏳ Aggiornamento prezzi già in corso, riprova tra poco")
+        return
+    if stato["status"] == "error":
+        st.error(f"❌ Aggiornamento prezzi fallito: {stato['error']}")
+        return
+    report = stato["detail"]
     
-    st.success(f"✅ Prezzi aggiornati")
-    st.rerun()
-    logger.info(f"Aggiornamento completato: {success_count}/{len(etf_list)} successi")
+    # Le viste dipendono dai prezzi: ricarico subito i dati della sessione
+    dati_sessione, report_sessione = load_session_data()
+    apply_session_data(st.session_state, dati_sessione, report_sessione)
+    falliti = [key for key, info in report_sessione.items() if info["error"]]
+    if falliti:
+        st.warning(f"⚠️ Dati non aggiornati: {', '.join(falliti)}")
     
-def get_all_etf_history(ticker: str, interval: str = "1d") -> pd.DataFrame:
+    for ticker, motivo in report["failed"].items():
+        st.error(f"❌ Impossibile aggiornare il prezzo per {ticker}: {motivo}")
+    st.success(f"✅ Prezzi aggiornati: {report['updated']} ETF in {stato['seconds']:.1f}s")
+    if not report["failed"]:
+        st.rerun()
+    
+def history_needs_backfill(state) -> bool:
+    """
+    Controlla se lo storico salvato ha buchi da colmare confrontando le righe
+    presenti con i giorni lavorativi tra la prima e l'ultima data.
+    
+    Args:
+        state: Stato ritornato da database.get_history_sync_state
+    
+    Returns:
+        bool: True se mancano più giorni di quanti ne spieghino le festività
+    """
+    from config import HISTORY_GAP_TOLERANCE
+    
+    expected = np.busday_count(state["first_date"], state["last_date"]) + 1
+    return state["rows"] < expected * HISTORY_GAP_TOLERANCE
+
+def _resolve_history_symbol(ticker, symbols, interval):
+    """
+    Primo simbolo con quotazioni nell'ultimo mese, salvato nel resolver.
+    L'esito negativo viene salvato solo se nessuna richiesta è fallita per errori di rete.
+    
+    Returns:
+        str: Simbolo Yahoo, None se nessuna borsa quota il ticker
+    """
+    from market_data import get_provider
+    network_error = False
+    for symbol in symbols:
+        try:
+            history = get_provider().history(symbol, period="1mo", interval=interval)
+        except Exception as e:
+            print(f"❌ Errore {symbol}: {str(e)}")
+            network_error = True
+            continue
+        if history is not None and not history.empty:
+            symbol_resolver.store(ticker, symbol)
+            return symbol
+    if not network_error:
+        symbol_resolver.store(ticker, None)
+    return None
+
+def get_all_etf_history(ticker: str, interval: str = "1d", incremental: bool = False) -> pd.DataFrame:
     """
-    Recupera lo storico COMPLETO prezzi (e dividendi) da Yahoo Finance
+    Recupera lo storico prezzi (e dividendi) da Yahoo Finance
     provando prima .MI, poi .DE, poi senza suffix.
+    In modalità incrementale scarica solo le barre successive all'ultima
+    data salvata; se lo storico salvato ha buchi lo riscarica per intero.
     
     Args:
         ticker: Base ticker (es: 'CSPX', 'EIMI')
         interval: es. '1d', '1wk', '1mo'
+        incremental: Se True scarica e salva solo le barre mancanti
     
     Returns:
         DataFrame con colonne: ['ticker','date','close','dividends']
+        (in modalità incrementale solo le nuove righe)
     """
+    from market_data import get_provider
+    start = None
+    last_date = None
+    if incremental and interval == "1d":
+        from database import get_history_sync_state
+        state = get_history_sync_state(ticker)
+        if state is not None and history_needs_backfill(state):
+            print(f"🕳️ Storico di {ticker} incompleto ({state['rows']} righe), riscarico tutto")
+        elif state is not None:
+            last_date = state["last_date"]
+            start = last_date + pd.Timedelta(days=1)
+            # Nessun giorno lavorativo dopo l'ultima barra salvata: niente da scaricare
+            if np.busday_count(start, datetime.now().date() + pd.Timedelta(days=1)) == 0:
+                print(f"✅ Storico di {ticker} già aggiornato al {last_date}")
+                return pd.DataFrame(columns=["ticker", "date", "close", "dividends"])
+
     # Lista di suffix da provare (in ordine di priorità)
-    suffixes = ['.MI', '.DE', '.L', '.AS']  # Aggiunto .L (London), .AS (Amsterdam)
+    suffixes = ['.MI', '.DE', '.L', '.AS', None]  # .L (London), .AS (Amsterdam), None per ticker "puro"
+    symbols, cached = symbol_resolver.candidates(ticker, suffixes)
+    if start is not None and not cached:
+        # Nessuna barra nuova (festivo, mercato non ancora aperto) non dice se il
+        # simbolo esiste, e un'altra borsa aggiungerebbe i prezzi di un altro
+        # listino: prima si sceglie la borsa su dati esistenti, poi si scarica
+        symbol = _resolve_history_symbol(ticker, symbols, interval)
+        if symbol is None:
+            print(f"💥 Nessun ticker valido trovato per '{ticker}'")
+            return pd.DataFrame(columns=["ticker", "date", "close", "dividends"])
+        symbols, cached = [symbol], True
+    network_error = False
     
-    for suffix in suffixes + [None]:  # + None per ticker "puro"
+    for full_ticker in symbols:
         try:
-            full_ticker = f"{ticker}{suffix}" if suffix else ticker
             print(f"🔍 Provo ticker: {full_ticker}")
             
-            etf = yf.Ticker(full_ticker)
-            history = etf.history(
+            history = get_provider().history(
+                full_ticker,
+                start=start.strftime("%Y-%m-%d") if start is not None else None,
                 period="max",
-                interval=interval,
-                auto_adjust=False
+                interval=interval
             )
 
             if history is None or history.empty:
+                if cached and start is not None:
+                    # Simbolo noto ma nessuna barra nuova: niente da aggiungere
+                    print(f"📭 Nessuna nuova barra per {full_ticker}")
+                    return pd.DataFrame(columns=["ticker", "date", "close", "dividends"])
                 print(f"📭 Nessun dato per {full_ticker}, passo al successivo...")
                 continue  # Prova prossimo suffix invece di return
 
+            if not cached:
+                symbol_resolver.store(ticker, full_ticker)
+
             history = history.reset_index()
             
             df = pd.DataFrame({
@@ -80,21 +278,40 @@ def get_all_etf_history(ticker: str, interval: str = "1d") -> pd.DataFrame:
                 "dividends": history["Dividends"].fillna(0.0)  # Colonna corretta
             }).dropna(subset=["close"])  # Rimuovi righe senza prezzo
             
+            if last_date is not None:
+                # Yahoo può restituire l'ultima barra già salvata: tengo solo le nuove
+                df = df[df["date"] > last_date]
+            
             print(f"✅ Dati trovati per {full_ticker}: {len(df)} righe")
             
+            # Aggiorna l'archivio locale: per intero, o in coda se è allineato al DB
+            if start is None:
+                price_store.replace(ticker, df)
+            elif price_store.last_date(ticker) == last_date:
+                price_store.append(ticker, df)
+            
             # Salva in DB (opzionale)
-            try:
-                from database import insert_etf_history
-                insert_etf_history(df)
-            except Exception as db_e:
-                print(f"⚠️ Errore DB per {ticker}: {str(db_e)}")
+            if not df.empty:
+                try:
+                    from database import insert_etf_history
+                    insert_etf_history(df)
+                except Exception as db_e:
+                    print(f"⚠️ Errore DB per {ticker}: {str(db_e)}")
             
             return df
             
         except Exception as e:
             print(f"❌ Errore {full_ticker}: {str(e)}")
+            network_error = True
             continue  # Prova prossimo suffix
     
+    if cached and symbols and not network_error:
+        # Il simbolo salvato non funziona più: lo dimentico e riprovo tutte le borse
+        symbol_resolver.forget(ticker)
+        return get_all_etf_history(ticker, interval=interval, incremental=incremental)
+    if not cached and not network_error and start is None:
+        symbol_resolver.store(ticker, None)
+    
     # Se nessuno funziona
     print(f"💥 Nessun ticker valido trovato per '{ticker}'")
     return pd.DataFrame(columns=["ticker", "date", "close", "dividends"])
@@ -103,6 +320,7 @@ def calculate_CAGR():
     """
     Calcola il CAGR del portafoglio con calcolo corretto degli anni.
     """
+    import streamlit as st
     print("🚀 Inizio calcolo CAGR...")
     
     import pandas as pd
@@ -151,62 +369,175 @@ def calculate_CAGR():
     return cagr * 100
 
 
-def calculate_twr_monthly() -> float:
+# Valorizzazione giornaliera riusata tra le chiamate e aggiornata in coda,
+# condivisa da tutte le sessioni Streamlit del processo
+_portfolio_valuation = None
+_portfolio_valuation_lock = threading.Lock()
+
+def get_portfolio_valuation():
+    """
+    Valorizzazione giornaliera del portafoglio: quote ricostruite dalla tabella
+    "transaction" e valutate con i prezzi dell'archivio locale.
+    Alle chiamate successive vengono calcolati solo i nuovi giorni, se possibile.
+    
+    Returns:
+        PortfolioValuation: Serie di NAV, flussi, posizioni e rendimenti giornalieri
+    """
+    global _portfolio_valuation
+    from database import get_transactions_frame
+    from portfolio import prepare_trades, PortfolioValuation
+    
+    transactions = get_transactions_frame(
+        columns=("ticker", "tipo_operazione", "data_operazione", "quantita", "importo_euro",
+                 "importo_divisa", "divisa")
+    )
+    trades = prepare_trades(fill_base_amounts(transactions))
+    tickers = sorted(trades["ticker"].unique())
+    prices = load_close_prices(tickers) if tickers else pd.DataFrame()
+    
+    with _portfolio_valuation_lock:
+        if _portfolio_valuation is None:
+            _portfolio_valuation = PortfolioValuation(trades, prices)
+        else:
+            _portfolio_valuation.update(trades, prices)
+        valuation = _portfolio_valuation
+    if valuation.missing_tickers:
+        print(f"⚠️ Ticker senza storico prezzi esclusi: {valuation.missing_tickers}")
+    return valuation
+
+def calculate_twr(freq: str = "M") -> pd.Series:
     """
-    Calcola il TWR mensile dato una serie di cash flow e valori di portafoglio.
+    Calcola il TWR (time-weighted return) del portafoglio per periodo.
     
     Args:
-        cash_flows (pd.Series): Serie di cash flow mensili (positivi per depositi, negativi per prelievi)
-        values (pd.Series): Serie dei valori di portafoglio alla fine di ogni mese
+        freq (str): 'D' giornaliero, 'M' mensile, 'Y' annuale
     
     Returns:
-        float: TWR mensile in percentuale
+        pd.Series: TWR di ogni periodo in percentuale
     """
-    from database import get_etf_transaction_updated, get_etf_history
+    return get_portfolio_valuation().twr(freq) * 100
+
+def calculate_twr_monthly() -> pd.Series:
+    """
+    Calcola il TWR mensile del portafoglio dalla valorizzazione giornaliera,
+    neutralizzando l'effetto di versamenti e acquisti.
     
-    transactions = get_etf_transaction_updated()
-    etf_history = get_etf_history() 
-    min_data_acquisto = transactions['data_operazione'].min()
-    return 1 * 100  # Ritorna in percentuale  
-def get_etf_price(ticker):
+    Returns:
+        pd.Series: TWR di ogni mese in percentuale, indicizzato per fine mese
+    """
+    return calculate_twr("M")
+
+def calculate_xirr() -> pd.Series:
+    """
+    Calcola il rendimento money-weighted (XIRR) di ogni ETF e dell'intero
+    portafoglio dai flussi "importo_euro" / "data_operazione" della tabella
+    "transaction" (acquisti, vendite e dividendi, vedi XIRR_OPERAZIONI), più il
+    valore di mercato attuale come flusso finale.
+    Tutti i ticker e il portafoglio vengono risolti insieme; il risultato resta
+    in cache finché non cambiano transazioni o prezzi.
+    
+    Returns:
+        pd.Series: XIRR annuo in percentuale per ticker, più la voce 'Portafoglio'
+    """
+    from config import XIRR_OPERAZIONI
+    from database import get_transactions_frame, get_prezzo_medio_acquisto
+    from metrics import xirr_batch
+    
+    transactions = fill_base_amounts(get_transactions_frame(
+        columns=("ticker", "tipo_operazione", "data_operazione", "importo_euro", "importo_divisa", "divisa")
+    ))
+    # Solo acquisti, vendite e dividendi degli strumenti negoziati (che hanno un
+    # valore di mercato finale): i bonifici importati da Directa hanno ticker "0"
+    tipo = transactions["tipo_operazione"].astype(str).str.lower()
+    traded = transactions.loc[tipo.str.contains("acquisto|vendita"), "ticker"].dropna().astype(str).unique()
+    flows = transactions[
+        transactions["ticker"].astype(str).isin(traded)
+        & tipo.str.contains("|".join(XIRR_OPERAZIONI))
+        & transactions["importo_euro"].notna()
+    ]
+    positions = get_prezzo_medio_acquisto()
+    market_values = {
+        str(row["ticker"]): float(row.get("quantita") or 0) * float(row.get("price") or 0)
+        for row in positions
+    }
+    today = pd.Timestamp(datetime.now().date())
+    key = (
+        "xirr", len(flows), str(flows["data_operazione"].max()), float(flows["importo_euro"].sum()),
+        tuple(sorted(market_values.items())), str(today)
+    )
+    
+    def compute():
+        tickers = flows["ticker"].astype(str).to_numpy()
+        dates = flows["data_operazione"].to_numpy()
+        amounts = flows["importo_euro"].to_numpy(dtype=np.float64)
+        cash_flows = {}
+        for ticker in sorted(set(tickers)):
+            selected = tickers == ticker
+            cash_flows[ticker] = (
+                np.append(dates[selected], today.to_datetime64()),
+                np.append(amounts[selected], market_values.get(ticker, 0.0))
+            )
+        cash_flows["Portafoglio"] = (
+            np.append(dates, today.to_datetime64()),
+            np.append(amounts, sum(market_values.values()))
+        )
+        return xirr_batch(cash_flows) * 100
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_etf_price(ticker, isin=None):
     """
     Recupera il prezzo corrente di un ETF da Yahoo Finance.
     Prova prima con il suffisso .MI (mercato italiano), se non disponibile prova con .DE (mercato tedesco).
+    Il simbolo funzionante viene salvato, quindi le chiamate successive fanno una sola richiesta.
     
     Args:
         ticker (str): Il ticker dell'ETF (es: 'CSPXJ', 'EIMI', etc.)
+        isin (str): ISIN dell'ETF, usato come chiave aggiuntiva del simbolo salvato
     
     Returns:
         float: Il prezzo corrente dell'ETF
         None: Se l'ETF non esiste su nessun mercato o si verifica un errore
     """
+    from market_data import get_provider
     suffixes = ['.MI', '.DE']  # Prova prima .MI, poi .DE
+    symbols, cached = symbol_resolver.candidates(ticker, suffixes, isin)
+    network_error = False
     
-    for suffix in suffixes:
+    for full_ticker in symbols:
         try:
-            full_ticker = ticker + suffix
-            etf = yf.Ticker(full_ticker)
+            provider = get_provider()
             
             # Tenta di ottenere il prezzo corrente
-            info = etf.info
+            info = provider.info(full_ticker)
             
             # Prova diverse chiavi per il prezzo corrente
             price = info.get('currentPrice') or info.get('regularMarketPrice')
             
             if price is None or price == 0:
                 # Se non trova currentPrice, prova con i dati storici più recenti
-                hist = etf.history(period='1d')
+                hist = provider.history(full_ticker, period='1d')
                 if not hist.empty:
                     price = hist['Close'].iloc[-1]
             
             # Se il prezzo è trovato, ritorna
             if price is not None and price != 0:
+                if not cached:
+                    symbol_resolver.store(ticker, full_ticker, isin)
                 return price
         
         except Exception as e:
-            print(f"⚠️  {ticker}{suffix} non disponibile: {str(e)}")
+            print(f"⚠️  {full_ticker} non disponibile: {str(e)}")
+            network_error = True
             continue  # Passa al suffisso successivo
     
+    if cached and symbols and not network_error:
+        # Il simbolo salvato non funziona più: lo dimentico e riprovo tutte le borse
+        symbol_resolver.forget(ticker, isin)
+        return get_etf_price(ticker, isin)
+    if not cached and not network_error:
+        symbol_resolver.store(ticker, None, isin)
+    
     print(f"❌ Errore: {ticker} non trovato su nessun mercato (.MI e .DE)")
     return None
 
@@ -221,9 +552,9 @@ def get_etf_info(ticker):
     Returns:
         dict: Dizionario con informazioni sull'ETF (nome, prezzo, valuta, etc.)
     """
+    from market_data import get_provider
     try:
-        etf = yf.Ticker(ticker)
-        info = etf.info
+        info = get_provider().info(ticker)
         
         return {
             'ticker': ticker,
@@ -239,44 +570,266 @@ def get_etf_info(ticker):
         print(f"❌ Errore nel recupero delle informazioni per {ticker}: {str(e)}")
         return None
 
+def base_ticker(ticker: str) -> str:
+    """Ticker senza suffisso di borsa (es: 'VWCE.MI' -> 'VWCE')."""
+    return ticker.split('.')[0].upper()
+
+def sync_price_store(tickers=None) -> dict:
+    """
+    Allinea l'archivio locale allo storico su Supabase ("etf_price_history"),
+    leggendo solo le date successive all'ultima salvata localmente.
+    
+    Args:
+        tickers (list): Ticker base da allineare (default: tutti quelli in portafoglio)
+    
+    Returns:
+        dict: ticker -> numero di righe aggiunte
+    """
+    from database import iter_etf_history, pages_to_frame, HISTORY_DTYPES, get_etf_list
+    
+    if tickers is None:
+        tickers = [str(etf['etf_ticker']) for etf in get_etf_list()]
+    tickers = [base_ticker(ticker) for ticker in tickers]
+    if not tickers:
+        return {}
+    
+    last_dates = [price_store.last_date(ticker) for ticker in tickers]
+    start = None
+    if all(last_dates):
+        start = min(last_dates) + pd.Timedelta(days=1)
+    
+    try:
+        history = pages_to_frame(
+            iter_etf_history(columns=tuple(HISTORY_DTYPES), tickers=tickers, start=start),
+            HISTORY_DTYPES
+        )
+    except Exception as e:
+        print(f"⚠️ Errore durante l'allineamento dell'archivio prezzi: {e}")
+        return {}
+    
+    added = {}
+    for ticker, rows in history.groupby("ticker", observed=True):
+        added[str(ticker)] = price_store.append(str(ticker), rows)
+    return added
+
+def _ensure_in_store(tickers):
+    """Allinea da Supabase solo i ticker assenti dall'archivio locale."""
+    missing = [ticker for ticker in tickers if price_store.last_date(ticker) is None]
+    if missing:
+        sync_price_store(missing)
+
+def load_close_prices(tickers, start=None, end=None) -> pd.DataFrame:
+    """
+    Prezzi di chiusura dall'archivio locale, una colonna per ticker base.
+    Solo i ticker mai scaricati vengono prima allineati da Supabase.
+    
+    Args:
+        tickers (list): Ticker, con o senza suffisso di borsa
+        start, end: Estremi inclusi della finestra di date
+    
+    Returns:
+        DataFrame: Indicizzato per data
+    """
+    tickers = list(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    return price_store.close_matrix(tickers, start, end)
+
+def load_dividends(tickers, start=None, end=None) -> pd.DataFrame:
+    """
+    Dividendi per quota alla data di stacco dall'archivio locale, una colonna per ticker base.
+    
+    Args:
+        tickers (list): Ticker, con o senza suffisso di borsa
+        start, end: Estremi inclusi della finestra di date
+    
+    Returns:
+        DataFrame: Indicizzato per data, 0 nei giorni senza stacco
+    """
+    tickers = list(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    return price_store.matrix(tickers, "dividends", start, end)
+
+def refresh_fx_rates(currencies=None) -> dict:
+    """
+    Scarica i cambi giornalieri verso la valuta base e li salva nell'archivio
+    locale dei cambi, solo per le date successive all'ultima salvata.
+    
+    Args:
+        currencies (list): Valute da aggiornare (default: config.VALUTE_SUPPORTATE)
+    
+    Returns:
+        dict: valuta -> numero di giorni aggiunti
+    """
+    from config import VALUTE_SUPPORTATE, VALUTA_BASE
+    from fx import fx_symbol
+    from market_data import get_provider
+    
+    added = {}
+    for currency in currencies or VALUTE_SUPPORTATE:
+        if currency == VALUTA_BASE:
+            continue
+        last_date = fx_store.last_date(currency)
+        start = last_date + pd.Timedelta(days=1) if last_date is not None else None
+        try:
+            history = get_provider().history(
+                fx_symbol(currency, VALUTA_BASE),
+                start=start.strftime("%Y-%m-%d") if start is not None else None,
+                period="max"
+            )
+        except Exception as e:
+            print(f"❌ Errore nel download del cambio {VALUTA_BASE}/{currency}: {e}")
+            continue
+        if history is None or history.empty:
+            added[currency] = 0
+            continue
+        history = history.reset_index()
+        rates = pd.DataFrame({
+            "date": pd.DatetimeIndex(history["Date"]).tz_localize(None).normalize(),
+            "close": history["Close"]
+        }).dropna(subset=["close"])
+        added[currency] = fx_store.append(currency, rates)
+    return added
+
+def missing_fx_rates(currencies=None) -> list:
+    """
+    Valute senza cambi nell'archivio locale, da scaricare con il job "fx" dello scheduler.
+    
+    Args:
+        currencies (list): Valute da controllare (default: config.VALUTE_SUPPORTATE)
+    
+    Returns:
+        list: Valute mai scaricate, in ordine alfabetico
+    """
+    from config import VALUTE_SUPPORTATE, VALUTA_BASE
+    
+    return sorted(currency for currency in set(currencies or VALUTE_SUPPORTATE)
+                  if currency != VALUTA_BASE and fx_store.last_date(currency) is None)
+
+def load_fx_rates(currencies=None, start=None, end=None) -> pd.DataFrame:
+    """
+    Cambi giornalieri dall'archivio locale: unità di valuta per 1 unità di
+    valuta base, una colonna per valuta (la valuta base vale sempre 1).
+    Nessun download durante il rendering: le valute mai scaricate (vedi
+    missing_fx_rates) restano colonne NaN finché non gira il job "fx".
+    
+    Args:
+        currencies (list): Valute richieste (default: config.VALUTE_SUPPORTATE)
+        start, end: Estremi inclusi della finestra di date
+    
+    Returns:
+        DataFrame: Indicizzato per data
+    """
+    from config import VALUTE_SUPPORTATE, VALUTA_BASE
+    
+    currencies = sorted(set(currencies or VALUTE_SUPPORTATE) | {VALUTA_BASE})
+    foreign = [currency for currency in currencies if currency != VALUTA_BASE]
+    missing = missing_fx_rates(foreign)
+    if missing:
+        print(f"⚠️ Nessun cambio salvato per {missing}: esegui il job \"fx\"")
+    version = tuple(str(fx_store.last_date(currency)) for currency in foreign)
+    key = ("fx_rates", tuple(currencies), str(start), str(end), version)
+    
+    def compute():
+        rates = fx_store.matrix(foreign, "close", start, end)
+        rates[VALUTA_BASE] = 1.0
+        return rates[currencies].ffill()
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def amounts_to_base(amounts, dates, currencies) -> np.ndarray:
+    """
+    Converte nella valuta base importi in valute diverse, ognuno al cambio della propria data.
+    
+    Returns:
+        np.ndarray: Importi convertiti, NaN dove il cambio non è disponibile
+    """
+    from config import VALUTA_BASE
+    from fx import convert_amounts
+    
+    currencies = pd.Series(currencies, dtype=object).fillna(VALUTA_BASE).to_numpy()
+    return convert_amounts(amounts, dates, currencies, load_fx_rates(set(currencies)))
+
+def prices_to_base(prices, currencies) -> pd.DataFrame:
+    """
+    Converte nella valuta base un frame di prezzi (una colonna per ticker).
+    
+    Args:
+        prices (DataFrame): Prezzi indicizzati per data
+        currencies (dict): Ticker -> valuta di quotazione
+    """
+    from fx import convert_frame
+    
+    return convert_frame(prices, currencies, load_fx_rates(set(currencies.values())))
+
+def fill_base_amounts(transactions) -> pd.DataFrame:
+    """
+    Completa "importo_euro" per le transazioni in valuta estera che hanno solo
+    "importo_divisa", convertendolo al cambio della data operazione.
+    
+    Args:
+        transactions (DataFrame): Colonne data_operazione, importo_euro, importo_divisa, divisa
+    
+    Returns:
+        DataFrame: Copia con "importo_euro" completato
+    """
+    from config import VALUTA_BASE
+    
+    divisa = transactions["divisa"].astype(object).fillna(VALUTA_BASE)
+    missing = (
+        (transactions["importo_euro"].isna() | (transactions["importo_euro"] == 0))
+        & (divisa != VALUTA_BASE)
+        & transactions["importo_divisa"].fillna(0).ne(0)
+    )
+    if not missing.any():
+        return transactions
+    transactions = transactions.copy()
+    rows = transactions[missing]
+    converted = amounts_to_base(
+        rows["importo_divisa"].to_numpy(dtype=np.float64),
+        rows["data_operazione"].to_numpy(),
+        divisa[missing].to_numpy()
+    )
+    transactions.loc[missing, "importo_euro"] = converted
+    if np.isnan(converted).any():
+        print(f"⚠️ {int(np.isnan(converted).sum())} transazioni in valuta senza cambio: importo in euro non calcolato")
+    return transactions
+
 def get_etf_volatility(ticker: str, period: str = "10y") -> float:
     """
-    Calcola la volatilità annualizzata di un ETF basata sugli ultimi 5 anni di dati.
+    Calcola la volatilità annualizzata di un ETF sul periodo indicato,
+    leggendo i prezzi dall'archivio locale.
 
     Args:
         ticker (str): Il ticker dell'ETF (es: 'VWCE.MI').
+        period (str): Periodo di analisi (es: '10y', '6mo', 'max').
 
     Returns:
-        float: La volatilità annualizzata, o None se non è possibile calcolarla.
+        float: La volatilità annualizzata in percentuale, 0 se non è possibile calcolarla.
     """
     try:
-        # Scarica dati reali
-        data = yf.download(ticker, period=period, progress=False)
-        if data is None:
-            print(f"Nessun dato trovato per {ticker}")
-            return 0
-
-        if data.empty:
+        close = load_close_prices([ticker], start=period_start(period))
+        if close.empty:
             print(f"Nessun dato storico trovato per {ticker}")
             return 0
 
         # Calcola i ritorni giornalieri
-        returns = data['Close'].pct_change().dropna()
+        returns = close.iloc[:, 0].pct_change().dropna()
         if returns.empty:
             print(f"Non è possibile calcolare i ritorni per {ticker}")
             return 0
 
         # Calcola la volatilità annualizzata (252 giorni di trading in un anno)
         volatility = returns.std() * np.sqrt(252)
-        print(f"Volatilità reale {ticker}: {volatility[0]:.3f}")
-        return volatility[0] * 100
+        print(f"Volatilità reale {ticker}: {volatility:.3f}")
+        return volatility * 100
     except Exception as e:
         print(f"Errore durante il calcolo della volatilità per {ticker}: {e}")
         return 0
 
 def calculate_etf_correlation(ticker1: str, ticker2: str, start_date: str) -> float:
     """
-    Calcola la correlazione tra due ETF a partire da una data specifica.
+    Calcola la correlazione tra due ETF a partire da una data specifica,
+    leggendo i prezzi dall'archivio locale.
 
     Args:
         ticker1 (str): Il ticker del primo ETF (es: 'VWCE.MI').
@@ -287,20 +840,13 @@ def calculate_etf_correlation(ticker1: str, ticker2: str, start_date: str) -> fl
         float: Il coefficiente di correlazione, o None se non è possibile calcolarlo.
     """
     try:
-        # Scarica i dati storici per entrambi gli ETF
-        data1 = yf.download(ticker1, start=start_date, progress=False)
-        data2 = yf.download(ticker2, start=start_date, progress=False)
-
-        if data1.empty or data2.empty:
+        close = load_close_prices([ticker1, ticker2], start=start_date)
+        if close.shape[1] < 2 or close.dropna(how="all").empty:
             print(f"Dati non sufficienti per calcolare la correlazione tra {ticker1} e {ticker2}")
             return None
 
-        # Calcola i ritorni giornalieri
-        returns1 = data1['Close'].pct_change().dropna()
-        returns2 = data2['Close'].pct_change().dropna()
-
-        # Allinea i dati per avere le stesse date
-        returns = pd.concat([returns1, returns2], axis=1, join='inner')
+        # Ritorni giornalieri sulle sole date comuni ai due ETF
+        returns = close.dropna().pct_change().dropna()
         returns.columns = [ticker1, ticker2]
 
         if len(returns) < 2:
@@ -316,11 +862,349 @@ def calculate_etf_correlation(ticker1: str, ticker2: str, start_date: str) -> fl
     except Exception as e:
         print(f"Errore durante il calcolo della correlazione: {e}")
         return None
-print(calculate_etf_correlation('VWCE.MI', 'DFNS.MI', '2020-01-01'))
-'''# Ottenere il prezzo corrente
-prezzo = get_etf_price('CSPXJ.MI')
-print(f"Prezzo CSPXJ: €{prezzo}")
-
-# Ottenere informazioni complete
-info = get_all_etf_history('EIMI.MI')
-print(info)'''
\ No newline at end of file
+def _store_version(tickers):
+    """Ultima data salvata per ogni ticker: cambia quando arrivano nuovi prezzi."""
+    return tuple(str(price_store.last_date(ticker)) for ticker in tickers)
+
+def get_portfolio_correlation(tickers, start=None, end=None, window=None, shrinkage=0.0) -> pd.DataFrame:
+    """
+    Matrice di correlazione di tutti gli ETF del portafoglio, calcolata in
+    un'unica passata vettoriale sui prezzi dell'archivio locale.
+    Il risultato resta in cache per finestra di date finché non arrivano nuovi prezzi.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        start, end: Estremi inclusi della finestra di date
+        window (int): Se indicato, matrici su finestre mobili di `window` giorni
+        shrinkage (float | str): Peso verso l'identità in [0, 1], oppure "auto" (Ledoit-Wolf)
+    
+    Returns:
+        DataFrame: Matrice ticker x ticker, o indice (date, ticker) se window è indicato
+    """
+    from metrics import correlation_matrix, rolling_correlation_matrix
+    
+    tickers = sorted(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    key = ("correlation", tuple(tickers), str(start), str(end), window, shrinkage, _store_version(tickers))
+    
+    def compute():
+        prices = price_store.close_matrix(tickers, start, end)
+        if window:
+            return rolling_correlation_matrix(prices, window, shrinkage=shrinkage)
+        return correlation_matrix(prices, shrinkage=shrinkage)
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_total_return_index(tickers, start=None, end=None) -> pd.DataFrame:
+    """
+    Indice total return (dividendi reinvestiti) di più ETF, per confrontare
+    ETF a distribuzione e ad accumulazione a parità di condizioni.
+    Il risultato resta in cache finché non arrivano nuovi prezzi.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        start, end: Estremi inclusi della finestra di date
+    
+    Returns:
+        DataFrame: Indice base 100 alla prima quotazione della finestra, una colonna per ticker
+    """
+    from metrics import total_return_index
+    
+    tickers = sorted(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    key = ("total_return", tuple(tickers), str(start), str(end), _store_version(tickers))
+    
+    def compute():
+        close = price_store.matrix(tickers, "close", start, end)
+        dividends = price_store.matrix(tickers, "dividends", start, end)
+        return total_return_index(close, dividends)
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_distribution_income(freq: str = "M") -> pd.DataFrame:
+    """
+    Dividendi incassati dal portafoglio per mese o per anno, calcolati dalle
+    quote della valorizzazione giornaliera e dai dividendi dell'archivio locale.
+    
+    Args:
+        freq (str): 'M' mensile, 'Y' annuale
+    
+    Returns:
+        DataFrame: Importo per periodo e ticker, più la colonna 'Totale'
+    """
+    from metrics import distribution_income
+    
+    valuation = get_portfolio_valuation()
+    tickers = valuation.tickers
+    key = ("distributions", freq, tuple(tickers), str(valuation.last_date), len(valuation.trades),
+           _store_version(tickers))
+    
+    def compute():
+        dividends = price_store.matrix(tickers, "dividends")
+        income = distribution_income(valuation.positions, dividends, freq)
+        income["Totale"] = income.sum(axis=1)
+        return income
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_risk_metrics(tickers, start=None, end=None, window=None) -> pd.DataFrame:
+    """
+    Sharpe, Sortino, volatilità annualizzata e drawdown mobili (o espansivi)
+    di tutti gli ETF e del portafoglio, calcolati insieme sui rendimenti
+    giornalieri. Il risultato resta in cache per finestra e intervallo di date
+    finché non cambiano prezzi o transazioni.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        start, end: Estremi inclusi della finestra di date
+        window (int): Giorni della finestra mobile, None per espansiva
+    
+    Returns:
+        DataFrame: Colonne (metrica, ticker) con la voce 'Portafoglio' tra i ticker
+    """
+    from config import RISK_FREE_RATE
+    from metrics import risk_metrics
+    
+    tickers = sorted(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    valuation = get_portfolio_valuation()
+    key = ("risk", tuple(tickers), str(start), str(end), window, RISK_FREE_RATE,
+           _store_version(tickers), str(valuation.last_date), len(valuation.trades))
+    
+    def compute():
+        returns = price_store.close_matrix(tickers, start, end).pct_change(fill_method=None)
+        portfolio = valuation.returns
+        if start is not None:
+            portfolio = portfolio[portfolio.index >= pd.Timestamp(start)]
+        if end is not None:
+            portfolio = portfolio[portfolio.index <= pd.Timestamp(end)]
+        returns = returns.join(portfolio.rename("Portafoglio"), how="outer")
+        return risk_metrics(returns, window=window, risk_free_rate=RISK_FREE_RATE)
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_drawdowns(tickers, start=None, end=None) -> tuple:
+    """
+    Episodi di drawdown e curva underwater di tutti gli ETF e del portafoglio
+    (indice time-weighted, quindi senza l'effetto di versamenti e acquisti).
+    Il risultato resta in cache finché non cambiano prezzi o transazioni.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        start, end: Estremi inclusi della finestra di date
+    
+    Returns:
+        tuple: (episodi, underwater) come metrics.drawdown_episodes e
+            metrics.underwater_curve, con la voce 'Portafoglio' tra i ticker
+    """
+    from metrics import drawdown_episodes, underwater_curve
+    
+    tickers = sorted(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    valuation = get_portfolio_valuation()
+    key = ("drawdowns", tuple(tickers), str(start), str(end),
+           _store_version(tickers), str(valuation.last_date), len(valuation.trades))
+    
+    def compute():
+        portfolio = valuation.index()
+        if start is not None:
+            portfolio = portfolio[portfolio.index >= pd.Timestamp(start)]
+        if end is not None:
+            portfolio = portfolio[portfolio.index <= pd.Timestamp(end)]
+        values = price_store.close_matrix(tickers, start, end).join(portfolio.rename("Portafoglio"), how="outer")
+        return drawdown_episodes(values), underwater_curve(values)
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_returns_covariance(tickers, start=None, end=None) -> tuple:
+    """
+    Media e covarianza dei rendimenti logaritmici giornalieri sulle date
+    comuni a tutti i ticker, condivise da VaR e frontiera efficiente.
+    Il risultato resta in cache finché non arrivano nuovi prezzi.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        start, end: Estremi inclusi della finestra di date
+    
+    Returns:
+        tuple: (rendimenti logaritmici, media, covarianza) come DataFrame/Series per ticker
+    """
+    tickers = sorted(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    _ensure_in_store(tickers)
+    key = ("covariance", tuple(tickers), str(start), str(end), _store_version(tickers))
+    
+    def compute():
+        # I ticker senza storico restano fuori, invece di svuotare le date comuni
+        prices = price_store.close_matrix(tickers, start, end).dropna(axis=1, how="all")
+        log_returns = np.log(prices.dropna()).diff().dropna()
+        return log_returns, log_returns.mean(), log_returns.cov()
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def get_portfolio_var(confidences=(0.95, 0.99), horizon: int = 1, period: str = "3y") -> pd.DataFrame:
+    """
+    VaR ed Expected Shortfall delle posizioni attuali (quantità di
+    "v_portfolio_positions" per prezzo corrente) con i metodi storico,
+    parametrico e Monte Carlo, sui rendimenti del periodo indicato.
+    
+    Args:
+        confidences (tuple): Livelli di confidenza
+        horizon (int): Orizzonte in giorni
+        period (str): Periodo storico di stima ('1y', '3y', ...)
+    
+    Returns:
+        DataFrame: Indice (metodo, confidenza), colonne 'var' e 'cvar' in euro
+    """
+    from config import VAR_SIMULATIONS
+    from database import get_prezzo_medio_acquisto
+    from metrics import value_at_risk
+    
+    exposures = {}
+    for row in get_prezzo_medio_acquisto():
+        ticker = base_ticker(str(row["ticker"]))
+        exposures[ticker] = exposures.get(ticker, 0.0) + float(row.get("quantita") or 0) * float(row.get("price") or 0)
+    exposures = pd.Series({ticker: value for ticker, value in exposures.items() if value})
+    start = period_start(period)
+    start = start.strftime("%Y-%m-%d") if start is not None else None
+    key = ("var", tuple(exposures.round(2).items()), tuple(confidences), horizon, start,
+           VAR_SIMULATIONS, _store_version(sorted(exposures.index)))
+    
+    def compute():
+        log_returns, mean, cov = get_returns_covariance(list(exposures.index), start=start)
+        missing = sorted(set(exposures.index) - set(log_returns.columns))
+        if missing:
+            print(f"⚠️ Ticker senza storico prezzi esclusi dal VaR: {missing}")
+        return value_at_risk(log_returns, exposures, confidences, horizon,
+                             simulations=VAR_SIMULATIONS, mean=mean, cov=cov)
+    
+    return analytics_cache.get_or_load(key, compute)
+
+def _ensure_benchmark(ticker):
+    """
+    Storico del benchmark nell'archivio locale, allineato da Supabase se manca.
+    Nessun download da Yahoo durante il rendering: lo storico dei benchmark
+    (config.BENCHMARKS) viene scaricato dal job "history" dello scheduler.
+    """
+    ticker = base_ticker(ticker)
+    _ensure_in_store([ticker])
+    if price_store.last_date(ticker) is None:
+        print(f"⚠️ Nessuno storico per il benchmark {ticker}: esegui il job \"history\"")
+    return ticker
+
+def get_benchmark_returns(benchmark: str, freq: str = "Y") -> pd.Series:
+    """
+    Rendimenti total return del benchmark per periodo.
+    
+    Args:
+        benchmark (str): Ticker dell'ETF usato come benchmark (vedi config.BENCHMARKS)
+        freq (str): 'D' giornaliero, 'M' mensile, 'Y' annuale
+    
+    Returns:
+        pd.Series: Rendimento di ogni periodo (0.01 = 1%)
+    """
+    ticker = _ensure_benchmark(benchmark)
+    index = get_total_return_index([ticker])
+    if index.empty:
+        # Indice di date anche senza storico: chi chiama usa index.year
+        return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([]))
+    index = index[ticker].dropna()
+    if freq != "D":
+        # Valore a fine periodo, partendo dalla prima quotazione disponibile
+        index = pd.concat([index.iloc[:1], index.resample({"M": "ME", "Y": "YE"}[freq]).last()])
+    return index.pct_change().iloc[1:]
+
+def get_benchmark_stats(tickers, benchmark: str, start=None, end=None, window=None) -> pd.DataFrame:
+    """
+    Beta, alpha e R² di tutti gli ETF e del portafoglio rispetto al benchmark,
+    sui rendimenti giornalieri total return. Il risultato resta in cache per
+    benchmark, finestra e intervallo di date finché non cambiano prezzi o transazioni.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        benchmark (str): Ticker dell'ETF usato come benchmark
+        start, end: Estremi inclusi della finestra di date
+        window (int): Giorni della finestra mobile, None per un'unica stima sul periodo
+    
+    Returns:
+        DataFrame: Indice ticker e colonne alpha/beta/r2/observations, oppure
+            colonne (metrica, ticker) per date se window è indicato
+    """
+    from config import RISK_FREE_RATE
+    from metrics import benchmark_regression
+    
+    benchmark = _ensure_benchmark(benchmark)
+    tickers = sorted(dict.fromkeys(base_ticker(ticker) for ticker in tickers))
+    valuation = get_portfolio_valuation()
+    key = ("benchmark", benchmark, tuple(tickers), str(start), str(end), window, RISK_FREE_RATE,
+           _store_version(tickers + [benchmark]), str(valuation.last_date), len(valuation.trades))
+    
+    def compute():
+        index = get_total_return_index(tickers + [benchmark], start, end)
+        returns = index.pct_change(fill_method=None)
+        portfolio = valuation.returns
+        if start is not None:
+            portfolio = portfolio[portfolio.index >= pd.Timestamp(start)]
+        if end is not None:
+            portfolio = portfolio[portfolio.index <= pd.Timestamp(end)]
+        assets = returns[tickers].join(portfolio.rename("Portafoglio"), how="outer")
+        return benchmark_regression(assets, returns[benchmark], window=window or None,
+                                    risk_free_rate=RISK_FREE_RATE)
+    
+    return analytics_cache.get_or_load(key, compute)
+
+# Ultima frontiera calcolata per insieme di ticker, usata come punto di partenza della successiva
+_last_frontier = {}
+
+def get_efficient_frontier(tickers, period: str = "5y", max_weight: float = 1.0, points: int = 25) -> tuple:
+    """
+    Frontiera efficiente long-only degli ETF in portafoglio, con rendimenti
+    attesi e covarianza stimati sul periodo indicato, e posizione del
+    portafoglio attuale (pesi della vista "v_dist_etf").
+    Cambiando periodo il calcolo riparte dai pesi della frontiera precedente.
+    
+    Args:
+        tickers (list): Ticker degli ETF
+        period (str): Periodo storico di stima ('1y', '3y', ...)
+        max_weight (float): Peso massimo per ETF (1 = nessun limite)
+        points (int): Punti della frontiera
+    
+    Returns:
+        tuple: (frontiera, portafoglio) dove frontiera è il DataFrame di
+            metrics.efficient_frontier e portafoglio il dizionario
+            {"return", "volatility"} annui, None se i pesi non sono disponibili
+    """
+    from database import get_distribuzione_etf
+    from metrics import efficient_frontier, portfolio_point
+    
+    start = period_start(period)
+    start = start.strftime("%Y-%m-%d") if start is not None else None
+    _, mean, cov = get_returns_covariance(tickers, start=start)
+    universe = tuple(mean.index)
+    
+    pesi = pd.Series(dtype=np.float64)
+    for row in get_distribuzione_etf():
+        ticker = base_ticker(str(row["ticker"]))
+        pesi[ticker] = pesi.get(ticker, 0.0) + float(row.get("distribuzione_pct") or 0)
+    key = ("frontier", universe, start, max_weight, points, _store_version(list(universe)),
+           tuple(pesi.round(4).items()))
+    
+    def compute():
+        frontier = efficient_frontier(mean, cov, points=points, max_weight=max_weight,
+                                      warm_start=_last_frontier.get(universe))
+        _last_frontier[universe] = frontier
+        portfolio = None
+        if pesi.reindex(mean.index).fillna(0).sum() > 0:
+            rendimento, volatilita = portfolio_point(pesi, mean, cov)
+            portfolio = {"return": rendimento, "volatility": volatilita}
+        return frontier, portfolio
+    
+    return analytics_cache.get_or_load(key, compute)
+
+
+if __name__ == "__main__":
+    # Ottenere il prezzo corrente
+    prezzo = get_etf_price('CSPXJ')
+    print(f"Prezzo CSPXJ: €{prezzo}")
+
+    # Correlazione tra due ETF
+    print(calculate_etf_correlation('VWCE.MI', 'DFNS.MI', '2020-01-01'))
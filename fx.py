@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+def fx_symbol(currency, base):
+    """Simbolo Yahoo del cambio: unità di `currency` per 1 unità di `base` (es: 'EURUSD=X')."""
+    return f"{base}{currency}=X"
+
+
+def align_rates(rates, dates):
+    """
+    Cambi validi a ciascuna data: l'ultimo disponibile alla data stessa o prima
+    (weekend e festività prendono il cambio del giorno lavorativo precedente).
+
+    Args:
+        rates (DataFrame): Cambi giornalieri, una colonna per valuta
+        dates (DatetimeIndex): Date a cui allineare
+
+    Returns:
+        ndarray: Matrice date x valute, NaN prima del primo cambio disponibile
+    """
+    if rates.empty:
+        return np.full((len(dates), rates.shape[1]), np.nan)
+    rates = rates.sort_index()
+    values = rates.ffill().to_numpy(dtype=np.float64)
+    dates = pd.DatetimeIndex(dates)
+    position = np.searchsorted(rates.index.values, dates.values, side="right") - 1
+    aligned = values[np.clip(position, 0, None)]
+    aligned[(position < 0) | dates.isna()] = np.nan
+    return aligned
+
+
+def convert_frame(values, currencies, rates):
+    """
+    Converte nella valuta base un frame di prezzi o importi con un'unica
+    divisione vettoriale tra il frame e i cambi allineati per data e colonna.
+
+    Args:
+        values (DataFrame): Indicizzato per data, una colonna per strumento
+        currencies (dict | Series): Colonna -> valuta dei valori
+        rates (DataFrame): Unità di valuta per 1 unità di valuta base, una
+            colonna per valuta (la valuta base vale 1)
+
+    Returns:
+        DataFrame: Stessa forma di `values`, NaN dove manca il cambio
+    """
+    column = rates.columns.get_indexer([currencies.get(name) for name in values.columns])
+    aligned = align_rates(rates, values.index)
+    divisor = np.where(column >= 0, aligned[:, np.clip(column, 0, None)], np.nan)
+    return pd.DataFrame(values.to_numpy(dtype=np.float64) / divisor, index=values.index, columns=values.columns)
+
+
+def convert_amounts(amounts, dates, currencies, rates):
+    """
+    Converte nella valuta base importi in valute diverse, ognuno al cambio
+    della propria data, con un'unica lettura indicizzata della matrice dei cambi.
+
+    Args:
+        amounts (array): Importi nella valuta originale
+        dates (array): Data di ciascun importo
+        currencies (array): Valuta di ciascun importo
+        rates (DataFrame): Come in convert_frame
+
+    Returns:
+        ndarray: Importi nella valuta base, NaN per valute o date senza cambio
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if len(amounts) == 0:
+        return amounts
+    aligned = align_rates(rates, pd.to_datetime(pd.Series(dates)).dt.normalize())
+    column = rates.columns.get_indexer(pd.Index(np.asarray(currencies, dtype=object)))
+    rate = aligned[np.arange(len(amounts)), np.clip(column, 0, None)]
+    rate[column < 0] = np.nan
+    return amounts / rate
@@ -0,0 +1,336 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+
+import pandas as pd
+
+from config import (
+    MARKET_DATA_RATE, MARKET_DATA_BURST, MARKET_DATA_TIMEOUT, MARKET_DATA_RETRIES,
+    MARKET_DATA_BACKOFF, MARKET_DATA_BREAKER_THRESHOLD, MARKET_DATA_BREAKER_RESET,
+)
+
+
+class MarketDataError(Exception):
+    """Errore nel recupero dei dati di mercato dopo tutti i tentativi."""
+
+
+class CircuitOpenError(MarketDataError):
+    """Il provider ha fallito troppe volte di seguito: le richieste sono sospese."""
+
+
+def period_start(period: str, reference=None):
+    """
+    Data di inizio per un periodo stile yfinance ('10y', '6mo', '5d', 'max').
+
+    Args:
+        period (str): Periodo
+        reference: Data finale del periodo (default: adesso)
+    """
+    reference = pd.Timestamp(reference) if reference is not None else pd.Timestamp.now()
+    if period == "max":
+        return None
+    if period.endswith("mo"):
+        return reference - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return reference - pd.DateOffset(years=int(period[:-1]))
+    if period.endswith("d"):
+        return reference - pd.DateOffset(days=int(period[:-1]))
+    raise ValueError(f"Periodo non supportato: {period}")
+
+
+# =========================
+# Provider
+# =========================
+
+class MarketDataProvider(ABC):
+    """
+    Interfaccia comune per i dati di mercato. Per un simbolo inesistente i
+    metodi ritornano un risultato vuoto; le eccezioni indicano errori di rete.
+    """
+
+    @abstractmethod
+    def history(self, symbol, start=None, period="max", interval="1d"):
+        """
+        Storico di un simbolo, indicizzato per data, con colonne almeno
+        'Close' e 'Dividends'. Se `start` è indicato ha la precedenza su `period`.
+        """
+
+    @abstractmethod
+    def download_close(self, symbols, period="5d", interval="1d"):
+        """Prezzi di chiusura di più simboli in una richiesta, una colonna per simbolo."""
+
+    @abstractmethod
+    def info(self, symbol):
+        """Anagrafica e prezzo corrente del simbolo (dizionario stile yfinance)."""
+
+
+class YahooProvider(MarketDataProvider):
+    """Dati da Yahoo Finance tramite yfinance, con timeout sulle richieste."""
+
+    def __init__(self, timeout=MARKET_DATA_TIMEOUT):
+        self.timeout = timeout
+
+    def history(self, symbol, start=None, period="max", interval="1d"):
+        import yfinance as yf
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=str(start), interval=interval, auto_adjust=False, timeout=self.timeout)
+        return ticker.history(period=period, interval=interval, auto_adjust=False, timeout=self.timeout)
+
+    def download_close(self, symbols, period="5d", interval="1d"):
+        import yfinance as yf
+        data = yf.download(list(symbols), period=period, interval=interval, auto_adjust=False,
+                           progress=False, threads=True, timeout=self.timeout)
+        if data is None or data.empty:
+            return pd.DataFrame(columns=list(symbols))
+        close = data["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(list(symbols)[0])
+        return close
+
+    def info(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol).info or {}
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serve dati registrati da una cartella, senza rete e con latenza fissa:
+        <root>/history/<SIMBOLO>.csv   colonne Date, Close, Dividends
+        <root>/info/<SIMBOLO>.json     dizionario info
+    Un simbolo senza file si comporta come un simbolo inesistente su Yahoo.
+    """
+
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _history_path(self, symbol):
+        return os.path.join(self.root, "history", f"{symbol}.csv")
+
+    def _read_history(self, symbol):
+        path = self._history_path(symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=["Close", "Dividends"], index=pd.DatetimeIndex([], name="Date"))
+        return pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+
+    @staticmethod
+    def _window(frame, start, period):
+        # Il periodo è relativo all'ultima data registrata, non a oggi
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        if period != "max" and not frame.empty:
+            return frame[frame.index > period_start(period, frame.index[-1])]
+        return frame
+
+    def history(self, symbol, start=None, period="max", interval="1d"):
+        self._wait()
+        return self._window(self._read_history(symbol), start, period)
+
+    def download_close(self, symbols, period="5d", interval="1d"):
+        self._wait()
+        closes = {}
+        for symbol in symbols:
+            history = self._read_history(symbol)
+            if not history.empty:
+                closes[symbol] = history["Close"]
+        return self._window(pd.DataFrame(closes).sort_index(), None, period)
+
+    def info(self, symbol):
+        self._wait()
+        path = os.path.join(self.root, "info", f"{symbol}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+
+class RecordingProvider(MarketDataProvider):
+    """Inoltra le richieste a un altro provider e salva le risposte per ReplayProvider."""
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = root
+
+    def _path(self, folder, filename):
+        os.makedirs(os.path.join(self.root, folder), exist_ok=True)
+        return os.path.join(self.root, folder, filename)
+
+    def history(self, symbol, start=None, period="max", interval="1d"):
+        history = self.inner.history(symbol, start=start, period=period, interval=interval)
+        if history is not None and not history.empty:
+            frame = history[["Close", "Dividends"]].copy()
+            frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+            frame.index.name = "Date"
+            frame.to_csv(self._path("history", f"{symbol}.csv"))
+        return history
+
+    def download_close(self, symbols, period="5d", interval="1d"):
+        return self.inner.download_close(symbols, period=period, interval=interval)
+
+    def info(self, symbol):
+        info = self.inner.info(symbol)
+        if info:
+            with open(self._path("info", f"{symbol}.json"), "w") as f:
+                json.dump(info, f, default=str)
+        return info
+
+
+# =========================
+# Resilienza
+# =========================
+
+class TokenBucket:
+    """Limita le richieste a `rate` al secondo, con raffiche fino a `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Attende finché non è disponibile un gettone e lo consuma."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Dopo `threshold` errori consecutivi sospende le richieste per `reset_timeout`
+    secondi, poi lascia passare una richiesta di prova (half-open).
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("Troppi errori dal provider di dati di mercato, riprovo più tardi")
+            # Half-open: la prossima richiesta decide se richiudere il circuito
+            self._opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class ResilientProvider(MarketDataProvider):
+    """
+    Avvolge un provider con rate limiting, retry con backoff esponenziale,
+    circuit breaker e coalescenza: richieste identiche contemporanee
+    condividono un'unica chiamata al provider sottostante.
+    """
+
+    def __init__(self, inner, rate=MARKET_DATA_RATE, burst=MARKET_DATA_BURST,
+                 retries=MARKET_DATA_RETRIES, backoff=MARKET_DATA_BACKOFF,
+                 breaker_threshold=MARKET_DATA_BREAKER_THRESHOLD,
+                 breaker_reset=MARKET_DATA_BREAKER_RESET):
+        self.inner = inner
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.retries = retries
+        self.backoff = backoff
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.breaker.before_call()
+            self.limiter.acquire()
+            try:
+                result = getattr(self.inner, method)(*args, **kwargs)
+            except Exception as e:
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    raise MarketDataError(f"{method}{args}: {e}") from e
+                time.sleep(self.backoff * 2 ** attempt)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _coalesced(self, method, *args, **kwargs):
+        key = (method, tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args),
+               tuple(sorted(kwargs.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            future.set_result(self._call(method, *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return future.result()
+
+    def history(self, symbol, start=None, period="max", interval="1d"):
+        return self._coalesced("history", symbol, start=start, period=period, interval=interval)
+
+    def download_close(self, symbols, period="5d", interval="1d"):
+        return self._coalesced("download_close", list(symbols), period=period, interval=interval)
+
+    def info(self, symbol):
+        return self._coalesced("info", symbol)
+
+
+# =========================
+# Provider attivo
+# =========================
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_provider():
+    """
+    Provider usato da tutte le funzioni di finance_info. Se la variabile
+    MARKET_DATA_REPLAY_DIR è impostata i dati vengono serviti da quella cartella.
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                replay_dir = os.getenv("MARKET_DATA_REPLAY_DIR")
+                inner = ReplayProvider(replay_dir) if replay_dir else YahooProvider()
+                _provider = ResilientProvider(inner)
+    return _provider
+
+def set_provider(provider):
+    """Sostituisce il provider attivo (es. ReplayProvider per test e benchmark)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -1,9 +1,11 @@
+import numpy as np
 import pandas as pd
 
 def calculate_metrics(transactions):
     """
     Calcola metriche base per una lista di transazioni ETF.
     Ritorna un DataFrame con colonne aggiuntive: Costo, Market Value, Crescita %.
+    Per dati già a colonne (array, DataFrame, tabelle Arrow) usare PositionMetrics.
     """
     if not transactions:
         return pd.DataFrame()
@@ -11,28 +13,141 @@ def calculate_metrics(transactions):
     df = pd.DataFrame(transactions)
     
     # Assicura la presenza delle colonne necessarie
-    required_cols = ['Quantità', 'Prezzo di acquisto', 'Prezzo corrente']
-    for col in required_cols:
+    for col in ['Quantità', 'Prezzo di acquisto', 'Prezzo corrente']:
         if col not in df.columns:
             df[col] = 0
-
-    # Calcoli principali
-    df['Costo'] = df['Quantità'] * df['Prezzo di acquisto']
-    df['Market Value'] = df['Quantità'] * df['Prezzo corrente']
-    df['Crescita %'] = ((df['Market Value'] - df['Costo']) / df['Costo'] * 100).round(2)
+    
+    metrics = PositionMetrics.from_frame(df)
+    df['Costo'] = metrics.cost
+    df['Market Value'] = metrics.market_value
+    df['Crescita %'] = metrics.growth.round(2)
 
     # Formattazione data
     if 'Data acquisto' in df.columns:
         df['Data acquisto'] = pd.to_datetime(df['Data acquisto'], errors='coerce').dt.strftime('%d/%m/%Y')
 
     # Arrotondamento colonne numeriche
-    numeric_cols = ['Prezzo di acquisto', 'Prezzo corrente', 'Costo', 'Market Value']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].round(2)
+    numeric_cols = [col for col in ['Prezzo di acquisto', 'Prezzo corrente', 'Costo', 'Market Value'] if col in df.columns]
+    df[numeric_cols] = df[numeric_cols].round(2)
 
     return df
 
+def _column(data, name, length):
+    """Colonna `name` come array float64 da DataFrame, dizionario di array o tabella Arrow (0 se assente)."""
+    try:
+        values = data[name]
+    except (KeyError, IndexError):
+        return np.zeros(length)
+    if hasattr(values, "to_numpy"):
+        values = values.to_numpy()
+    return np.asarray(values, dtype=np.float64)
+
+class PositionMetrics:
+    """
+    Percorso veloce a colonne di calculate_metrics: costo, valore di mercato e
+    crescita calcolati con operazioni vettoriali su array float64, senza
+    DataFrame intermedi. Le date restano datetime64 e non vengono
+    riformattate. Il costo dipende solo dai dati di acquisto, quindi
+    update_prices ricalcola soltanto valore di mercato e crescita.
+    """
+
+    def __init__(self, quantity, purchase_price, current_price, purchase_date=None, ticker=None):
+        self.quantity = np.asarray(quantity, dtype=np.float64)
+        self.purchase_price = np.asarray(purchase_price, dtype=np.float64)
+        self.purchase_date = None if purchase_date is None else np.asarray(purchase_date, dtype="datetime64[ns]")
+        self.ticker = None if ticker is None else np.asarray(ticker, dtype=object)
+        if self.ticker is not None:
+            # Codici interi dei ticker, per aggiornare i prezzi senza confrontare stringhe
+            self._ticker_codes, self._ticker_names = pd.factorize(pd.Index(self.ticker))
+        self.cost = self.quantity * self.purchase_price
+        self.current_price = np.empty_like(self.cost)
+        self.market_value = np.empty_like(self.cost)
+        self.growth = np.empty_like(self.cost)
+        self.update_prices(current_price)
+
+    @classmethod
+    def from_frame(cls, data):
+        """
+        Crea le metriche da un DataFrame, un dizionario di array o una tabella
+        Arrow con le colonne di calculate_metrics ('Quantità', 'Prezzo di acquisto',
+        'Prezzo corrente', opzionalmente 'Data acquisto' e 'Ticker').
+        Le colonne numeriche mancanti valgono 0.
+        """
+        length = len(data) if not isinstance(data, dict) else len(next(iter(data.values()), []))
+        # Una tabella Arrow ha anche .columns (gli array), quindi column_names va controllato prima
+        if hasattr(data, "column_names"):
+            columns = list(data.column_names)
+        elif isinstance(data, dict):
+            columns = list(data.keys())
+        else:
+            columns = list(data.columns)
+        dates = None
+        if 'Data acquisto' in columns:
+            dates = pd.to_datetime(pd.Series(np.asarray(data['Data acquisto'])), errors='coerce').to_numpy()
+        return cls(
+            _column(data, 'Quantità', length),
+            _column(data, 'Prezzo di acquisto', length),
+            _column(data, 'Prezzo corrente', length),
+            purchase_date=dates,
+            ticker=np.asarray(data['Ticker'], dtype=object) if 'Ticker' in columns else None,
+        )
+
+    def update_prices(self, current_price, rows=None):
+        """
+        Aggiorna i prezzi correnti e ricalcola valore di mercato e crescita.
+
+        Args:
+            current_price (array | float): Nuovi prezzi (per tutte le righe o per `rows`)
+            rows (array): Indici o maschera delle righe da aggiornare (default: tutte)
+        """
+        selected = slice(None) if rows is None else rows
+        self.current_price[selected] = current_price
+        self.market_value[selected] = self.quantity[selected] * self.current_price[selected]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.growth[selected] = (self.market_value[selected] - self.cost[selected]) / self.cost[selected] * 100
+
+    def update_ticker_prices(self, prices):
+        """
+        Aggiorna i prezzi correnti per ticker, ricalcolando solo le righe interessate.
+
+        Args:
+            prices (dict | Series): Ticker -> nuovo prezzo corrente
+        """
+        prices = pd.Series(prices, dtype=np.float64)
+        by_code = np.full(len(self._ticker_names) + 1, np.nan)
+        codes = self._ticker_names.get_indexer(prices.index)
+        by_code[codes[codes >= 0]] = prices.to_numpy()[codes >= 0]
+        new_prices = by_code[self._ticker_codes]  # i codici -1 (ticker mancante) leggono NaN
+        rows = np.flatnonzero(~np.isnan(new_prices))
+        self.update_prices(new_prices[rows], rows)
+
+    def totals(self):
+        """Costo, valore di mercato e crescita % complessivi."""
+        cost = float(np.nansum(self.cost))
+        market_value = float(np.nansum(self.market_value))
+        return {
+            "Costo": cost,
+            "Market Value": market_value,
+            "Crescita %": (market_value - cost) / cost * 100 if cost else np.nan,
+        }
+
+    def to_frame(self):
+        """DataFrame con i valori calcolati (date tipizzate, nessun arrotondamento)."""
+        columns = {}
+        if self.ticker is not None:
+            columns['Ticker'] = self.ticker
+        if self.purchase_date is not None:
+            columns['Data acquisto'] = self.purchase_date
+        columns.update({
+            'Quantità': self.quantity,
+            'Prezzo di acquisto': self.purchase_price,
+            'Prezzo corrente': self.current_price,
+            'Costo': self.cost,
+            'Market Value': self.market_value,
+            'Crescita %': self.growth,
+        })
+        return pd.DataFrame(columns, copy=False)
+
 # =========================
 # Placeholder per metriche avanzate
 # =========================
@@ -65,4 +180,607 @@ def max_drawdown(values):
     drawdown = (values - cumulative) / cumulative
     return drawdown.min()
 
+# =========================
+# Metriche di rischio mobili
+# =========================
+
+def _window_sums(values, window):
+    """Somme cumulative (window=None) o su finestre mobili di `window` righe, per colonna."""
+    cumulative = np.cumsum(values, axis=0)
+    if window is None:
+        return cumulative
+    shifted = np.zeros_like(cumulative)
+    shifted[window:] = cumulative[:-window]
+    return cumulative - shifted
+
+def risk_metrics(returns, window=None, risk_free_rate=0.0, periods=252, min_periods=20):
+    """
+    Sharpe, Sortino, volatilità annualizzata e drawdown di tutte le colonne
+    insieme, su finestre mobili di `window` periodi o espansive (window=None).
+    Medie e varianze vengono da somme cumulative, quindi il costo non dipende
+    dalla lunghezza della finestra. I rendimenti mancanti (NaN) vengono ignorati.
+    
+    Args:
+        returns (DataFrame): Rendimenti periodali, una colonna per ticker
+        window (int): Lunghezza della finestra mobile, None per espansiva
+        risk_free_rate (float): Tasso privo di rischio annuo
+        periods (int): Periodi in un anno (252 per dati giornalieri)
+        min_periods (int): Osservazioni minime per un valore non NaN
+    
+    Returns:
+        DataFrame: Colonne (metrica, ticker) con metrica tra 'sharpe', 'sortino'
+            (annualizzati), 'volatility' (annua) e 'drawdown' (dal massimo della finestra)
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    excess = np.where(valid, values - risk_free_rate / periods, 0.0)
+    downside = np.minimum(excess, 0.0)
+
+    count = _window_sums(valid.astype(np.float64), window)
+    total = _window_sums(excess, window)
+    squares = _window_sums(excess ** 2, window)
+    downside_squares = _window_sums(downside ** 2, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        variance = np.maximum(squares - total * mean, 0.0) / (count - 1)
+        std = np.sqrt(variance)
+        downside_std = np.sqrt(downside_squares / count)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods), np.nan)
+        sortino = np.where(downside_std > 0, mean / downside_std * np.sqrt(periods), np.nan)
+    volatility = std * np.sqrt(periods)
+    enough = count >= min_periods
+    sharpe[~enough] = sortino[~enough] = volatility[~enough] = np.nan
+
+    wealth = pd.DataFrame(np.cumprod(1 + np.where(valid, values, 0.0), axis=0), index=returns.index)
+    peak = wealth.cummax() if window is None else wealth.rolling(window, min_periods=1).max()
+    drawdown = (wealth / peak - 1).to_numpy(copy=True)
+    drawdown[~valid.cumsum(axis=0).astype(bool)] = np.nan  # prima del primo rendimento
+
+    metrics = {"sharpe": sharpe, "sortino": sortino, "volatility": volatility, "drawdown": drawdown}
+    columns = pd.MultiIndex.from_product([list(metrics), returns.columns], names=["metric", "ticker"])
+    return pd.DataFrame(np.hstack(list(metrics.values())), index=returns.index, columns=columns)
+
+# =========================
+# Regressione sul benchmark
+# =========================
+
+def benchmark_regression(returns, benchmark, window=None, risk_free_rate=0.0, periods=252, min_periods=20):
+    """
+    Beta, alpha e R² di tutte le colonne rispetto al benchmark, risolvendo
+    insieme i minimi quadrati di ogni colonna sui rendimenti in eccesso:
+        r_i - rf = alpha_i + beta_i * (r_b - rf)
+    La soluzione in forma chiusa usa somme (mobili) dei prodotti, quindi ogni
+    colonna usa tutte le proprie date in comune con il benchmark.
+    
+    Args:
+        returns (DataFrame): Rendimenti periodali, una colonna per ticker
+        benchmark (Series): Rendimenti del benchmark
+        window (int): Periodi della finestra mobile, None per un'unica stima su tutte le date
+        risk_free_rate (float): Tasso privo di rischio annuo
+        periods (int): Periodi in un anno
+        min_periods (int): Osservazioni minime per una stima senza finestra
+    
+    Returns:
+        DataFrame: Senza finestra indice ticker e colonne 'alpha' (annualizzato),
+            'beta', 'r2', 'observations'; con finestra colonne (metrica, ticker) per data
+    """
+    aligned = returns.join(benchmark.rename("__benchmark__"), how="inner")
+    aligned = aligned[aligned["__benchmark__"].notna()]
+    y = aligned[returns.columns].to_numpy(dtype=np.float64) - risk_free_rate / periods
+    x = aligned["__benchmark__"].to_numpy(dtype=np.float64)[:, None] - risk_free_rate / periods
+    valid = ~np.isnan(y)
+    y = np.where(valid, y, 0.0)
+    x = np.where(valid, x, 0.0)
+
+    terms = np.stack([valid.astype(np.float64), x, y, x * x, y * y, x * y])
+    if window is None:
+        count, sum_x, sum_y, sum_xx, sum_yy, sum_xy = terms.sum(axis=1)
+    else:
+        count, sum_x, sum_y, sum_xx, sum_yy, sum_xy = (_window_sums(term, window) for term in terms)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov_xy = sum_xy - sum_x * sum_y / count
+        var_x = sum_xx - sum_x ** 2 / count
+        var_y = sum_yy - sum_y ** 2 / count
+        beta = cov_xy / var_x
+        alpha = (sum_y - beta * sum_x) / count * periods
+        r2 = cov_xy ** 2 / (var_x * var_y)
+    incomplete = count < (min_periods if window is None else window)
+    beta[incomplete] = alpha[incomplete] = r2[incomplete] = np.nan
+
+    if window is None:
+        return pd.DataFrame({"alpha": alpha, "beta": beta, "r2": r2, "observations": count.astype(np.int64)},
+                            index=returns.columns)
+    metrics = {"alpha": alpha, "beta": beta, "r2": r2}
+    columns = pd.MultiIndex.from_product([list(metrics), returns.columns], names=["metric", "ticker"])
+    return pd.DataFrame(np.hstack(list(metrics.values())), index=aligned.index, columns=columns)
+
+# =========================
+# Drawdown
+# =========================
+
+def underwater_curve(values):
+    """
+    Distanza percentuale dal massimo precedente di ogni colonna (0 sui massimi).
+    I giorni senza valore riportano l'ultimo disponibile; prima del primo valore NaN.
+    
+    Args:
+        values (DataFrame): Prezzi o indici di valore, una colonna per serie
+    
+    Returns:
+        DataFrame: Drawdown corrente (-0.1 = -10%)
+    """
+    values = values.sort_index().ffill()
+    return values / values.cummax() - 1
+
+def drawdown_episodes(values):
+    """
+    Tutti gli episodi di drawdown di tutte le colonne con un'unica scansione
+    lineare: le colonne vengono messe in fila e gli episodi sono le sequenze
+    consecutive sotto il massimo precedente.
+    
+    Args:
+        values (DataFrame): Prezzi o indici di valore indicizzati per data
+    
+    Returns:
+        DataFrame: Un episodio per riga con colonne ticker, peak, trough,
+            recovery (NaT se non ancora recuperato), depth (-0.1 = -10%),
+            days_to_trough, duration (giorni dal massimo al recupero, o
+            all'ultima data se in corso), ordinato per ticker e data del massimo
+    """
+    columns = ["ticker", "peak", "trough", "recovery", "depth", "days_to_trough", "duration"]
+    underwater = underwater_curve(values)
+    n, p = underwater.shape
+    if n == 0 or p == 0:
+        return pd.DataFrame(columns=columns)
+    flat = underwater.to_numpy(dtype=np.float64).T.ravel()  # una colonna dopo l'altra
+    below = flat < 0
+    first_row = (np.arange(n * p) % n) == 0
+    starts = np.flatnonzero(below & (first_row | ~np.roll(below, 1)))
+    if len(starts) == 0:
+        return pd.DataFrame(columns=columns)
+    last_row = (np.arange(n * p) % n) == n - 1
+    ends = np.flatnonzero(below & (last_row | ~np.roll(below, -1)))
+
+    # Minimo di ogni episodio sulle sole righe start..end e sua prima posizione:
+    # reduceat su [start, end+1] alternati, scartando i segmenti tra un episodio e l'altro
+    bounds = np.column_stack([starts, ends + 1]).ravel()
+    depth = np.minimum.reduceat(np.append(flat, 0.0), bounds)[::2]
+    episode = np.cumsum(np.isin(np.arange(n * p), starts)) - 1
+    at_minimum = below & (flat == depth[np.clip(episode, 0, None)])
+    _, first = np.unique(episode[at_minimum], return_index=True)
+    trough = np.flatnonzero(at_minimum)[first]
+
+    dates = underwater.index.values
+    row = starts % n
+    recovered = (ends % n) < n - 1
+    recovery = np.where(recovered, dates[np.minimum(ends % n + 1, n - 1)], np.datetime64("NaT"))
+    # Un episodio parte sempre da un massimo (la riga precedente, nella stessa colonna)
+    peak = dates[np.maximum(row - 1, 0)]
+    last = np.where(recovered, recovery, dates[-1])
+    return pd.DataFrame({
+        "ticker": underwater.columns[starts // n],
+        "peak": peak,
+        "trough": dates[trough % n],
+        "recovery": recovery,
+        "depth": depth,
+        "days_to_trough": (dates[trough % n] - peak).astype("timedelta64[D]").astype(np.int64),
+        "duration": (last - peak).astype("timedelta64[D]").astype(np.int64),
+    }, columns=columns)
+
+# =========================
+# Correlazione di portafoglio
+# =========================
+
+def _ledoit_wolf_intensity(standardized):
+    """
+    Intensità di shrinkage di Ledoit-Wolf verso l'identità per una matrice
+    di rendimenti standardizzati (righe complete, colonne a media 0 e varianza 1).
+    """
+    n, p = standardized.shape
+    if n < 2 or p < 2:
+        return 0.0
+    sample = standardized.T @ standardized / n
+    scale = np.trace(sample) / p
+    d2 = np.sum((sample - scale * np.eye(p)) ** 2) / p
+    if d2 == 0:
+        return 0.0
+    b2 = ((np.sum(standardized ** 2, axis=1) ** 2).sum() - n * np.sum(sample ** 2)) / (n ** 2 * p)
+    return float(min(max(b2, 0.0), d2) / d2)
+
+def correlation_matrix(prices, min_periods=20, shrinkage=0.0):
+    """
+    Matrice di correlazione dei rendimenti giornalieri di tutti i ticker in un'unica passata.
+    Ogni coppia usa le date in cui entrambi hanno un prezzo, quindi ETF con
+    storici di lunghezza diversa non riducono la finestra degli altri.
+    
+    Args:
+        prices (DataFrame): Prezzi di chiusura, una colonna per ticker
+        min_periods (int): Osservazioni comuni minime per coppia, altrimenti NaN
+        shrinkage (float | str): Peso verso l'identità in [0, 1], oppure "auto" (Ledoit-Wolf)
+    
+    Returns:
+        DataFrame: Matrice di correlazione ticker x ticker
+    """
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    values = returns.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(values)
+    x = np.where(mask, values, 0.0)
+    m = mask.astype(np.float64)
+
+    # Somme sulle date comuni a ogni coppia (i, j) tramite prodotti matriciali
+    n = m.T @ m
+    sum_x = x.T @ m
+    sum_xx = (x * x).T @ m
+    sum_xy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_i = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < min_periods] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(n) >= min_periods, 1.0, np.nan))
+
+    if shrinkage == "auto":
+        complete = values[mask.all(axis=1)]
+        std = complete.std(axis=0)
+        shrinkage = 0.0
+        if len(complete) >= 2 and (std > 0).all():
+            shrinkage = _ledoit_wolf_intensity((complete - complete.mean(axis=0)) / std)
+    if shrinkage:
+        corr = (1 - shrinkage) * corr + shrinkage * np.eye(len(corr))
+
+    return pd.DataFrame(corr, index=prices.columns, columns=prices.columns)
+
+def _rolling_ledoit_wolf_intensity(values, window, sum_x, sum_xy, corr):
+    """
+    Intensità di Ledoit-Wolf di ogni finestra, uguale a _ledoit_wolf_intensity
+    sui rendimenti standardizzati della finestra. Il termine di quarto ordine
+    sum_t (sum_j z_tj²)² viene sviluppato in somme cumulative dei momenti grezzi.
+    """
+    def windowed(cumulative):
+        cumulative = np.concatenate([np.zeros((1,) + cumulative.shape[1:]), cumulative])
+        return cumulative[window:] - cumulative[:-window]
+
+    n, p = window, values.shape[1]
+    if n < 2 or p < 2:
+        return np.zeros(len(corr))
+    squares = values ** 2
+    s1, s2 = sum_x, windowed(np.cumsum(squares, axis=0))
+    s21 = windowed(np.cumsum(squares[:, :, None] * values[:, None, :], axis=0))  # sum x_j² x_k
+    s22 = windowed(np.cumsum(squares[:, :, None] * squares[:, None, :], axis=0))
+    m = s1 / n
+    var = s2 / n - m ** 2
+    mj, mk = m[:, :, None], m[:, None, :]
+    # sum_t (x_j - m_j)² (x_k - m_k)²
+    fourth = (s22 - 2 * mk * s21 - 2 * mj * s21.transpose(0, 2, 1)
+              + mk ** 2 * s2[:, :, None] + mj ** 2 * s2[:, None, :] + 4 * mj * mk * sum_xy
+              - 2 * mj * mk ** 2 * s1[:, :, None] - 2 * mj ** 2 * mk * s1[:, None, :] + n * mj ** 2 * mk ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fourth = (fourth / (var[:, :, None] * var[:, None, :])).sum(axis=(1, 2))
+        scale = np.trace(corr, axis1=1, axis2=2) / p
+        d2 = np.sum((corr - scale[:, None, None] * np.eye(p)) ** 2, axis=(1, 2)) / p
+        b2 = (fourth - n * np.sum(corr ** 2, axis=(1, 2))) / (n ** 2 * p)
+        intensity = np.minimum(np.maximum(b2, 0.0), d2) / d2
+    return np.where((d2 > 0) & (var > 0).all(axis=1) & np.isfinite(intensity), intensity, 0.0)
+
+def rolling_correlation_matrix(prices, window, shrinkage=0.0):
+    """
+    Matrici di correlazione su finestre mobili di `window` giorni, calcolate
+    con somme cumulative invece di una stima per finestra.
+    Usa solo le date in cui tutti i ticker hanno un prezzo.
+    
+    Args:
+        prices (DataFrame): Prezzi di chiusura, una colonna per ticker
+        window (int): Numero di rendimenti per finestra
+        shrinkage (float | str): Peso verso l'identità in [0, 1], oppure "auto"
+            (Ledoit-Wolf stimato in ogni finestra)
+    
+    Returns:
+        DataFrame: Indice (date, ticker) e una colonna per ticker, come DataFrame.rolling().corr()
+    """
+    returns = prices.dropna().pct_change().iloc[1:]
+    values = returns.to_numpy(dtype=np.float64)
+    t, p = values.shape
+    if t < window:
+        return pd.DataFrame(columns=prices.columns, index=pd.MultiIndex.from_arrays([[], []]))
+
+    def windowed(cumulative):
+        cumulative = np.concatenate([np.zeros((1,) + cumulative.shape[1:]), cumulative])
+        return cumulative[window:] - cumulative[:-window]
+
+    sum_x = windowed(np.cumsum(values, axis=0))
+    sum_xy = windowed(np.cumsum(values[:, :, None] * values[:, None, :], axis=0))
+    cov = sum_xy - sum_x[:, :, None] * sum_x[:, None, :] / window
+    var = np.diagonal(cov, axis1=1, axis2=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.sqrt(var[:, :, None] * var[:, None, :])
+    if shrinkage == "auto":
+        shrinkage = _rolling_ledoit_wolf_intensity(values, window, sum_x, sum_xy, corr)[:, None, None]
+    if np.any(shrinkage):
+        corr = (1 - shrinkage) * corr + shrinkage * np.eye(p)
+
+    index = pd.MultiIndex.from_product([returns.index[window - 1:], prices.columns], names=["date", "ticker"])
+    return pd.DataFrame(corr.reshape(-1, p), index=index, columns=prices.columns)
+
+# =========================
+# Rendimento money-weighted (XIRR)
+# =========================
+
+def _npv(rates, amounts, years):
+    """Valore attuale dei flussi di ogni gruppo (riga) al proprio tasso."""
+    discount = (1 + rates[:, None]) ** (-years)
+    return (amounts * discount).sum(axis=1), (-years * amounts * discount).sum(axis=1) / (1 + rates)
+
+def xirr_batch(cash_flows, guess=0.1, tol=1e-9, max_iter=50):
+    """
+    Risolve l'XIRR di più gruppi di flussi insieme: Newton vettoriale su tutti
+    i gruppi, poi bisezione per quelli che non convergono.
+    I gruppi senza almeno un flusso positivo e uno negativo non hanno
+    soluzione e ritornano NaN.
+    
+    Args:
+        cash_flows (dict): gruppo -> (date, importi); importi negativi per
+            gli esborsi e positivi per incassi e valore finale
+        guess (float): Tasso iniziale
+        tol (float): Tolleranza sul valore attuale relativo ai flussi
+        max_iter (int): Iterazioni massime di Newton
+    
+    Returns:
+        Series: Tasso annuo per gruppo (0.05 = 5%)
+    """
+    groups = list(cash_flows)
+    if not groups:
+        return pd.Series(dtype=np.float64)
+    width = max(len(amounts) for _, amounts in cash_flows.values())
+    amounts = np.zeros((len(groups), width))
+    years = np.zeros((len(groups), width))
+    for row, group in enumerate(groups):
+        dates, values = cash_flows[group]
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]")
+        amounts[row, :len(values)] = np.asarray(values, dtype=np.float64)
+        years[row, :len(values)] = (dates - dates.min()).astype(np.float64) / 365.0
+
+    scale = np.abs(amounts).sum(axis=1)
+    solvable = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+    rates = np.full(len(groups), guess)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(max_iter):
+            value, derivative = _npv(rates, amounts, years)
+            step = np.where(derivative != 0, value / derivative, 0.0)
+            rates = np.clip(rates - step, -0.9999, 1e3)
+            if np.all(~solvable | (np.abs(step) < tol)):
+                break
+        value, _ = _npv(rates, amounts, years)
+        converged = np.isfinite(value) & (np.abs(value) <= tol * np.maximum(scale, 1.0))
+
+        # Bisezione per i gruppi risolvibili su cui Newton non è convergente
+        retry = solvable & ~converged
+        if retry.any():
+            low = np.full(retry.sum(), -0.9999)
+            high = np.full(retry.sum(), 1e3)
+            value_low, _ = _npv(low, amounts[retry], years[retry])
+            value_high, _ = _npv(high, amounts[retry], years[retry])
+            bracketed = np.sign(value_low) != np.sign(value_high)
+            for _ in range(200):
+                middle = (low + high) / 2
+                value_middle, _ = _npv(middle, amounts[retry], years[retry])
+                same_side = np.sign(value_middle) == np.sign(value_low)
+                low = np.where(same_side, middle, low)
+                value_low = np.where(same_side, value_middle, value_low)
+                high = np.where(same_side, high, middle)
+            rates[retry] = np.where(bracketed, (low + high) / 2, np.nan)
+
+    rates[~solvable] = np.nan
+    return pd.Series(rates, index=groups)
+
+# =========================
+# Total return e distribuzioni
+# =========================
+
+def total_return_index(close, dividends, base=100.0):
+    """
+    Indice total return con i dividendi reinvestiti alla chiusura del giorno
+    di stacco, calcolato per tutti i ticker insieme:
+        r_t = (P_t + D_t) / P_{t-1} - 1
+    
+    Args:
+        close (DataFrame): Prezzi di chiusura non rettificati, una colonna per ticker
+        dividends (DataFrame): Dividendo per quota alla data di stacco, stesso formato
+        base (float): Valore dell'indice alla prima quotazione di ogni ticker
+    
+    Returns:
+        DataFrame: Indice per ticker, NaN nei giorni senza quotazione
+    """
+    close = close.sort_index()
+    prices = close.to_numpy(dtype=np.float64)
+    paid = dividends.reindex(index=close.index, columns=close.columns).fillna(0.0).to_numpy(dtype=np.float64)
+    # Rispetto all'ultima quotazione disponibile, anche se ci sono giorni mancanti
+    previous = close.ffill().shift(1).to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (prices + paid) / previous
+    growth[~np.isfinite(growth)] = 1.0
+    index = base * np.cumprod(growth, axis=0)
+    index[np.isnan(prices)] = np.nan
+    return pd.DataFrame(index, index=close.index, columns=close.columns)
+
+def distribution_income(positions, dividends, freq="M"):
+    """
+    Dividendi incassati dal portafoglio per periodo: spettano alle quote
+    detenute alla chiusura del giorno precedente lo stacco.
+    
+    Args:
+        positions (DataFrame): Quote detenute per data, una colonna per ticker
+        dividends (DataFrame): Dividendo per quota alla data di stacco
+        freq (str): 'M' mensile, 'Y' annuale
+    
+    Returns:
+        DataFrame: Importo incassato per periodo e ticker
+    """
+    if positions.empty:
+        return pd.DataFrame(columns=positions.columns, dtype=np.float64)
+    paid = dividends.reindex(index=positions.index, columns=positions.columns).fillna(0.0)
+    held = positions.shift(1).fillna(0.0)
+    income = held * paid
+    return income.resample({"M": "ME", "Y": "YE"}[freq]).sum()
+
+# =========================
+# Value at Risk
+# =========================
+
+def _tail(losses, confidence):
+    """VaR (quantile delle perdite) e CVaR (media delle perdite oltre il VaR) per colonna di scenari."""
+    var = np.quantile(losses, confidence, axis=-1)
+    tail = np.where(losses >= var[..., None], losses, np.nan)
+    return var, np.nanmean(tail, axis=-1)
+
+def value_at_risk(log_returns, exposures, confidences=(0.95, 0.99), horizon=1,
+                  simulations=20000, mean=None, cov=None, seed=0):
+    """
+    VaR ed Expected Shortfall (CVaR) delle posizioni con tre metodi:
+    - storico: rendimenti su `horizon` giorni sovrapposti osservati
+    - parametrico: distribuzione normale dei rendimenti di portafoglio
+    - Monte Carlo: `simulations` scenari normali multivariati generati in
+      un'unica moltiplicazione di matrici con la covarianza
+    
+    Args:
+        log_returns (DataFrame): Rendimenti logaritmici giornalieri, una colonna per ticker
+            (vengono usate solo le date in cui sono presenti tutti)
+        exposures (Series): Controvalore in euro per ticker
+        confidences (tuple): Livelli di confidenza (0.95 = 95%)
+        horizon (int): Orizzonte in giorni
+        simulations (int): Scenari Monte Carlo
+        mean, cov: Media e covarianza giornaliere già calcolate (default: da log_returns)
+        seed (int): Seme del generatore, per risultati stabili tra i rerun
+    
+    Returns:
+        DataFrame: Indice (metodo, confidenza), colonne 'var' e 'cvar' come perdite positive in euro
+    """
+    from statistics import NormalDist
+    
+    tickers = [ticker for ticker in exposures.index if ticker in log_returns.columns]
+    weights = exposures[tickers].to_numpy(dtype=np.float64)
+    returns = log_returns[tickers].dropna().to_numpy(dtype=np.float64)
+    confidences = np.asarray(confidences, dtype=np.float64)
+    index = pd.MultiIndex.from_product([["storico", "parametrico", "monte_carlo"], confidences],
+                                       names=["method", "confidence"])
+    if not tickers or len(returns) <= horizon:
+        return pd.DataFrame(np.nan, index=index, columns=["var", "cvar"])
+    mean = returns.mean(axis=0) if mean is None else pd.Series(mean)[tickers].to_numpy()
+    cov = np.cov(returns, rowvar=False).reshape(len(tickers), len(tickers)) if cov is None \
+        else pd.DataFrame(cov).loc[tickers, tickers].to_numpy()
+
+    # Storico: somme mobili dei rendimenti logaritmici su `horizon` giorni
+    cumulative = np.vstack([np.zeros((1, len(tickers))), np.cumsum(returns, axis=0)])
+    window_returns = cumulative[horizon:] - cumulative[:-horizon]
+    historical = np.array(_tail(-(np.expm1(window_returns) @ weights), confidences[:, None]))[:, :, 0]
+
+    # Parametrico: perdita normale con media e varianza scalate sull'orizzonte
+    mu = weights @ mean * horizon
+    sigma = np.sqrt(max(weights @ cov @ weights, 0.0) * horizon)
+    z = np.array([NormalDist().inv_cdf(c) for c in confidences])
+    density = np.array([NormalDist().pdf(value) for value in z])
+    parametric = np.array([-mu + sigma * z, -mu + sigma * density / (1 - confidences)])
+
+    # Monte Carlo: fattorizzazione della covarianza (autovalori, robusta se non definita positiva)
+    eigenvalues, eigenvectors = np.linalg.eigh(cov * horizon)
+    factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+    shocks = np.random.default_rng(seed).standard_normal((simulations, len(tickers)))
+    scenarios = mean * horizon + shocks @ factor.T
+    monte_carlo = np.array(_tail(-(np.expm1(scenarios) @ weights), confidences[:, None]))[:, :, 0]
+
+    values = np.hstack([historical, parametric, monte_carlo]).T
+    return pd.DataFrame(values, index=index, columns=["var", "cvar"])
+
+# =========================
+# Frontiera efficiente
+# =========================
+
+def _project_capped_simplex(values, cap):
+    """Proiezione di ogni riga sull'insieme {0 <= w <= cap, somma w = 1} (bisezione sullo spostamento)."""
+    low = (values.min(axis=-1) - cap)[..., None]
+    high = values.max(axis=-1)[..., None]
+    for _ in range(60):
+        middle = (low + high) / 2
+        total = np.clip(values - middle, 0.0, cap).sum(axis=-1, keepdims=True)
+        low = np.where(total > 1, middle, low)
+        high = np.where(total > 1, high, middle)
+    return np.clip(values - (low + high) / 2, 0.0, cap)
+
+def _solve_mean_variance(mean, cov, aversions, cap, start, tol=1e-8, max_iter=3000):
+    """
+    Massimizza w'mu - aversion/2 w'Sw con pesi long-only limitati a `cap` per
+    tutti i livelli di avversione insieme (una riga di pesi per livello), con
+    gradiente proiettato accelerato partendo dai pesi `start`.
+    """
+    steps = 1.0 / np.maximum(aversions * np.linalg.eigvalsh(cov)[-1], 1e-12)[:, None]
+    weights = momentum = start
+    previous_t = np.ones((len(aversions), 1))
+    for _ in range(max_iter):
+        gradient = mean - aversions[:, None] * (momentum @ cov)
+        updated = _project_capped_simplex(momentum + steps * gradient, cap)
+        # Riavvio adattivo dell'accelerazione quando il passo torna indietro
+        restart = (((momentum - updated) * (updated - weights)).sum(axis=1, keepdims=True) > 0)
+        previous_t = np.where(restart, 1.0, previous_t)
+        t = (1 + np.sqrt(1 + 4 * previous_t ** 2)) / 2
+        momentum = updated + (previous_t - 1) / t * (updated - weights)
+        converged = np.abs(updated - weights).max() < tol
+        weights, previous_t = updated, t
+        if converged:
+            break
+    return weights
+
+def efficient_frontier(mean, cov, points=25, max_weight=1.0, warm_start=None, periods=252):
+    """
+    Frontiera efficiente media-varianza con pesi long-only e un limite per
+    titolo. Ogni punto massimizza rendimento atteso meno avversione al
+    rischio per varianza; tutti i punti sono risolti insieme, partendo dai
+    pesi di una frontiera precedente se indicati.
+    
+    Args:
+        mean (Series): Rendimento atteso giornaliero per ticker
+        cov (DataFrame): Covarianza giornaliera
+        points (int): Numero di livelli di avversione al rischio
+        max_weight (float): Peso massimo per ticker (alzato a 1/n se non ammissibile)
+        warm_start (DataFrame): Pesi per livello ('aversion' e una colonna per
+            ticker) di una frontiera precedente, es. con un'altra finestra storica
+        periods (int): Periodi in un anno per annualizzare
+    
+    Returns:
+        DataFrame: Un punto per riga dal minimo rischio al massimo rendimento, con
+            colonne 'return', 'volatility' (annui), 'aversion' e i pesi per ticker
+    """
+    tickers = list(mean.index)
+    n = len(tickers)
+    if n == 0:
+        return pd.DataFrame(columns=["return", "volatility", "aversion"])
+    mu = mean.to_numpy(dtype=np.float64) * periods
+    sigma = cov.loc[tickers, tickers].to_numpy(dtype=np.float64) * periods
+    cap = max(max_weight, 1.0 / n)
+
+    # Avversioni da "solo varianza" a "solo rendimento", in scala con i dati
+    scale = max(np.abs(mu).max(), 1e-12) / max(np.linalg.eigvalsh(sigma)[-1], 1e-12)
+    aversions = np.geomspace(scale * 1e3, scale * 1e-2, points)
+    start = np.tile(np.full(n, 1.0 / n), (points, 1))
+    if warm_start is not None and len(warm_start) and set(tickers) <= set(warm_start.columns):
+        # Pesi precedenti del livello di avversione più vicino
+        previous = warm_start.sort_values("aversion")
+        nearest = np.searchsorted(previous["aversion"].to_numpy(), aversions).clip(0, len(previous) - 1)
+        start = previous[tickers].to_numpy(dtype=np.float64)[nearest]
+    weights = _solve_mean_variance(mu, sigma, aversions, cap, _project_capped_simplex(np.nan_to_num(start), cap))
+
+    frontier = pd.DataFrame(weights, columns=tickers)
+    frontier.insert(0, "aversion", aversions)
+    frontier.insert(0, "volatility", np.sqrt(np.einsum("ij,jk,ik->i", weights, sigma, weights)))
+    frontier.insert(0, "return", weights @ mu)
+    # Livelli di avversione vicini possono dare lo stesso portafoglio
+    return frontier.loc[~frontier[["return", "volatility"]].round(6).duplicated()].reset_index(drop=True)
+
+def portfolio_point(weights, mean, cov, periods=252):
+    """Rendimento e volatilità annui di un portafoglio con i pesi indicati (normalizzati a 1)."""
+    weights = weights.reindex(mean.index).fillna(0.0)
+    weights = weights / weights.sum()
+    sigma = cov.loc[mean.index, mean.index].to_numpy() * periods
+    w = weights.to_numpy(dtype=np.float64)
+    return float(w @ mean.to_numpy() * periods), float(np.sqrt(w @ sigma @ w))
+
 # Altre metriche avanzate (beta, alpha, R2, VaR, volatilità, ecc.) possono essere aggiunte qui.
\ No newline at end of file
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+
+def prepare_trades(transactions):
+    """
+    Estrae i movimenti di quote dal DataFrame della tabella "transaction".
+    Le righe senza ticker o con quantità nulla (bonifici, cedole, bolli) vengono scartate.
+
+    Args:
+        transactions (DataFrame): Colonne ticker, tipo_operazione, data_operazione,
+            quantita, importo_euro
+
+    Returns:
+        DataFrame: Colonne date, ticker, quantity (con segno) e flow
+            (euro investiti, positivo per gli acquisti), ordinato per data
+    """
+    df = transactions[transactions["ticker"].notna() & (transactions["quantita"].fillna(0) != 0)]
+    selling = df["tipo_operazione"].astype(str).str.contains("vendita", case=False, na=False)
+    trades = pd.DataFrame({
+        "date": pd.to_datetime(df["data_operazione"]).dt.normalize().to_numpy(),
+        "ticker": df["ticker"].astype(str).to_numpy(),
+        "quantity": np.where(selling, -df["quantita"].abs(), df["quantita"].abs()),
+        "flow": -df["importo_euro"].fillna(0).to_numpy(dtype=np.float64),
+    })
+    return trades.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+class PortfolioValuation:
+    """
+    Valorizzazione giornaliera del portafoglio: ricostruisce le quote detenute
+    ogni giorno dalle transazioni e le valuta con i prezzi di chiusura,
+    producendo la serie del NAV e i rendimenti time-weighted.
+    I flussi di un giorno sono considerati a inizio giornata:
+        r_t = NAV_t / (NAV_{t-1} + flussi_t) - 1
+    Con update() i nuovi prezzi e le transazioni successive all'ultima data
+    valorizzata vengono aggiunti in coda senza ricalcolare tutto lo storico.
+    """
+
+    def __init__(self, trades, prices):
+        self._build(trades, prices)
+
+    @staticmethod
+    def _priced_tickers(trades, prices):
+        """Ticker delle transazioni con almeno un prezzo (le colonne tutte NaN non contano)."""
+        traded = set(trades["ticker"].unique())
+        return [ticker for ticker in prices.columns[prices.notna().any().to_numpy()] if ticker in traded]
+
+    def _build(self, trades, prices):
+        prices = prices.sort_index()
+        traded = set(trades["ticker"].unique())
+        # Un ticker senza prezzi verrebbe valutato 0 e ogni suo acquisto
+        # apparirebbe come una perdita: viene escluso come se mancasse la colonna
+        self.tickers = self._priced_tickers(trades, prices)
+        self.trades = trades[trades["ticker"].isin(self.tickers)].reset_index(drop=True)
+        self.missing_tickers = sorted(traded - set(self.tickers))
+        # Indici di date anche senza valori: twr() e chi usa .year li richiedono
+        empty_dates = pd.DatetimeIndex([])
+        self.nav = pd.Series(dtype=np.float64, index=empty_dates)
+        self.flows = pd.Series(dtype=np.float64, index=empty_dates)
+        self.returns = pd.Series(dtype=np.float64, index=empty_dates)
+        self.positions = pd.DataFrame(columns=self.tickers, index=empty_dates, dtype=np.float64)
+        self._valued_trades = 0
+        if self.trades.empty:
+            self._last_prices = pd.Series(np.nan, index=self.tickers)
+            return
+
+        prices = prices[self.tickers]
+        # Prezzo mancante prima della prima quotazione: uso il primo disponibile
+        prices = prices.ffill().bfill()
+        prices = prices[prices.index >= self.trades["date"].iloc[0]]
+        self._last_prices = prices.iloc[0] if len(prices) else pd.Series(np.nan, index=self.tickers)
+        self._extend(prices, np.zeros(len(self.tickers)), 0.0)
+
+    def _extend(self, prices, start_positions, prev_nav):
+        """Valorizza le date di `prices` partendo dalle quote e dal NAV del giorno precedente."""
+        if prices.empty:
+            return
+        dates = prices.index
+        pending = self.trades.iloc[self._valued_trades:]
+        pending = pending[pending["date"] <= dates[-1]]
+        # Le transazioni in giorni senza quotazione cadono sulla data successiva
+        slot = np.searchsorted(dates.values, pending["date"].values, side="left")
+        column = pd.Index(self.tickers).get_indexer(pending["ticker"])
+
+        quantity = np.zeros((len(dates), len(self.tickers)))
+        np.add.at(quantity, (slot, column), pending["quantity"].to_numpy(dtype=np.float64))
+        flows = np.bincount(slot, weights=pending["flow"].to_numpy(dtype=np.float64), minlength=len(dates))
+
+        positions = np.cumsum(quantity, axis=0) + start_positions
+        nav = np.nansum(positions * prices.to_numpy(dtype=np.float64), axis=1)
+        previous = np.concatenate([[prev_nav], nav[:-1]])
+        base = previous + flows
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.where(base > 0, nav / base - 1, 0.0)
+
+        self.positions = pd.concat([self.positions, pd.DataFrame(positions, index=dates, columns=self.tickers)])
+        self.nav = pd.concat([self.nav, pd.Series(nav, index=dates)])
+        self.flows = pd.concat([self.flows, pd.Series(flows, index=dates)])
+        self.returns = pd.concat([self.returns, pd.Series(returns, index=dates)])
+        self._valued_trades += len(pending)
+        self._last_prices = prices.iloc[-1]
+
+    @property
+    def last_date(self):
+        """Ultima data valorizzata, None se non ci sono ancora valori."""
+        return self.nav.index[-1] if len(self.nav) else None
+
+    def update(self, trades, prices):
+        """
+        Aggiorna la valorizzazione con lo stato completo di transazioni e prezzi.
+        Se cambiano solo le date successive all'ultima valorizzata il calcolo
+        è incrementale, altrimenti lo storico viene ricostruito.
+
+        Returns:
+            bool: True se l'aggiornamento è stato incrementale
+        """
+        known = self.trades
+        # self.trades contiene solo i ticker valorizzati: il confronto va fatto
+        # sulle transazioni filtrate allo stesso modo
+        valued = trades[trades["ticker"].isin(self.tickers)].reset_index(drop=True)
+        tail = valued.iloc[len(known):] if len(valued) >= len(known) else None
+        incremental = (
+            self.last_date is not None
+            and tail is not None
+            and valued.iloc[:len(known)][["date", "ticker", "quantity", "flow"]]
+                .equals(known[["date", "ticker", "quantity", "flow"]])
+            and (tail.empty or tail["date"].min() > self.last_date)
+            and set(self.tickers) <= set(prices.columns)
+            # Un ticker prima senza prezzi che ora li ha richiede la ricostruzione
+            and set(self._priced_tickers(trades, prices)) <= set(self.tickers)
+        )
+        if not incremental:
+            self._build(trades, prices)
+            return False
+
+        self.trades = pd.concat([known, tail], ignore_index=True)
+        self.missing_tickers = sorted(set(trades["ticker"].unique()) - set(self.tickers))
+        new_prices = prices[self.tickers].sort_index()
+        new_prices = new_prices[new_prices.index > self.last_date]
+        new_prices = pd.concat([self._last_prices.to_frame().T, new_prices]).ffill().iloc[1:]
+        self._extend(new_prices, self.positions.iloc[-1].to_numpy(), self.nav.iloc[-1])
+        return True
+
+    def index(self):
+        """Indice time-weighted cumulato (base 1 il giorno prima del primo valore)."""
+        return (1 + self.returns).cumprod()
+
+    def twr(self, freq="M"):
+        """
+        Rendimenti time-weighted per periodo.
+
+        Args:
+            freq (str): 'D' giornaliero, 'M' mensile, 'Y' annuale
+
+        Returns:
+            Series: Rendimento di ogni periodo (0.01 = 1%)
+        """
+        if freq == "D":
+            return self.returns.copy()
+        rule = {"M": "ME", "Y": "YE"}[freq]
+        growth = (1 + self.returns).resample(rule).prod()
+        return growth - 1
@@ -0,0 +1,148 @@
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+# Colonne salvate per ogni ticker, oltre alla data
+VALUE_COLUMNS = ("close", "dividends")
+
+
+class PriceStore:
+    """
+    Archivio locale a colonne dello storico prezzi, un file binario per colonna:
+        <root>/<TICKER>/date.bin       giorni dal 1970-01-01 (int64, crescenti)
+        <root>/<TICKER>/close.bin      prezzo di chiusura (float64)
+        <root>/<TICKER>/dividends.bin  dividendo staccato nel giorno (float64)
+    I file vengono letti con np.memmap, quindi una finestra di date costa solo
+    le pagine effettivamente lette. Gli aggiornamenti sono solo in coda.
+    Pensato per un solo processo scrittore alla volta.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, ticker, column):
+        return os.path.join(self.root, ticker, f"{column}.bin")
+
+    def _length(self, ticker):
+        # La lunghezza valida è quella della colonna più corta: una scrittura
+        # interrotta a metà non rende mai visibili righe incomplete
+        sizes = []
+        for column in ("date",) + VALUE_COLUMNS:
+            path = self._path(ticker, column)
+            sizes.append(os.path.getsize(path) // 8 if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def _map(self, ticker, column, dtype, length):
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(ticker, column), dtype=dtype, mode="r", shape=(length,))
+
+    @staticmethod
+    def _to_days(values):
+        return np.asarray(pd.to_datetime(values).values.astype("datetime64[D]").astype(np.int64))
+
+    def tickers(self):
+        """Ritorna i ticker presenti nell'archivio."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name)) and self._length(name) > 0
+        )
+
+    def last_date(self, ticker):
+        """Ritorna l'ultima data salvata per il ticker, None se assente."""
+        length = self._length(ticker)
+        if length == 0:
+            return None
+        last_day = self._map(ticker, "date", np.int64, length)[-1]
+        return pd.Timestamp(np.datetime64(int(last_day), "D")).date()
+
+    def append(self, ticker, df):
+        """
+        Aggiunge in coda le righe con data successiva all'ultima salvata.
+
+        Args:
+            ticker (str): Ticker base dell'ETF
+            df (DataFrame): Colonne 'date', 'close' e opzionalmente 'dividends'
+
+        Returns:
+            int: Numero di righe aggiunte
+        """
+        if df is None or df.empty:
+            return 0
+        days = self._to_days(df["date"])
+        order = np.argsort(days, kind="stable")
+        days = days[order]
+        values = {
+            column: (np.asarray(df[column], dtype=np.float64)[order] if column in df.columns
+                     else np.zeros(len(days)))
+            for column in VALUE_COLUMNS
+        }
+
+        with self._lock:
+            os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+            length = self._length(ticker)
+            # Riallinea i file dopo un'eventuale scrittura interrotta
+            for column in ("date",) + VALUE_COLUMNS:
+                path = self._path(ticker, column)
+                if os.path.exists(path) and os.path.getsize(path) != length * 8:
+                    os.truncate(path, length * 8)
+
+            last_day = self._map(ticker, "date", np.int64, length)[-1] if length else None
+            keep = np.ones(len(days), dtype=bool)
+            keep[1:] = days[1:] != days[:-1]  # un solo valore per giorno
+            if last_day is not None:
+                keep &= days > last_day
+            if not keep.any():
+                return 0
+
+            # La data per ultima: finché non è scritta le nuove righe non sono visibili
+            for column in VALUE_COLUMNS:
+                with open(self._path(ticker, column), "ab") as f:
+                    f.write(values[column][keep].tobytes())
+            with open(self._path(ticker, "date"), "ab") as f:
+                f.write(days[keep].tobytes())
+            return int(keep.sum())
+
+    def replace(self, ticker, df):
+        """Sostituisce l'intero storico del ticker (es. dopo un riscaricamento completo)."""
+        with self._lock:
+            shutil.rmtree(os.path.join(self.root, ticker), ignore_errors=True)
+        return self.append(ticker, df)
+
+    def read(self, ticker, start=None, end=None, columns=VALUE_COLUMNS):
+        """
+        Legge una finestra di date (estremi inclusi) con una ricerca binaria.
+
+        Returns:
+            DataFrame: Indicizzato per data con le colonne richieste
+        """
+        length = self._length(ticker)
+        dates = self._map(ticker, "date", np.int64, length)
+        first = 0 if start is None else np.searchsorted(dates, self._to_days([start])[0], side="left")
+        last = length if end is None else np.searchsorted(dates, self._to_days([end])[0], side="right")
+
+        index = pd.DatetimeIndex(np.array(dates[first:last]).astype("datetime64[D]"), name="date")
+        return pd.DataFrame(
+            {column: np.array(self._map(ticker, column, np.float64, length)[first:last])
+             for column in columns},
+            index=index
+        )
+
+    def matrix(self, tickers, column, start=None, end=None):
+        """
+        Una colonna di più ticker allineata per data (una colonna per ticker).
+        Le date mancanti per un ticker restano NaN.
+        """
+        series = {ticker: self.read(ticker, start, end, columns=(column,))[column] for ticker in tickers}
+        if not series:
+            return pd.DataFrame()
+        return pd.DataFrame(series).sort_index()
+
+    def close_matrix(self, tickers, start=None, end=None):
+        """Prezzi di chiusura di più ticker allineati per data."""
+        return self.matrix(tickers, "close", start, end)
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class FileStamp:
+    """
+    Versione dei dati condivisa tra processi: un file riscritto (con os.replace)
+    da chi aggiorna i dati. Leggerla costa un solo os.stat.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self):
+        """Versione corrente (inode e mtime del file), None se il file non esiste."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def touch(self):
+        """Segnala agli altri processi che i dati sono cambiati."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, self.path)
+
+
+class QueryCache:
+    """
+    Cache dei risultati condivisa tra tutte le sessioni del processo Streamlit.
+    Ogni voce scade dopo `ttl` secondi; oltre `max_entries` voci viene
+    eliminata quella usata meno di recente (LRU).
+    Le chiavi sono tuple il cui primo elemento è il nome della vista,
+    così invalidate("v_dist_etf") elimina tutte le varianti di quella vista.
+    Con `stamp` (es. FileStamp) la cache viene svuotata a ogni lettura in cui
+    la versione dei dati risulta cambiata, anche se l'ha cambiata un altro processo.
+    """
+
+    def __init__(self, ttl, max_entries, stamp=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stamp = stamp
+        self._stamp_seen = stamp() if stamp else None
+        self._entries = OrderedDict()  # chiave -> (scadenza, valore)
+        self._key_locks = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get_or_load(self, key, loader):
+        """
+        Ritorna il valore in cache per `key`, altrimenti lo calcola con `loader()`.
+        Richieste concorrenti per la stessa chiave eseguono `loader` una sola volta.
+        Le eccezioni di `loader` non vengono messe in cache.
+        """
+        self._check_stamp()
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                found, value = self._lookup(key, time.monotonic())
+                if found:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+                generation = (self._epoch, self._generations.get(key[0], 0))
+
+            value = loader()
+
+            with self._lock:
+                # Se nel frattempo la vista è stata invalidata il valore è già vecchio
+                if (self._epoch, self._generations.get(key[0], 0)) == generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._key_locks.pop(evicted, None)
+            return value
+
+    def _check_stamp(self):
+        if self.stamp is None:
+            return
+        current = self.stamp()
+        with self._lock:
+            if current != self._stamp_seen:
+                self._stamp_seen = current
+                self._epoch += 1
+                self._entries.clear()
+                self._key_locks.clear()
+
+    def invalidate(self, *names):
+        """Elimina tutte le voci delle viste indicate."""
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [key for key in self._entries if key[0] in names]:
+                del self._entries[key]
+                self._key_locks.pop(key, None)
+
+    def clear(self):
+        """Svuota completamente la cache."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._key_locks.clear()
+
+    def stats(self):
+        """Ritorna hit, miss e numero di voci presenti."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
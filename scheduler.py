@@ -0,0 +1,206 @@
+"""
+Aggiornamento dei dati in background, fuori dal ciclo di rerun di Streamlit.
+Esegue periodicamente i job "prices", "history", "holdings" e "fx" con gli
+intervalli di config.SCHEDULER_INTERVALS. Ogni job ha un lock su file, quindi
+non si sovrappone mai a sé stesso (neanche se lanciato dall'interfaccia o da
+un altro processo), e l'esito dell'ultima esecuzione viene salvato su disco.
+
+Uso:
+    python scheduler.py              # ciclo continuo
+    python scheduler.py --once       # esegue i job scaduti ed esce
+    python scheduler.py --jobs prices history --force
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import (
+    SCHEDULER_INTERVALS, SCHEDULER_STATE_FILE, SCHEDULER_LOCK_DIR,
+    SCHEDULER_LOCK_STALE, HOLDINGS_CSV_DIR, DATA_STAMP_FILE,
+)
+from query_cache import FileStamp
+
+logger = logging.getLogger(__name__)
+_state_lock = threading.Lock()
+# Versione dei dati letta dalle cache di database e finance_info in ogni processo
+data_stamp = FileStamp(DATA_STAMP_FILE)
+
+
+class JobAlreadyRunning(Exception):
+    """Il job è già in esecuzione in questo o in un altro processo."""
+
+
+# =========================
+# Lock e stato
+# =========================
+
+@contextmanager
+def job_lock(name):
+    """
+    Lock esclusivo su file per un job. Un lock più vecchio di
+    SCHEDULER_LOCK_STALE secondi è considerato abbandonato e viene rimosso.
+    """
+    os.makedirs(SCHEDULER_LOCK_DIR, exist_ok=True)
+    path = os.path.join(SCHEDULER_LOCK_DIR, f"{name}.lock")
+    try:
+        if time.time() - os.path.getmtime(path) > SCHEDULER_LOCK_STALE:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise JobAlreadyRunning(f"Job '{name}' già in esecuzione")
+    try:
+        os.write(fd, f"{os.getpid()} {datetime.now().isoformat()}".encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def load_state():
+    """Ritorna lo stato salvato di tutti i job ({job: {...}})."""
+    try:
+        with open(SCHEDULER_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _update_state(name, **values):
+    with _state_lock:
+        state = load_state()
+        state.setdefault(name, {}).update(values)
+        os.makedirs(os.path.dirname(SCHEDULER_STATE_FILE) or ".", exist_ok=True)
+        tmp_path = f"{SCHEDULER_STATE_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, SCHEDULER_STATE_FILE)
+        return state[name]
+
+
+# =========================
+# Job
+# =========================
+
+def refresh_prices():
+    """Prezzi correnti di tutti gli ETF con download batch e un unico upsert."""
+    from finance_info import refresh_etf_prices
+    report = refresh_etf_prices()
+    return {"updated": len(report["updated"]), "failed": report["failed"]}
+
+def refresh_history():
+    """Storico prezzi incrementale (ETF in portafoglio e benchmark) su Supabase e archivio locale allineato."""
+    from config import BENCHMARKS
+    from database import get_etf_list
+    from finance_info import get_all_etf_history, sync_price_store
+    tickers = list(dict.fromkeys([str(etf['etf_ticker']) for etf in get_etf_list()] + list(BENCHMARKS.values())))
+    new_rows = {ticker: len(get_all_etf_history(ticker, incremental=True)) for ticker in tickers}
+    sync_price_store(tickers)
+    return {"new_rows": new_rows}
+
+def refresh_holdings():
+    """Reimporta le holding dai CSV iShares in HOLDINGS_CSV_DIR modificati dall'ultima esecuzione."""
+    from data_manager import read_holdings_csv
+    from database import insert_holdings
+    imported = load_state().get("holdings", {}).get("files", {})
+    results = {}
+    if os.path.isdir(HOLDINGS_CSV_DIR):
+        for filename in sorted(os.listdir(HOLDINGS_CSV_DIR)):
+            if not filename.lower().endswith(".csv"):
+                continue
+            path = os.path.join(HOLDINGS_CSV_DIR, filename)
+            mtime = os.path.getmtime(path)
+            if imported.get(filename) == mtime:
+                continue
+            etf_name = filename.split('.')[0]  # Nome etf preso dal nome del file
+            results[etf_name] = insert_holdings(etf_name, read_holdings_csv(path).to_dict('records'))
+            imported[filename] = mtime
+    _update_state("holdings", files=imported)
+    return {"imported": results}
+
+def refresh_fx():
+    """Cambi giornalieri verso la valuta base per le valute supportate."""
+    from finance_info import refresh_fx_rates
+    return {"new_rows": refresh_fx_rates()}
+
+JOBS = {
+    "prices": refresh_prices,
+    "history": refresh_history,
+    "holdings": refresh_holdings,
+    "fx": refresh_fx,
+}
+
+def run_job(name):
+    """
+    Esegue un job con il suo lock e ne salva l'esito.
+
+    Raises:
+        JobAlreadyRunning: se il job è già in corso
+    Returns:
+        dict: Stato aggiornato del job
+    """
+    with job_lock(name):
+        started = time.perf_counter()
+        _update_state(name, last_run=datetime.now().isoformat(timespec="seconds"), status="running")
+        try:
+            detail = JOBS[name]()
+        except Exception as e:
+            logger.exception(f"Job {name} fallito")
+            return _update_state(name, status="error", error=str(e),
+                                 seconds=round(time.perf_counter() - started, 2))
+        finally:
+            # Le cache dei processi Streamlit non vedono le scritture fatte qui
+            # (anche quelle parziali di un job fallito): cambia la versione dei dati
+            data_stamp.touch()
+        logger.info(f"Job {name} completato in {time.perf_counter() - started:.1f}s")
+        return _update_state(
+            name, status="ok", error=None, detail=detail,
+            last_success=datetime.now().isoformat(timespec="seconds"),
+            seconds=round(time.perf_counter() - started, 2)
+        )
+
+def due_jobs(names, now=None):
+    """Job il cui ultimo avvio è più vecchio del rispettivo intervallo."""
+    now = now or datetime.now()
+    state = load_state()
+    due = []
+    for name in names:
+        last_run = state.get(name, {}).get("last_run")
+        if last_run is None or (now - datetime.fromisoformat(last_run)).total_seconds() >= SCHEDULER_INTERVALS[name]:
+            due.append(name)
+    return due
+
+def run_pending(names, force=False):
+    """Esegue in sequenza i job scaduti (o tutti con force), saltando quelli già in corso."""
+    for name in (names if force else due_jobs(names)):
+        try:
+            run_job(name)
+        except JobAlreadyRunning as e:
+            logger.info(str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", nargs="+", choices=list(JOBS), default=list(JOBS), help="Job da eseguire")
+    parser.add_argument("--once", action="store_true", help="Esegue i job scaduti una volta ed esce")
+    parser.add_argument("--force", action="store_true", help="Ignora gli intervalli e esegue subito i job")
+    parser.add_argument("--poll", type=int, default=60, help="Secondi tra un controllo e l'altro (default: 60)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    run_pending(args.jobs, force=args.force)
+    while not args.once:
+        time.sleep(args.poll)
+        run_pending(args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+-- Holding degli ETF: ogni riga del file iShares è una holding distinta.
+-- Il ticker dell'emittente non è univoco (es. AIR è sia Airbus sia AAR Corp),
+-- quindi il vincolo di unicità su (etf_ticker, ticker) va rimosso.
+do $$
+declare
+    vincolo record;
+begin
+    for vincolo in
+        select con.conname
+        from pg_constraint con
+        where con.conrelid = 'public.etf_holdings'::regclass
+          and con.contype in ('u', 'p')
+          and (
+              select array_agg(att.attname::text order by att.attname)
+              from unnest(con.conkey) as chiave(attnum)
+              join pg_attribute att on att.attrelid = con.conrelid and att.attnum = chiave.attnum
+          ) = array['etf_ticker', 'ticker']
+    loop
+        execute format('alter table public.etf_holdings drop constraint %I', vincolo.conname);
+    end loop;
+end $$;
+
+create index if not exists etf_holdings_etf_ticker_idx on public.etf_holdings (etf_ticker);
+
+-- Sostituisce tutte le holding di un ETF in un'unica transazione: se
+-- l'inserimento fallisce anche la cancellazione viene annullata.
+-- Ritorna i conteggi reali {"inserted", "removed"}.
+create or replace function public.replace_etf_holdings(p_etf_ticker text, p_holdings jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_removed integer;
+    v_inserted integer;
+begin
+    delete from public.etf_holdings where etf_ticker = p_etf_ticker;
+    get diagnostics v_removed = row_count;
+
+    insert into public.etf_holdings (
+        etf_ticker, ticker, nome, settore, asset_class, ponderazione,
+        area_geografica, cambio, valuta_mercato
+    )
+    select p_etf_ticker, h.ticker, h.nome, h.settore, h.asset_class, h.ponderazione,
+           h.area_geografica, h.cambio, h.valuta_mercato
+    from jsonb_to_recordset(p_holdings) as h(
+        ticker text, nome text, settore text, asset_class text, ponderazione numeric,
+        area_geografica text, cambio text, valuta_mercato text
+    );
+    get diagnostics v_inserted = row_count;
+
+    return jsonb_build_object('inserted', v_inserted, 'removed', v_removed);
+end;
+$$;
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+
+
+class SymbolResolver:
+    """
+    Cache su disco del simbolo Yahoo funzionante per ogni ticker base (e ISIN).
+    Salva anche gli esiti negativi, così un ticker inesistente non viene
+    ricercato su tutte le borse a ogni chiamata. Ogni voce ha una scadenza.
+    Il file viene letto alla prima richiesta, non alla creazione.
+    """
+
+    def __init__(self, path, ttl, negative_ttl):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, ticker, isin=None):
+        """
+        Cerca il simbolo salvato per ticker o ISIN.
+
+        Returns:
+            tuple: (trovato, simbolo) dove simbolo è None per un esito negativo
+        """
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            for key in (isin, ticker):
+                entry = entries.get(key) if key else None
+                if entry is not None and entry["expires"] > now:
+                    return True, entry["symbol"]
+            return False, None
+
+    def store(self, ticker, symbol, isin=None):
+        """Salva il simbolo funzionante, o None se nessuna borsa lo quota."""
+        ttl = self.ttl if symbol else self.negative_ttl
+        entry = {"symbol": symbol, "expires": time.time() + ttl}
+        with self._lock:
+            entries = self._load()
+            for key in (ticker, isin):
+                if key:
+                    entries[key] = entry
+            self._save()
+
+    def forget(self, ticker, isin=None):
+        """Elimina il simbolo salvato (es. quando smette di funzionare)."""
+        with self._lock:
+            entries = self._load()
+            for key in (ticker, isin):
+                if key:
+                    entries.pop(key, None)
+            self._save()
+
+    def candidates(self, ticker, suffixes, isin=None):
+        """
+        Simboli da provare in ordine: solo quello salvato se noto,
+        nessuno se l'esito salvato è negativo, altrimenti tutti i suffissi.
+
+        Returns:
+            tuple: (simboli, da_cache) dove da_cache indica un esito già salvato
+        """
+        found, symbol = self.lookup(ticker, isin)
+        if found:
+            return ([symbol] if symbol else []), True
+        return [f"{ticker}{suffix}" if suffix else ticker for suffix in suffixes], False
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import synthetic
+from bench_analytics import NOISE_SECONDS, regressions
+
+
+def test_regressions_flags_only_cases_beyond_threshold_and_noise():
+    baseline = {
+        "lento@1000": {"seconds": 1.0, "peak_mb": 10.0},
+        "rumore@10": {"seconds": 0.001, "peak_mb": 1.0},
+        "memoria@1000": {"seconds": 1.0, "peak_mb": 100.0},
+        "stabile@1000": {"seconds": 1.0, "peak_mb": 100.0},
+    }
+    results = {
+        "lento@1000": {"seconds": 1.3, "peak_mb": 10.0},
+        # Raddoppio ma sotto il rumore assoluto
+        "rumore@10": {"seconds": 0.001 + NOISE_SECONDS / 2, "peak_mb": 1.5},
+        "memoria@1000": {"seconds": 1.0, "peak_mb": 130.0},
+        "stabile@1000": {"seconds": 1.2, "peak_mb": 120.0},
+        # Senza baseline: non confrontabile
+        "nuovo@1000": {"seconds": 9.0, "peak_mb": 900.0},
+    }
+
+    found = regressions(results, baseline, threshold=0.25)
+
+    assert found == ["lento@1000: tempo 1.0000s -> 1.3000s", "memoria@1000: memoria 100.0MB -> 130.0MB"]
+
+
+def test_synthetic_data_is_deterministic_and_shaped_like_the_tables():
+    names = synthetic.tickers(3)
+    history = synthetic.make_price_history(names, days=70)
+    transactions = synthetic.make_transactions(500, names, days=70)
+
+    assert names == ["ETF000", "ETF001", "ETF002"]
+    assert len(history) == 210 and set(history["ticker"]) == set(names)
+    assert (history["close"] > 0).all()
+    pd.testing.assert_frame_equal(history, synthetic.make_price_history(names, days=70))
+    assert len(transactions) == 500
+    assert transactions["data_operazione"].is_monotonic_increasing
+    # Acquisti in uscita, vendite in entrata
+    buys = transactions["tipo_operazione"] == "Acquisto"
+    assert (transactions.loc[buys, "importo_euro"] < 0).all()
+    assert (transactions.loc[~buys, "importo_euro"] > 0).all()
+    holdings = synthetic.make_holdings(names, per_etf=20)
+    weights = [float(row["Ponderazione (%)"].replace(",", ".")) for row in holdings["ETF000"]]
+    assert np.isclose(sum(weights), 100.0, atol=0.01)
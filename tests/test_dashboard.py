@@ -0,0 +1,101 @@
+import pytest
+import streamlit as st
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+import views.dashboard
+import views.metriche
+import views.rendimento_annuo
+from data_manager import apply_session_data
+from views.dashboard import DISTRIBUZIONI, DashboardFrames, get_dashboard_frames
+
+
+def session_rows(prezzo_corrente=110.0):
+    rows = {
+        "etf_transactions": [
+            {"id": 1, "Ticker": "SWDA", "Quantità": 10, "Prezzo di acquisto": 100.0,
+             "Prezzo corrente": prezzo_corrente, "Costo": 1000.0, "Market Value": 10 * prezzo_corrente,
+             "Crescita %": (prezzo_corrente - 100.0)},
+            {"id": 2, "Ticker": "EIMI", "Quantità": 20, "Prezzo di acquisto": 30.0,
+             "Prezzo corrente": 27.0, "Costo": 600.0, "Market Value": 540.0, "Crescita %": -10.0},
+        ],
+        "prezzo_medio_acquisto": [
+            {"ticker": "SWDA", "prezzo_medio_acquisto": 100.0, "price": prezzo_corrente, "costo_investito_eur": 1000.0},
+            {"ticker": "EIMI", "prezzo_medio_acquisto": 30.0, "price": 27.0, "costo_investito_eur": 600.0},
+        ],
+        "top_3_etf": [{"ticker": "SWDA"}],
+        "bottom_3_etf": [{"ticker": "EIMI"}],
+        "kpi_etf": [
+            {"ticker": "SWDA", "costo_investito_eur": 1000.0, "market_value_attuale": 1100.0},
+            {"ticker": "M.LIQ", "costo_investito_eur": 50.0, "market_value_attuale": 50.0},
+        ],
+    }
+    rows.update({key: [{"distribuzione_pct": 100.0}] for key in DISTRIBUZIONI})
+    return rows
+
+
+@pytest.fixture
+def session():
+    # Fuori da `streamlit run` session_state funziona ma avvisa a ogni accesso
+    set_log_level("error")
+    st.session_state.clear()
+    yield st.session_state
+    st.session_state.clear()
+
+
+def test_dashboard_frames_totals_and_tables():
+    frames = DashboardFrames(session_rows())
+
+    assert frames.costo_totale == 1600.0
+    assert frames.market_value_totale == 1640.0
+    assert frames.crescita_totale == 40.0
+    assert frames.rendimento_perc == pytest.approx(2.5)
+    assert list(frames.prezzo_medio_acquisto["diff_prezzo"]) == [10.0, -3.0]
+    assert "id" not in frames.posizioni.columns
+    assert frames.posizioni_styled is not None
+    # I ticker "M." non vanno nel grafico dei KPI
+    assert list(frames.kpi_chart["ticker"]) == ["SWDA"]
+    assert set(frames.distribuzioni) == set(DISTRIBUZIONI)
+
+
+def test_dashboard_frames_are_rebuilt_only_for_a_new_data_version(session):
+    apply_session_data(session, session_rows())
+
+    frames = get_dashboard_frames()
+    # Rerun senza nuovi dati: stessa istanza
+    assert get_dashboard_frames() is frames
+
+    apply_session_data(session, session_rows(prezzo_corrente=120.0))
+    updated = get_dashboard_frames()
+
+    assert updated is not frames
+    assert updated.market_value_totale == 1740.0
+    assert get_dashboard_frames() is updated
+
+
+def dashboard_app():
+    from views.dashboard import render_dashboard
+    render_dashboard()
+
+
+def test_dashboard_runs_only_the_open_tab(monkeypatch):
+    set_log_level("error")
+    aperte = []
+    monkeypatch.setattr(views.dashboard, "render_riepilogo", lambda: aperte.append("riepilogo"))
+    monkeypatch.setattr(views.dashboard, "render_analisi", lambda: aperte.append("analisi"))
+    monkeypatch.setattr(views.metriche, "render_metriche", lambda: aperte.append("metriche"))
+    monkeypatch.setattr(views.rendimento_annuo, "render_rendimento_annuo", lambda: aperte.append("rendimento"))
+
+    app = AppTest.from_function(dashboard_app)
+    app.session_state["etf_transactions"] = [{"Ticker": "SWDA"}]
+    app.run()
+
+    assert not app.exception
+    assert aperte == ["riepilogo"]
+
+    aperte.clear()
+    app.session_state["dashboard_tab"] = "🏆 Rendimento annuo"
+    app.run()
+
+    assert not app.exception
+    assert aperte == ["rendimento"]
@@ -0,0 +1,31 @@
+import database
+from data_manager import apply_session_data, load_session_data
+
+
+class FailingClient:
+    def table(self, name):
+        raise ConnectionError("Supabase non raggiungibile")
+
+
+def test_load_session_data_reports_failed_queries(monkeypatch):
+    monkeypatch.setattr(database, "_client", FailingClient())
+    database.query_cache.clear()
+
+    data, report = load_session_data(["etf_transactions", "kpi_etf"])
+
+    assert data == {"etf_transactions": [], "kpi_etf": []}
+    assert "non raggiungibile" in report["etf_transactions"]["error"]
+    assert report["kpi_etf"]["error"]
+
+
+def test_apply_session_data_keeps_previous_rows_on_failure():
+    session = {"etf_transactions": [{"Ticker": "SWDA"}]}
+    report = {
+        "etf_transactions": {"seconds": 0.1, "error": "timeout"},
+        "kpi_etf": {"seconds": 0.1, "error": "timeout"},
+    }
+
+    apply_session_data(session, {"etf_transactions": [], "kpi_etf": []}, report)
+
+    assert session["etf_transactions"] == [{"Ticker": "SWDA"}]
+    assert session["kpi_etf"] == []
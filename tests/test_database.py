@@ -0,0 +1,111 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import database
+from stand_ins import FakeSupabase
+
+
+def holding(ticker, nome, settore, peso, area="Stati Uniti", cambio="New York Stock Exchange Inc."):
+    return {
+        "Ticker dell'emittente": ticker, "Nome": nome, "Settore": settore, "Asset Class": "Azionario",
+        "Ponderazione (%)": peso, "Area Geografica": area, "Cambio": cambio, "Valuta di mercato": "USD",
+    }
+
+
+def test_insert_holdings_keeps_distinct_holdings_with_the_same_ticker(monkeypatch):
+    client = FakeSupabase({"etf_holdings": [
+        {"etf_ticker": "DFNS", "ticker": "OLD", "nome": "VECCHIA", "cambio": "Xetra", "ponderazione": 1.0},
+        {"etf_ticker": "ALTRO", "ticker": "AIR", "nome": "AIRBUS", "cambio": "Xetra", "ponderazione": 9.0},
+    ]})
+    monkeypatch.setattr(database, "_client", client)
+
+    esito = database.insert_holdings("DFNS", [
+        holding("AIR", "AIRBUS SE", "Industria", "5,10", "Francia", "Nyse Euronext - Euronext Paris"),
+        holding("AIR", "AAR CORP", "Industria", "0,40"),
+        holding("LMT", "LOCKHEED MARTIN CORP", "Industria", "4,00"),
+    ])
+
+    rows = client.tables["etf_holdings"]
+    dfns = rows[rows["etf_ticker"] == "DFNS"].set_index("nome")
+    assert sorted(dfns.index) == ["AAR CORP", "AIRBUS SE", "LOCKHEED MARTIN CORP"]
+    assert dfns.loc["AIRBUS SE", "ponderazione"] == 5.1
+    assert dfns.loc["AAR CORP", "ponderazione"] == 0.4
+    assert dfns.loc["AIRBUS SE", "area_geografica"] == "Francia"
+    assert dfns.loc["AAR CORP", "area_geografica"] == "Stati Uniti"
+    # Le holding degli altri ETF non vengono toccate
+    assert len(rows[rows["etf_ticker"] == "ALTRO"]) == 1
+    assert esito == {"inserted": 3, "removed": 1}
+
+
+def test_insert_holdings_keeps_previous_rows_when_the_replacement_fails(monkeypatch):
+    client = FakeSupabase({"etf_holdings": [
+        {"etf_ticker": "DFNS", "ticker": "AIR", "nome": "AIRBUS SE", "cambio": "Xetra", "ponderazione": 5.0},
+    ]})
+
+    def failing(db, p_etf_ticker, p_holdings):
+        raise RuntimeError("timeout")
+
+    monkeypatch.setattr(client, "functions", {"replace_etf_holdings": failing})
+    monkeypatch.setattr(database, "_client", client)
+
+    with pytest.raises(RuntimeError):
+        database.insert_holdings("DFNS", [holding("LMT", "LOCKHEED MARTIN CORP", "Industria", "4,00")])
+
+    assert client.tables["etf_holdings"]["nome"].tolist() == ["AIRBUS SE"]
+    # Una sola chiamata: nessuna DELETE separata che possa restare a metà
+    assert client.requests == 1
+
+
+def history_client(days=5, tickers=("EIMI", "SWDA")):
+    dates = pd.bdate_range("2024-01-01", periods=days).strftime("%Y-%m-%d")
+    return FakeSupabase({"etf_price_history": [
+        {"ticker": ticker, "date": date, "close": 100.0 + i, "dividends": 0.0}
+        for ticker in tickers for i, date in enumerate(dates)
+    ]})
+
+
+def test_iter_pages_reads_lazily_in_ordered_pages(monkeypatch):
+    client = history_client(days=5)
+    monkeypatch.setattr(database, "_client", client)
+
+    pages = database.iter_pages("etf_price_history", ["ticker", "date"], order=["ticker", "date"], page_size=4)
+    first = next(pages)
+    # La pagina successiva non viene richiesta finché non serve
+    assert client.requests == 1
+    rest = list(pages)
+
+    assert [len(page) for page in [first] + rest] == [4, 4, 2]
+    assert first[0] == {"ticker": "EIMI", "date": "2024-01-01"}
+    assert rest[-1][-1] == {"ticker": "SWDA", "date": "2024-01-05"}
+    assert client.requests == 3
+
+
+def test_iter_pages_stops_after_an_empty_page_on_exact_multiples(monkeypatch):
+    client = history_client(days=4)
+    monkeypatch.setattr(database, "_client", client)
+
+    pages = list(database.iter_pages("etf_price_history", "ticker", order=["ticker", "date"], page_size=4))
+
+    assert [len(page) for page in pages] == [4, 4]
+    assert client.requests == 3
+
+
+def test_history_frame_applies_filters_and_dtypes(monkeypatch):
+    monkeypatch.setattr(database, "_client", history_client(days=5))
+    database.query_cache.clear()
+
+    frame = database.get_etf_history_frame(tickers=["SWDA"], start="2024-01-02", end="2024-01-04")
+
+    assert list(frame.columns) == ["ticker", "date", "close"]
+    assert frame["ticker"].dtype == "category"
+    assert frame["date"].dtype == "datetime64[ns]"
+    assert frame["date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert frame["close"].tolist() == [101.0, 102.0, 103.0]
+
+    vuoto = database.get_etf_history_frame(tickers=["NUOVO"])
+    assert vuoto.empty and vuoto["date"].dtype == "datetime64[ns]"
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import database
+import finance_info
+from stand_ins import offline
+
+
+def transactions_frame(rows):
+    frame = pd.DataFrame(rows, columns=["ticker", "tipo_operazione", "data_operazione", "importo_euro"])
+    frame["data_operazione"] = pd.to_datetime(frame["data_operazione"])
+    frame["importo_divisa"] = 0.0
+    frame["divisa"] = "EUR"
+    return frame
+
+
+def xirr(monkeypatch, rows):
+    monkeypatch.setattr(database, "get_transactions_frame", lambda columns=None, **kwargs: transactions_frame(rows))
+    monkeypatch.setattr(database, "get_prezzo_medio_acquisto",
+                        lambda: [{"ticker": "SWDA", "quantita": 10, "price": 95.0}])
+    finance_info.analytics_cache.clear()
+    return finance_info.calculate_xirr()
+
+
+def test_calculate_xirr_ignores_deposits_and_other_cash_movements(monkeypatch):
+    acquisti = [
+        ("SWDA", "Acquisto", "2024-01-02", -600.0),
+        ("SWDA", "Acquisto", "2024-07-01", -500.0),
+    ]
+    atteso = xirr(monkeypatch, acquisti)
+
+    # Import Directa: i movimenti di conto hanno ticker "0" dopo fillna(0)
+    con_movimenti = acquisti + [
+        ("0", "Conferimento con bonifico", "2023-12-20", 1500.0),
+        ("0", "Bollo portafoglio titoli*", "2024-06-30", -22.1),
+        ("SWDA", "Rit.cedola obb.", "2024-05-01", -9.84),
+    ]
+    risultato = xirr(monkeypatch, con_movimenti)
+
+    assert list(risultato.index) == list(atteso.index) == ["SWDA", "Portafoglio"]
+    assert np.allclose(risultato.to_numpy(), atteso.to_numpy())
+
+
+def test_benchmark_returns_without_history_keep_a_date_index():
+    # Stato iniziale finché il job "history" non ha scaricato il benchmark
+    with offline({"etf_price_history": []}):
+        rendimenti = finance_info.get_benchmark_returns("SWDA", "Y")
+
+    assert rendimenti.empty
+    assert list(rendimenti.index.year) == []
+
+
+def test_concurrent_sessions_share_one_portfolio_valuation(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    import portfolio
+
+    builds = []
+
+    class SlowValuation(portfolio.PortfolioValuation):
+        def __init__(self, trades, prices):
+            builds.append(1)
+            time.sleep(0.05)
+            super().__init__(trades, prices)
+
+    monkeypatch.setattr(portfolio, "PortfolioValuation", SlowValuation)
+    monkeypatch.setattr(finance_info, "_portfolio_valuation", None)
+    monkeypatch.setattr(database, "get_transactions_frame", lambda columns=None, **kwargs: pd.DataFrame({
+        "ticker": ["SWDA"], "tipo_operazione": ["Acquisto"], "data_operazione": [pd.Timestamp("2024-01-02")],
+        "quantita": [10.0], "importo_euro": [-1000.0], "importo_divisa": [0.0], "divisa": ["EUR"],
+    }))
+    monkeypatch.setattr(finance_info, "load_close_prices", lambda tickers, **kwargs: pd.DataFrame(
+        {"SWDA": [100.0, 101.0]}, index=pd.bdate_range("2024-01-02", periods=2)))
+
+    with ThreadPoolExecutor(4) as pool:
+        valuations = list(pool.map(lambda _: finance_info.get_portfolio_valuation(), range(4)))
+
+    assert len(builds) == 1
+    assert all(valuation is valuations[0] for valuation in valuations)
+
+
+def test_incremental_history_without_new_bars_keeps_the_symbol():
+    import synthetic
+    from stand_ins import write_replay
+    import market_data
+
+    history = synthetic.make_price_history(["SWDA"], days=60, start="2024-01-01")
+    with offline({"etf_price_history": history}, history) as client:
+        # Su .DE esiste già una barra in più: non deve finire nello storico di .MI
+        replay = market_data.get_provider().root
+        extra = history.iloc[-1:].assign(date="2024-03-26", close=1.0)
+        write_replay(replay, pd.concat([history, extra]), suffix=".DE")
+
+        assert finance_info.get_etf_prices(["SWDA"]) == {"SWDA": history["close"].iloc[-1]}
+        finance_info.symbol_resolver.forget("SWDA")
+
+        nuove = finance_info.get_all_etf_history("SWDA", incremental=True)
+
+        assert nuove.empty
+        assert finance_info.symbol_resolver.lookup("SWDA") == (True, "SWDA.MI")
+        assert len(client.tables["etf_price_history"]) == len(history)
+        assert finance_info.get_etf_prices(["SWDA"]) == {"SWDA": history["close"].iloc[-1]}
+
+
+def test_fx_rates_are_read_only_from_the_local_store():
+    from stand_ins import write_replay
+    import market_data
+
+    dates = pd.bdate_range("2024-01-01", periods=3).strftime("%Y-%m-%d")
+    cambi = pd.DataFrame({"ticker": "EURUSD=X", "date": dates, "close": [1.10, 1.25, 1.20], "dividends": 0.0})
+    with offline():
+        write_replay(market_data.get_provider().root, cambi, suffix="")
+        calls = []
+        history = market_data.get_provider().history
+        market_data.get_provider().history = lambda *args, **kwargs: calls.append(args) or history(*args, **kwargs)
+
+        # Prima del job "fx" nessun download: il cambio manca e viene segnalato
+        assert finance_info.missing_fx_rates(["USD", "EUR"]) == ["USD"]
+        assert np.isnan(finance_info.amounts_to_base([110.0], ["2024-01-02"], ["USD"])).all()
+        assert calls == []
+
+        assert finance_info.refresh_fx_rates(["USD"]) == {"USD": 3}
+        assert finance_info.missing_fx_rates(["USD"]) == []
+        # Ogni importo al cambio della propria data, o all'ultimo disponibile prima
+        convertiti = finance_info.amounts_to_base(
+            [110.0, 125.0, 60.0, 50.0], ["2024-01-01", "2024-01-02", "2024-01-06", "2024-01-02"],
+            ["USD", "USD", "USD", "EUR"])
+        assert np.allclose(convertiti, [100.0, 100.0, 50.0, 50.0])
+
+
+def test_incremental_history_downloads_only_new_bars():
+    import synthetic
+
+    history = synthetic.make_price_history(["SWDA"], days=60, start="2024-01-01")
+    with offline({"etf_price_history": history.iloc[:55]}, history) as client:
+        finance_info.sync_price_store(["SWDA"])
+
+        nuove = finance_info.get_all_etf_history("SWDA", incremental=True)
+
+        assert [str(date) for date in nuove["date"]] == history["date"].iloc[55:].tolist()
+        assert len(client.tables["etf_price_history"]) == 60
+        assert finance_info.price_store.last_date("SWDA") == pd.Timestamp(history["date"].iloc[-1]).date()
+
+
+def test_history_with_gaps_is_downloaded_again():
+    import synthetic
+
+    history = synthetic.make_price_history(["SWDA"], days=60, start="2024-01-01")
+    assert not finance_info.history_needs_backfill(
+        {"first_date": pd.Timestamp("2024-01-01").date(), "last_date": pd.Timestamp("2024-03-22").date(), "rows": 60})
+    # Un giorno su tre mancante non si spiega con le festività
+    with offline({"etf_price_history": history.iloc[:55:3]}, history):
+        assert len(finance_info.get_all_etf_history("SWDA", incremental=True)) == 60
+
+
+def test_price_refresh_batches_downloads_per_suffix_and_upserts_once():
+    import synthetic
+    from stand_ins import write_replay
+    import market_data
+
+    history = synthetic.make_price_history(["SWDA", "EIMI", "CSPX"], days=10, start="2024-01-01")
+    last = history.groupby("ticker")["close"].last()
+    with offline({"etf_prices": [{"ticker": "SWDA", "price": 1.0}]}) as client:
+        replay = market_data.get_provider().root
+        write_replay(replay, history[history["ticker"] != "EIMI"], suffix=".MI")
+        write_replay(replay, history[history["ticker"] == "EIMI"], suffix=".DE")
+        provider = market_data.get_provider()
+        downloads = []
+        download_close = provider.download_close
+        provider.download_close = lambda symbols, **kwargs: downloads.append(sorted(symbols)) or download_close(
+            symbols, **kwargs)
+
+        report = finance_info.refresh_etf_prices(["SWDA", "EIMI", "CSPX", "NESSUNO"])
+
+        assert report["updated"] == {ticker: last[ticker] for ticker in ("SWDA", "EIMI", "CSPX")}
+        assert report["failed"] == {"NESSUNO": "Prezzo non disponibile"}
+        # Tutti su .MI insieme, poi solo i mancanti su .DE
+        assert downloads == [["CSPX.MI", "EIMI.MI", "NESSUNO.MI", "SWDA.MI"], ["EIMI.DE", "NESSUNO.DE"]]
+        prezzi = client.tables["etf_prices"].set_index("ticker")["price"]
+        assert prezzi.to_dict() == report["updated"]
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from fx import align_rates, convert_amounts, convert_frame, fx_symbol
+
+RATES = pd.DataFrame(
+    {"USD": [1.10, 1.25, 1.20], "GBP": [0.85, np.nan, 0.80], "EUR": 1.0},
+    index=pd.to_datetime(["2024-01-03", "2024-01-04", "2024-01-05"]),
+)
+
+
+def test_fx_symbol_is_quoted_against_the_base_currency():
+    assert fx_symbol("USD", "EUR") == "EURUSD=X"
+
+
+def test_rates_are_aligned_to_the_last_available_day():
+    dates = pd.to_datetime(["2024-01-02", "2024-01-04", "2024-01-06", "2024-01-08"])
+
+    aligned = align_rates(RATES, dates)
+
+    assert np.isnan(aligned[0]).all()
+    assert aligned[1].tolist() == [1.25, 0.85, 1.0]
+    assert aligned[2].tolist() == aligned[3].tolist() == [1.20, 0.80, 1.0]
+
+
+def test_convert_frame_divides_each_column_by_its_currency():
+    prices = pd.DataFrame({"SPY": [110.0, 125.0], "ISF": [85.0, 85.0], "SWDA": [90.0, 91.0], "XYZ": [1.0, 1.0]},
+                          index=pd.to_datetime(["2024-01-03", "2024-01-04"]))
+
+    converted = convert_frame(prices, {"SPY": "USD", "ISF": "GBP", "SWDA": "EUR", "XYZ": "CHF"}, RATES)
+
+    assert np.allclose(converted["SPY"], [100.0, 100.0])
+    assert np.allclose(converted["ISF"], [100.0, 100.0])
+    assert converted["SWDA"].tolist() == [90.0, 91.0]
+    assert converted["XYZ"].isna().all()
+
+
+def test_convert_amounts_uses_the_rate_of_each_date():
+    converted = convert_amounts([110.0, 60.0, 80.0, 50.0, 10.0],
+                                ["2024-01-03", "2024-01-07", "2024-01-05", "2024-01-02", "2024-01-04"],
+                                ["USD", "USD", "GBP", "USD", "CHF"], RATES)
+
+    assert np.allclose(converted, [100.0, 50.0, 100.0, np.nan, np.nan], equal_nan=True)
+    assert convert_amounts([], [], [], RATES).size == 0
@@ -0,0 +1,110 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from market_data import (CircuitOpenError, MarketDataError, MarketDataProvider, RecordingProvider,
+                         ReplayProvider, ResilientProvider, TokenBucket)
+
+
+def test_provider_interface_is_abstract():
+    class Incomplete(MarketDataProvider):
+        def info(self, symbol):
+            return {}
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_replay_period_is_relative_to_last_recorded_date(tmp_path):
+    (tmp_path / "history").mkdir()
+    pd.DataFrame({
+        "Date": pd.bdate_range("2024-01-01", "2024-06-28").strftime("%Y-%m-%d"),
+        "Close": 100.0,
+        "Dividends": 0.0,
+    }).to_csv(tmp_path / "history" / "SWDA.MI.csv", index=False)
+
+    history = ReplayProvider(str(tmp_path)).history("SWDA.MI", period="1mo")
+
+    assert history.index[0] == pd.Timestamp("2024-05-29")
+    assert history.index[-1] == pd.Timestamp("2024-06-28")
+
+
+class ScriptedProvider(MarketDataProvider):
+    """Provider di prova: fallisce le prime `failures` chiamate, poi risponde."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    def history(self, symbol, start=None, period="max", interval="1d"):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise ConnectionError("timeout")
+        return pd.DataFrame({"Close": [100.0], "Dividends": [0.0]},
+                            index=pd.DatetimeIndex(["2024-01-02"], name="Date"))
+
+    def download_close(self, symbols, period="5d", interval="1d"):
+        return pd.DataFrame()
+
+    def info(self, symbol):
+        return {}
+
+
+def resilient(inner, **kwargs):
+    options = dict(rate=1000, burst=1000, retries=2, backoff=0.0, breaker_threshold=10, breaker_reset=60)
+    options.update(kwargs)
+    return ResilientProvider(inner, **options)
+
+
+def test_transient_errors_are_retried():
+    inner = ScriptedProvider(failures=2)
+
+    assert resilient(inner).history("SWDA.MI")["Close"].tolist() == [100.0]
+    assert inner.calls == 3
+
+
+def test_persistent_errors_open_the_circuit():
+    inner = ScriptedProvider(failures=100)
+    provider = resilient(inner, retries=1, breaker_threshold=2)
+
+    with pytest.raises(MarketDataError):
+        provider.history("SWDA.MI")
+    # Circuito aperto: nessuna nuova richiesta al provider sottostante
+    with pytest.raises(CircuitOpenError):
+        provider.history("SWDA.MI")
+    assert inner.calls == 2
+
+
+def test_identical_concurrent_requests_share_one_call():
+    inner = ScriptedProvider(delay=0.1)
+    provider = resilient(inner)
+
+    with ThreadPoolExecutor(5) as pool:
+        results = list(pool.map(lambda _: provider.history("SWDA.MI", period="1y"), range(5)))
+
+    assert inner.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_token_bucket_limits_the_request_rate():
+    bucket = TokenBucket(rate=50, capacity=2)
+    started = time.monotonic()
+
+    for _ in range(7):
+        bucket.acquire()
+
+    # Due gettoni subito, gli altri cinque a 50 al secondo
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+def test_recorded_history_is_served_by_replay(tmp_path):
+    recorded = RecordingProvider(ScriptedProvider(), str(tmp_path)).history("SWDA.MI")
+
+    replayed = ReplayProvider(str(tmp_path)).history("SWDA.MI")
+
+    assert replayed["Close"].tolist() == recorded["Close"].tolist()
+    assert ReplayProvider(str(tmp_path)).history("NESSUNO.MI").empty
@@ -0,0 +1,370 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics import PositionMetrics, drawdown_episodes
+
+
+def test_drawdown_episodes_columns_with_unequal_starts():
+    dates = pd.bdate_range("2024-01-01", periods=8)
+    values = pd.DataFrame({
+        # Episodio in corso fino all'ultima riga, seguito dalle NaN iniziali della colonna dopo
+        "A": [100, 110, 99, 104, 105, 90, 95, 97],
+        "Portafoglio": [np.nan, np.nan, np.nan, 50, 40, 55, 44, 60],
+    }, index=dates, dtype=np.float64)
+
+    episodes = drawdown_episodes(values)
+
+    a = episodes[episodes["ticker"] == "A"].reset_index(drop=True)
+    assert len(a) == 1
+    assert a.loc[0, "peak"] == dates[1]
+    assert a.loc[0, "trough"] == dates[5]
+    assert pd.isna(a.loc[0, "recovery"])
+    assert np.isclose(a.loc[0, "depth"], 90 / 110 - 1)
+
+    portafoglio = episodes[episodes["ticker"] == "Portafoglio"].reset_index(drop=True)
+    assert len(portafoglio) == 2
+    assert np.allclose(portafoglio["depth"], [40 / 50 - 1, 44 / 55 - 1])
+    assert list(portafoglio["trough"]) == [dates[4], dates[6]]
+    assert list(portafoglio["recovery"]) == [dates[5], dates[7]]
+    assert episodes["depth"].notna().all()
+
+
+def test_position_metrics_from_arrow_table_keeps_dates_and_tickers():
+    pa = pytest.importorskip("pyarrow")
+    frame = pd.DataFrame({
+        "Ticker": ["SWDA", "EIMI", "SWDA"],
+        "Quantità": [10.0, 5.0, 2.0],
+        "Prezzo di acquisto": [80.0, 30.0, 90.0],
+        "Prezzo corrente": [100.0, 33.0, 100.0],
+        "Data acquisto": pd.to_datetime(["2023-01-10", "2023-03-01", "2024-02-15"]),
+    })
+
+    metrics = PositionMetrics.from_frame(pa.Table.from_pandas(frame))
+
+    assert list(metrics.ticker) == ["SWDA", "EIMI", "SWDA"]
+    assert list(metrics.purchase_date) == list(frame["Data acquisto"].to_numpy())
+    metrics.update_ticker_prices({"SWDA": 110.0})
+    assert np.allclose(metrics.market_value, [1100.0, 165.0, 220.0])
+    assert np.allclose(metrics.cost, PositionMetrics.from_frame(frame).cost)
+
+
+def test_rolling_correlation_applies_ledoit_wolf_in_each_window():
+    from metrics import rolling_correlation_matrix, _ledoit_wolf_intensity
+
+    rng = np.random.default_rng(1)
+    returns = rng.standard_normal((120, 4)) * 0.01
+    returns[:, 1] += returns[:, 0] * 0.8
+    prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0),
+                          index=pd.bdate_range("2024-01-01", periods=120), columns=list("ABCD"))
+
+    rolling = rolling_correlation_matrix(prices, 60, shrinkage="auto")
+
+    daily = prices.pct_change().iloc[1:].to_numpy()
+    for end in (60, 90, 119):
+        window = daily[end - 60:end]
+        intensity = _ledoit_wolf_intensity((window - window.mean(axis=0)) / window.std(axis=0))
+        assert 0 < intensity < 1
+        expected = (1 - intensity) * np.corrcoef(window, rowvar=False) + intensity * np.eye(4)
+        assert np.allclose(rolling.loc[prices.index[end]].to_numpy(), expected)
+
+
+def correlated_prices(days=120, seed=1):
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_normal((days, 3)) * 0.01
+    returns[:, 1] += returns[:, 0] * 0.8
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0),
+                        index=pd.bdate_range("2024-01-01", periods=days), columns=["A", "B", "C"])
+
+
+def test_correlation_matrix_uses_pairwise_common_dates():
+    from metrics import correlation_matrix
+
+    prices = correlated_prices()
+    prices.iloc[:50, 2] = np.nan  # "C" quotato più tardi
+
+    corr = correlation_matrix(prices)
+
+    expected = prices.pct_change(fill_method=None).corr(min_periods=20)
+    assert np.allclose(corr.to_numpy(), expected.to_numpy())
+    assert np.isnan(correlation_matrix(prices.iloc[:60]).loc["A", "C"])
+
+
+def test_correlation_matrix_shrinkage_towards_identity():
+    from metrics import correlation_matrix, _ledoit_wolf_intensity
+
+    prices = correlated_prices()
+    sample = correlation_matrix(prices).to_numpy()
+
+    assert np.allclose(correlation_matrix(prices, shrinkage=0.25).to_numpy(), 0.75 * sample + 0.25 * np.eye(3))
+    returns = prices.pct_change().iloc[1:].to_numpy()
+    intensity = _ledoit_wolf_intensity((returns - returns.mean(axis=0)) / returns.std(axis=0))
+    assert 0 < intensity < 1
+    assert np.allclose(correlation_matrix(prices, shrinkage="auto").to_numpy(),
+                       (1 - intensity) * sample + intensity * np.eye(3))
+
+
+def test_rolling_correlation_matches_pandas():
+    from metrics import rolling_correlation_matrix
+
+    prices = correlated_prices()
+
+    rolling = rolling_correlation_matrix(prices, 30)
+
+    expected = prices.pct_change().iloc[1:].rolling(30).corr().dropna()
+    assert np.allclose(rolling.to_numpy(), expected.to_numpy())
+
+
+def test_xirr_batch_solves_all_groups_together():
+    from metrics import xirr_batch
+
+    rates = xirr_batch({
+        "anno": (["2024-01-01", "2025-01-01"], [-1000.0, 1100.0]),
+        "perdita": (["2024-01-01", "2025-01-01"], [-1000.0, 10.0]),
+        "piano": (["2024-01-01", "2024-07-01", "2025-01-01", "2025-06-30"], [-500.0, -500.0, 60.0, 1050.0]),
+        "solo_acquisti": (["2024-01-01"], [-1000.0]),
+    })
+
+    assert np.isclose(rates["anno"], 1.1 ** (365 / 366) - 1)
+    assert np.isclose(rates["perdita"], 0.01 ** (365 / 366) - 1)
+    # Al tasso trovato il valore attuale dei flussi è nullo
+    years = np.array([0, 182, 366, 546]) / 365
+    assert np.isclose((np.array([-500.0, -500.0, 60.0, 1050.0]) / (1 + rates["piano"]) ** years).sum(), 0, atol=1e-6)
+    assert np.isnan(rates["solo_acquisti"])
+
+
+def test_total_return_index_reinvests_dividends():
+    from metrics import total_return_index
+
+    dates = pd.bdate_range("2024-01-01", periods=4)
+    close = pd.DataFrame({"DIST": [100.0, 98.0, np.nan, 99.0], "ACC": [np.nan, 50.0, 51.0, 52.0]}, index=dates)
+    dividends = pd.DataFrame({"DIST": [0.0, 2.0, 0.0, 0.0]}, index=dates)
+
+    index = total_return_index(close, dividends)
+
+    # Lo stacco compensa il calo del prezzo; il giorno mancante resta NaN
+    assert np.allclose(index["DIST"].to_numpy(), [100.0, 100.0, np.nan, 100.0 * 99 / 98], equal_nan=True)
+    assert np.allclose(index["ACC"].to_numpy(), [np.nan, 100.0, 102.0, 104.0], equal_nan=True)
+
+
+def test_distribution_income_pays_shares_held_the_day_before():
+    from metrics import distribution_income
+
+    dates = pd.to_datetime(["2024-01-30", "2024-01-31", "2024-02-01", "2024-03-01"])
+    positions = pd.DataFrame({"DIST": [10.0, 10.0, 25.0, 25.0]}, index=dates)
+    dividends = pd.DataFrame({"DIST": [0.0, 0.5, 0.4, 0.0]}, index=dates)
+
+    income = distribution_income(positions, dividends, "M")
+
+    # Le 15 quote comprate il giorno dello stacco di febbraio non incassano
+    assert income["DIST"].tolist() == [5.0, 4.0, 0.0]
+    assert distribution_income(positions, dividends, "Y")["DIST"].tolist() == [9.0]
+
+
+def test_risk_metrics_match_a_direct_rolling_computation():
+    from metrics import risk_metrics
+
+    rng = np.random.default_rng(3)
+    returns = pd.DataFrame(rng.normal(0.0004, 0.01, (150, 2)), columns=["A", "B"],
+                           index=pd.bdate_range("2024-01-01", periods=150))
+    returns.iloc[:40, 1] = np.nan  # "B" quotato più tardi
+    rf = 0.02
+
+    rolling = risk_metrics(returns, window=60, risk_free_rate=rf)
+    expanding = risk_metrics(returns, risk_free_rate=rf)
+
+    excess = returns - rf / 252
+    window = excess.rolling(60, min_periods=20)
+    downside = np.sqrt((excess.clip(upper=0) ** 2).rolling(60, min_periods=20).mean())
+    assert np.allclose(rolling["sharpe"], window.mean() / window.std() * np.sqrt(252), equal_nan=True)
+    assert np.allclose(rolling["sortino"], window.mean() / downside * np.sqrt(252), equal_nan=True)
+    assert np.allclose(rolling["volatility"], returns.rolling(60, min_periods=20).std() * np.sqrt(252),
+                       equal_nan=True)
+    assert rolling["sharpe"]["B"].iloc[:59].isna().all() and rolling["sharpe"]["B"].iloc[59:].notna().all()
+
+    wealth = (1 + returns.fillna(0)).cumprod()
+    assert np.allclose(expanding["drawdown"]["A"], wealth["A"] / wealth["A"].cummax() - 1)
+    assert np.isclose(expanding["sharpe"]["A"].iloc[-1], excess["A"].mean() / excess["A"].std() * np.sqrt(252))
+    assert expanding["drawdown"]["B"].iloc[:40].isna().all()
+
+
+def test_drawdown_durations_are_calendar_days_from_the_peak():
+    from metrics import underwater_curve
+
+    dates = pd.to_datetime(["2024-01-01", "2024-01-05", "2024-01-10", "2024-01-12", "2024-01-20", "2024-01-31"])
+    values = pd.DataFrame({"A": [100.0, 80.0, np.nan, 90.0, 101.0, 95.0]}, index=dates)
+
+    underwater = underwater_curve(values)
+    episodes = drawdown_episodes(values)
+
+    assert np.allclose(underwater["A"], [0.0, -0.2, -0.2, -0.1, 0.0, 95 / 101 - 1])
+    assert episodes[["days_to_trough", "duration"]].to_numpy().tolist() == [[4, 19], [11, 11]]
+    assert list(episodes["peak"]) == [dates[0], dates[4]]
+    assert list(episodes["trough"]) == [dates[1], dates[5]]
+
+
+def test_value_at_risk_known_values_for_each_method():
+    from statistics import NormalDist
+
+    from metrics import value_at_risk
+
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2023-01-02", periods=1000)
+    log_returns = pd.DataFrame({"A": rng.normal(0.0, 0.01, 1000), "B": rng.normal(0.0, 0.02, 1000)}, index=dates)
+    exposures = pd.Series({"A": 6000.0, "B": 4000.0})
+    # Media e covarianza fissate: il parametrico ha una soluzione chiusa
+    mean = pd.Series({"A": 0.0, "B": 0.0})
+    cov = pd.DataFrame([[1e-4, 0.0], [0.0, 4e-4]], index=["A", "B"], columns=["A", "B"])
+
+    result = value_at_risk(log_returns, exposures, confidences=(0.95, 0.99), mean=mean, cov=cov,
+                           simulations=200000)
+
+    sigma = np.sqrt(6000.0 ** 2 * 1e-4 + 4000.0 ** 2 * 4e-4)
+    for confidence in (0.95, 0.99):
+        z = NormalDist().inv_cdf(confidence)
+        parametric = result.loc[("parametrico", confidence)]
+        assert parametric["var"] == pytest.approx(sigma * z)
+        assert parametric["cvar"] == pytest.approx(sigma * NormalDist().pdf(z) / (1 - confidence))
+        # Monte Carlo con rendimenti logaritmici: vicino al parametrico lineare
+        assert result.loc[("monte_carlo", confidence), "var"] == pytest.approx(sigma * z, rel=0.03)
+
+    # Storico: quantile delle perdite osservate
+    losses = -(np.expm1(log_returns.to_numpy()) @ exposures.to_numpy())
+    assert result.loc[("storico", 0.95), "var"] == pytest.approx(np.quantile(losses, 0.95))
+    assert result.loc[("storico", 0.95), "cvar"] == pytest.approx(losses[losses >= np.quantile(losses, 0.95)].mean())
+    assert (result["cvar"] >= result["var"]).all()
+
+
+def test_value_at_risk_historical_horizon_uses_overlapping_windows():
+    from metrics import value_at_risk
+
+    log_returns = pd.DataFrame({"A": np.log([1.01, 0.98, 1.02, 0.95, 1.03, 0.99])},
+                               index=pd.bdate_range("2024-01-01", periods=6))
+
+    result = value_at_risk(log_returns, pd.Series({"A": 1000.0}), confidences=(0.95,), horizon=2)
+
+    # Cinque finestre di due giorni consecutivi, la peggiore 1.02 * 0.95
+    growth = np.array([1.01 * 0.98, 0.98 * 1.02, 1.02 * 0.95, 0.95 * 1.03, 1.03 * 0.99])
+    losses = 1000.0 * (1 - growth)
+    assert result.loc[("storico", 0.95), "var"] == pytest.approx(np.quantile(losses, 0.95))
+    assert result.loc[("storico", 0.95), "cvar"] == pytest.approx(losses.max())
+    assert value_at_risk(log_returns.iloc[:2], pd.Series({"A": 1000.0}), horizon=2).isna().all().all()
+
+
+def test_benchmark_regression_recovers_known_alpha_and_beta():
+    from metrics import benchmark_regression
+
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range("2023-01-02", periods=300)
+    benchmark = pd.Series(rng.normal(0.0004, 0.01, 300), index=dates)
+    returns = pd.DataFrame({
+        # Retta esatta: R² = 1
+        "Esatto": 0.0002 + 1.5 * benchmark,
+        "Rumore": 0.5 * benchmark + rng.normal(0.0, 0.01, 300),
+    }, index=dates)
+    returns.iloc[:100, 1] = np.nan
+
+    result = benchmark_regression(returns, benchmark)
+
+    assert result.loc["Esatto", "beta"] == pytest.approx(1.5)
+    assert result.loc["Esatto", "alpha"] == pytest.approx(0.0002 * 252)
+    assert result.loc["Esatto", "r2"] == pytest.approx(1.0)
+    assert result.loc["Rumore", "observations"] == 200
+    # Solo le date in comune della colonna, come una regressione diretta
+    x, y = benchmark.iloc[100:].to_numpy(), returns["Rumore"].iloc[100:].to_numpy()
+    slope, intercept = np.polyfit(x, y, 1)
+    assert result.loc["Rumore", "beta"] == pytest.approx(slope)
+    assert result.loc["Rumore", "alpha"] == pytest.approx(intercept * 252)
+    assert result.loc["Rumore", "r2"] == pytest.approx(np.corrcoef(x, y)[0, 1] ** 2)
+
+
+def test_rolling_benchmark_regression_matches_each_window():
+    from metrics import benchmark_regression
+
+    rng = np.random.default_rng(6)
+    dates = pd.bdate_range("2023-01-02", periods=80)
+    benchmark = pd.Series(rng.normal(0.0, 0.01, 80), index=dates)
+    returns = pd.DataFrame({"A": 0.8 * benchmark + rng.normal(0.0, 0.005, 80)}, index=dates)
+
+    rolling = benchmark_regression(returns, benchmark, window=30, risk_free_rate=0.0252)
+
+    assert rolling[("beta", "A")].iloc[:29].isna().all()
+    for end in (29, 50, 79):
+        x = benchmark.iloc[end - 29:end + 1].to_numpy() - 0.0001
+        y = returns["A"].iloc[end - 29:end + 1].to_numpy() - 0.0001
+        slope, intercept = np.polyfit(x, y, 1)
+        assert rolling[("beta", "A")].iloc[end] == pytest.approx(slope)
+        assert rolling[("alpha", "A")].iloc[end] == pytest.approx(intercept * 252)
+
+
+def test_efficient_frontier_respects_constraints_and_known_endpoints():
+    from metrics import efficient_frontier, portfolio_point
+
+    tickers = ["A", "B", "C"]
+    mean = pd.Series([0.0002, 0.0004, 0.0008], index=tickers)
+    cov = pd.DataFrame(np.diag([1e-4, 2e-4, 4e-4]), index=tickers, columns=tickers)
+
+    frontier = efficient_frontier(mean, cov, points=25)
+    weights = frontier[tickers].to_numpy()
+
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert (weights >= -1e-9).all()
+    assert np.all(np.diff(frontier["volatility"]) > -1e-9)
+    assert np.all(np.diff(frontier["return"]) > -1e-9)
+    # Minima varianza con titoli indipendenti: pesi proporzionali a 1/varianza
+    inverse = 1 / np.array([1e-4, 2e-4, 4e-4])
+    assert np.allclose(weights[0], inverse / inverse.sum(), atol=1e-3)
+    # Massimo rendimento: tutto sul titolo migliore
+    assert np.allclose(weights[-1], [0.0, 0.0, 1.0], atol=1e-3)
+    ret, vol = portfolio_point(frontier.loc[0, tickers], mean, cov)
+    assert (ret, vol) == pytest.approx((frontier.loc[0, "return"], frontier.loc[0, "volatility"]))
+
+    capped = efficient_frontier(mean, cov, points=25, max_weight=0.4, warm_start=frontier)
+    assert (capped[tickers].to_numpy() <= 0.4 + 1e-9).all()
+    assert np.allclose(capped[tickers].iloc[-1], [0.2, 0.4, 0.4], atol=1e-3)
+    # Limite non ammissibile: alzato a 1/n
+    assert np.allclose(efficient_frontier(mean, cov, points=5, max_weight=0.1)[tickers], 1 / 3)
+
+
+def test_calculate_metrics_output_is_unchanged_by_the_columnar_path():
+    from metrics import calculate_metrics
+
+    result = calculate_metrics([
+        {"Ticker": "SWDA", "Quantità": 10, "Prezzo di acquisto": 80.004, "Prezzo corrente": 100.0,
+         "Data acquisto": "2023-01-10"},
+        {"Ticker": "EIMI", "Quantità": 3, "Prezzo di acquisto": 30.0, "Prezzo corrente": 27.0,
+         "Data acquisto": "2023-03-01"},
+    ])
+
+    assert list(result["Data acquisto"]) == ["10/01/2023", "01/03/2023"]
+    assert list(result["Costo"]) == [800.04, 90.0]
+    assert list(result["Market Value"]) == [1000.0, 81.0]
+    assert list(result["Crescita %"]) == [round((1000.0 - 800.04) / 800.04 * 100, 2), -10.0]
+    # Colonna assente in tutte le transazioni: vale 0
+    padded = calculate_metrics([{"Quantità": 2, "Prezzo di acquisto": 10.0}])
+    assert list(padded[["Costo", "Market Value", "Crescita %"]].iloc[0]) == [20.0, 0.0, -100.0]
+    assert calculate_metrics([]).empty
+
+
+def test_position_metrics_price_updates_touch_only_the_given_rows():
+    metrics = PositionMetrics.from_frame({
+        "Ticker": np.array(["SWDA", "EIMI", "AGGH"], dtype=object),
+        "Quantità": np.array([10.0, 4.0, 0.0]),
+        "Prezzo di acquisto": np.array([50.0, 25.0, 40.0]),
+        "Prezzo corrente": np.array([55.0, 20.0, 40.0]),
+    })
+
+    assert np.allclose(metrics.growth[:2], [10.0, -20.0])
+    # Costo nullo: crescita non definita
+    assert np.isnan(metrics.growth[2])
+    assert metrics.totals() == pytest.approx({"Costo": 600.0, "Market Value": 630.0, "Crescita %": 5.0})
+
+    metrics.update_prices(60.0, rows=np.array([0]))
+    metrics.update_ticker_prices(pd.Series({"EIMI": 30.0, "ALTRO": 1.0}))
+
+    assert np.allclose(metrics.market_value, [600.0, 120.0, 0.0])
+    assert np.allclose(metrics.growth[:2], [20.0, 20.0])
+    frame = metrics.to_frame()
+    assert list(frame.columns) == ["Ticker", "Quantità", "Prezzo di acquisto", "Prezzo corrente",
+                                   "Costo", "Market Value", "Crescita %"]
+    assert list(frame["Prezzo corrente"]) == [60.0, 30.0, 40.0]
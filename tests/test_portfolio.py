@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from portfolio import PortfolioValuation
+
+
+def trades_frame(rows):
+    trades = pd.DataFrame(rows, columns=["date", "ticker", "quantity", "flow"])
+    trades["date"] = pd.to_datetime(trades["date"])
+    return trades
+
+
+def test_ticker_without_prices_is_missing_not_valued_at_zero():
+    dates = pd.bdate_range("2024-01-01", periods=5)
+    prices = pd.DataFrame({"SWDA": [100.0, 101, 102, 103, 104], "NUOVO": np.nan}, index=dates)
+    trades = trades_frame([
+        ("2024-01-01", "SWDA", 10, 1000.0),
+        ("2024-01-03", "NUOVO", 5, 500.0),
+    ])
+
+    valuation = PortfolioValuation(trades, prices)
+
+    assert valuation.tickers == ["SWDA"]
+    assert valuation.missing_tickers == ["NUOVO"]
+    assert np.allclose(valuation.returns.to_numpy()[1:], np.diff(prices["SWDA"]) / prices["SWDA"].to_numpy()[:-1])
+
+
+def test_update_stays_incremental_with_missing_tickers():
+    dates = pd.bdate_range("2024-01-01", periods=6)
+    prices = pd.DataFrame({"SWDA": [100.0, 101, 102, 103, 104, 105], "NUOVO": np.nan}, index=dates)
+    trades = trades_frame([
+        ("2024-01-01", "SWDA", 10, 1000.0),
+        ("2024-01-02", "NUOVO", 5, 500.0),
+    ])
+    valuation = PortfolioValuation(trades, prices.iloc[:4])
+
+    nuove = pd.concat([trades, trades_frame([("2024-01-08", "SWDA", 1, 105.0)])], ignore_index=True)
+    assert valuation.update(nuove, prices)
+    assert valuation.last_date == dates[-1]
+    assert valuation.positions["SWDA"].iloc[-1] == 11
+
+    # Quando arrivano i prezzi del ticker mancante lo storico viene ricostruito
+    prices["NUOVO"] = 50.0
+    assert not valuation.update(nuove, prices)
+    assert valuation.missing_tickers == []
+
+
+def test_empty_portfolio_has_empty_periodic_returns():
+    prices = pd.DataFrame({"SWDA": [100.0, 101]}, index=pd.bdate_range("2024-01-01", periods=2))
+
+    for valuation in (PortfolioValuation(trades_frame([]), prices),
+                      PortfolioValuation(trades_frame([("2024-01-01", "NUOVO", 5, 500.0)]), prices)):
+        assert valuation.last_date is None
+        assert valuation.twr("Y").empty
+        assert valuation.twr("M").empty
+        assert list(valuation.twr("D").index.year) == []
+
+
+def test_prepare_trades_keeps_signed_share_movements_only():
+    from portfolio import prepare_trades
+
+    transactions = pd.DataFrame({
+        "ticker": ["SWDA", None, "SWDA", "EIMI"],
+        "tipo_operazione": ["Acquisto", "Conferimento con bonifico", "Vendita", "Dividendo"],
+        "data_operazione": pd.to_datetime(["2024-01-03 10:30", "2024-01-01 00:00", "2024-01-05 00:00", "2024-01-04 00:00"]),
+        "quantita": [10.0, 0.0, 4.0, 0.0],
+        "importo_euro": [-1000.0, 5000.0, 450.0, 3.0],
+    })
+
+    trades = prepare_trades(transactions)
+
+    assert trades["date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-03", "2024-01-05"]
+    assert trades["quantity"].tolist() == [10.0, -4.0]
+    assert trades["flow"].tolist() == [1000.0, -450.0]
+
+
+def test_twr_ignores_the_size_and_timing_of_purchases():
+    dates = pd.bdate_range("2024-01-01", periods=4)
+    prices = pd.DataFrame({"SWDA": [100.0, 110.0, 110.0, 121.0]}, index=dates)
+    trades = trades_frame([
+        ("2024-01-01", "SWDA", 10, 1000.0),
+        # Un secondo acquisto raddoppia il capitale ma non il rendimento
+        ("2024-01-03", "SWDA", 10, 1100.0),
+    ])
+
+    valuation = PortfolioValuation(trades, prices)
+
+    assert valuation.nav.tolist() == [1000.0, 1100.0, 2200.0, 2420.0]
+    assert np.allclose(valuation.returns.to_numpy(), [0.0, 0.1, 0.0, 0.1])
+    assert np.allclose(valuation.twr("M").to_numpy(), [0.21])
+    assert np.allclose(valuation.index().iloc[-1], 1.21)
+
+
+def test_incremental_update_matches_a_full_rebuild():
+    dates = pd.bdate_range("2024-01-01", periods=30)
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0, 0.01, (30, 2)), axis=0),
+                          index=dates, columns=["SWDA", "EIMI"])
+    trades = trades_frame([
+        ("2024-01-01", "SWDA", 10, 1000.0),
+        ("2024-01-10", "EIMI", 20, 600.0),
+        ("2024-01-20", "SWDA", -5, -520.0),
+        ("2024-01-30", "EIMI", 5, 150.0),
+    ])
+    valuation = PortfolioValuation(trades.iloc[:2], prices.iloc[:15])
+
+    assert valuation.update(trades, prices)
+
+    full = PortfolioValuation(trades, prices)
+    assert np.allclose(valuation.nav.to_numpy(), full.nav.to_numpy())
+    assert np.allclose(valuation.returns.to_numpy(), full.returns.to_numpy())
+    assert valuation.positions.iloc[-1].tolist() == full.positions.iloc[-1].tolist() == [5.0, 25.0]
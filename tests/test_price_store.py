@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore
+
+
+def bars(dates, close, dividends=None):
+    frame = pd.DataFrame({"date": dates, "close": close})
+    if dividends is not None:
+        frame["dividends"] = dividends
+    return frame
+
+
+def test_append_keeps_only_new_days_in_order(tmp_path):
+    store = PriceStore(str(tmp_path))
+
+    assert store.append("SWDA", bars(["2024-01-03", "2024-01-02", "2024-01-02"], [102.0, 101.0, 999.0])) == 2
+    # La prima barra è già salvata: viene aggiunta solo quella nuova
+    assert store.append("SWDA", bars(["2024-01-03", "2024-01-04"], [0.0, 103.0], [0.0, 0.5])) == 1
+
+    frame = store.read("SWDA")
+    assert frame.index.strftime("%Y-%m-%d").tolist() == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert frame["close"].tolist() == [101.0, 102.0, 103.0]
+    assert frame["dividends"].tolist() == [0.0, 0.0, 0.5]
+    assert store.last_date("SWDA") == pd.Timestamp("2024-01-04").date()
+    assert store.tickers() == ["SWDA"]
+
+
+def test_replace_rewrites_the_whole_history(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("SWDA", bars(["2024-01-02", "2024-01-03"], [101.0, 102.0]))
+
+    assert store.replace("SWDA", bars(["2023-12-29", "2024-01-02"], [90.0, 91.0])) == 2
+
+    assert store.read("SWDA")["close"].tolist() == [90.0, 91.0]
+
+
+def test_read_window_and_matrix_alignment(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("SWDA", bars(pd.bdate_range("2024-01-01", periods=5), [1.0, 2, 3, 4, 5]))
+    store.append("EIMI", bars(pd.bdate_range("2024-01-03", periods=3), [10.0, 20, 30]))
+
+    assert store.read("SWDA", start="2024-01-02", end="2024-01-04")["close"].tolist() == [2.0, 3.0, 4.0]
+    matrix = store.close_matrix(["SWDA", "EIMI", "NUOVO"], start="2024-01-02")
+    assert matrix.index.strftime("%Y-%m-%d").tolist() == ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    assert np.isnan(matrix["EIMI"].iloc[0]) and matrix["EIMI"].iloc[1:].tolist() == [10.0, 20.0, 30.0]
+    assert matrix["NUOVO"].isna().all()
+
+
+def test_interrupted_write_never_exposes_partial_rows(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("SWDA", bars(["2024-01-02"], [101.0]))
+    # Scrittura interrotta: chiusura salvata ma data mancante
+    with open(os.path.join(str(tmp_path), "SWDA", "close.bin"), "ab") as f:
+        f.write(np.array([555.0]).tobytes())
+
+    assert store.read("SWDA")["close"].tolist() == [101.0]
+    assert store.append("SWDA", bars(["2024-01-03"], [102.0])) == 1
+    assert store.read("SWDA")["close"].tolist() == [101.0, 102.0]
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import database
+import query_cache
+from query_cache import FileStamp, QueryCache
+from stand_ins import FakeSupabase
+
+
+def test_stamp_change_from_another_process_clears_cache(tmp_path):
+    path = str(tmp_path / "data_version")
+    cache = QueryCache(ttl=300, max_entries=10, stamp=FileStamp(path))
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_load(("v_dist_etf",), loader) == 1
+    assert cache.get_or_load(("v_dist_etf",), loader) == 1
+
+    # Lo scheduler aggiorna i dati con la propria istanza di FileStamp
+    FileStamp(path).touch()
+
+    assert cache.get_or_load(("v_dist_etf",), loader) == 2
+    assert cache.get_or_load(("v_dist_etf",), loader) == 2
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_loader(value):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return value
+    return loader, calls
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = QueryCache(ttl=60, max_entries=10)
+    loader, calls = counting_loader([{"ticker": "SWDA"}])
+
+    cache.get_or_load(("v_dist_etf",), loader)
+    clock.now += 59
+    cache.get_or_load(("v_dist_etf",), loader)
+    assert len(calls) == 1
+    clock.now += 1
+    cache.get_or_load(("v_dist_etf",), loader)
+    assert len(calls) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(ttl=300, max_entries=2)
+    cache.get_or_load(("a",), lambda: 1)
+    cache.get_or_load(("b",), lambda: 2)
+    cache.get_or_load(("a",), lambda: 0)  # "a" diventa la più recente
+    cache.get_or_load(("c",), lambda: 3)
+
+    assert cache.get_or_load(("a",), lambda: "ricaricata") == 1
+    assert cache.get_or_load(("b",), lambda: "ricaricata") == "ricaricata"
+
+
+def test_invalidate_drops_every_variant_of_a_view_only():
+    cache = QueryCache(ttl=300, max_entries=10)
+    cache.get_or_load(("etf_price_history", "SWDA"), lambda: 1)
+    cache.get_or_load(("etf_price_history", "EIMI"), lambda: 2)
+    cache.get_or_load(("v_dist_etf",), lambda: 3)
+
+    cache.invalidate("etf_price_history")
+
+    assert cache.get_or_load(("etf_price_history", "SWDA"), lambda: "nuovo") == "nuovo"
+    assert cache.get_or_load(("etf_price_history", "EIMI"), lambda: "nuovo") == "nuovo"
+    assert cache.get_or_load(("v_dist_etf",), lambda: "nuovo") == 3
+
+
+def test_value_loaded_during_an_invalidation_is_not_cached():
+    cache = QueryCache(ttl=300, max_entries=10)
+
+    def loader():
+        # Una scrittura arriva mentre la lettura è in corso
+        cache.invalidate("v_dist_etf")
+        return "vecchio"
+
+    assert cache.get_or_load(("v_dist_etf",), loader) == "vecchio"
+    assert cache.get_or_load(("v_dist_etf",), lambda: "nuovo") == "nuovo"
+
+
+def test_concurrent_requests_load_once_and_errors_are_not_cached():
+    cache = QueryCache(ttl=300, max_entries=10)
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "righe"
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_load(("v_dist_etf",), slow_loader), range(8)))
+    assert results == ["righe"] * 8
+    assert len(calls) == 1
+
+    def failing():
+        raise ConnectionError("timeout")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_load(("v_bottom_3_etf_guadagni",), failing)
+    assert cache.get_or_load(("v_bottom_3_etf_guadagni",), lambda: "ok") == "ok"
+
+
+def test_database_writes_invalidate_dependent_views(monkeypatch):
+    client = FakeSupabase({"v_dist_etf": [{"ticker": "SWDA", "distribuzione_pct": 100.0}],
+                           "unique_tickers_view": [{"ticker": "AIR"}]})
+    monkeypatch.setattr(database, "_client", client)
+    database.query_cache.clear()
+
+    assert database.read_view("v_dist_etf") == database.read_view("v_dist_etf")
+    database.read_view("unique_tickers_view")
+    assert client.requests == 2
+
+    database.invalidate_table("transaction")
+    database.read_view("v_dist_etf")
+    database.read_view("unique_tickers_view")
+    assert client.requests == 3
@@ -0,0 +1,67 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import scheduler
+from query_cache import FileStamp
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "SCHEDULER_STATE_FILE", str(tmp_path / "state.json"))
+    monkeypatch.setattr(scheduler, "SCHEDULER_LOCK_DIR", str(tmp_path / "locks"))
+    monkeypatch.setattr(scheduler, "data_stamp", FileStamp(str(tmp_path / "data_version")))
+    registry = {}
+    monkeypatch.setattr(scheduler, "JOBS", registry)
+    return registry
+
+
+def test_run_job_saves_the_outcome_and_bumps_the_data_version(jobs):
+    jobs["prices"] = lambda: {"updated": 3}
+    jobs["fx"] = lambda: 1 / 0
+    before = scheduler.data_stamp()
+
+    ok = scheduler.run_job("prices")
+    assert scheduler.data_stamp() != before
+    error = scheduler.run_job("fx")
+
+    assert ok["status"] == "ok" and ok["detail"] == {"updated": 3}
+    assert error["status"] == "error" and "division by zero" in error["error"]
+    assert scheduler.load_state()["prices"]["last_success"] == ok["last_success"]
+    assert "last_success" not in scheduler.load_state()["fx"]
+
+
+def test_a_job_never_overlaps_itself(jobs):
+    calls = []
+    jobs["history"] = lambda: calls.append(1)
+
+    with scheduler.job_lock("history"):
+        with pytest.raises(scheduler.JobAlreadyRunning):
+            scheduler.run_job("history")
+        # run_pending salta il job in corso invece di fallire
+        scheduler.run_pending(["history"], force=True)
+
+    assert calls == []
+    scheduler.run_job("history")
+    assert calls == [1]
+
+
+def test_stale_lock_is_removed(jobs):
+    jobs["holdings"] = lambda: None
+    os.makedirs(scheduler.SCHEDULER_LOCK_DIR)
+    path = os.path.join(scheduler.SCHEDULER_LOCK_DIR, "holdings.lock")
+    open(path, "w").close()
+    old = datetime.now().timestamp() - scheduler.SCHEDULER_LOCK_STALE - 1
+    os.utime(path, (old, old))
+
+    assert scheduler.run_job("holdings")["status"] == "ok"
+
+
+def test_due_jobs_follow_the_configured_intervals(jobs, monkeypatch):
+    monkeypatch.setattr(scheduler, "SCHEDULER_INTERVALS", {"prices": 900, "history": 86400})
+    now = datetime(2024, 6, 3, 12, 0)
+    scheduler._update_state("prices", last_run=(now - timedelta(seconds=901)).isoformat())
+    scheduler._update_state("history", last_run=(now - timedelta(hours=1)).isoformat())
+
+    assert scheduler.due_jobs(["prices", "history", "fx"], now=now) == ["prices", "fx"]
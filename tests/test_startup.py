@@ -0,0 +1,30 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# In un processo nuovo: gli altri test hanno già importato queste librerie
+IMPORT_SCRIPT = """
+import json, sys
+import streamlit
+baseline = set(sys.modules)
+import config, data_manager, database, finance_info, metrics
+import views.dashboard, views.gestione_eft, views.metriche, views.rendimento_annuo
+import views.impostazioni, views.simula_eft, views.sidebar
+print(json.dumps({
+    "loaded": [name for name in ("yfinance", "supabase", "scipy") if name in sys.modules and name not in baseline],
+    "client": database._client is not None,
+}))
+"""
+
+
+def test_importing_the_app_modules_has_no_side_effects():
+    env = dict(os.environ, SUPABASE_URL="", SUPABASE_KEY="", PYTHONDONTWRITEBYTECODE="1")
+
+    result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True, timeout=120)
+
+    imported = json.loads(result.stdout.strip().splitlines()[-1])
+    assert imported == {"loaded": [], "client": False}
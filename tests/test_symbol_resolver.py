@@ -0,0 +1,43 @@
+import json
+
+import symbol_resolver
+from symbol_resolver import SymbolResolver
+
+
+def test_resolved_symbol_is_persisted_and_shared_by_isin(tmp_path):
+    path = str(tmp_path / "symbols.json")
+    resolver = SymbolResolver(path, ttl=3600, negative_ttl=60)
+
+    resolver.store("SWDA", "SWDA.MI", isin="IE00B4L5Y983")
+
+    # Un nuovo processo legge il file alla prima richiesta
+    reloaded = SymbolResolver(path, ttl=3600, negative_ttl=60)
+    assert reloaded.lookup("SWDA") == (True, "SWDA.MI")
+    assert reloaded.lookup("IWDA", isin="IE00B4L5Y983") == (True, "SWDA.MI")
+    assert reloaded.candidates("SWDA", [".MI", ".DE", None]) == (["SWDA.MI"], True)
+    with open(path) as f:
+        assert set(json.load(f)) == {"SWDA", "IE00B4L5Y983"}
+
+
+def test_negative_results_expire_sooner_than_symbols(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(symbol_resolver.time, "time", lambda: now[0])
+    resolver = SymbolResolver(str(tmp_path / "symbols.json"), ttl=3600, negative_ttl=60)
+    resolver.store("SWDA", "SWDA.MI")
+    resolver.store("NESSUNO", None)
+
+    assert resolver.candidates("NESSUNO", [".MI", None]) == ([], True)
+    now[0] += 61
+    assert resolver.candidates("NESSUNO", [".MI", None]) == (["NESSUNO.MI", "NESSUNO"], False)
+    assert resolver.lookup("SWDA") == (True, "SWDA.MI")
+    now[0] += 3600
+    assert resolver.lookup("SWDA") == (False, None)
+
+
+def test_forget_drops_the_cached_symbol(tmp_path):
+    resolver = SymbolResolver(str(tmp_path / "symbols.json"), ttl=3600, negative_ttl=60)
+    resolver.store("SWDA", "SWDA.DE")
+
+    resolver.forget("SWDA")
+
+    assert resolver.candidates("SWDA", [".MI", ".DE"]) == (["SWDA.MI", "SWDA.DE"], False)
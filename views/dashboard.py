@@ -1,6 +1,5 @@
 import streamlit as st
 from metrics import calculate_metrics
-import plotly.graph_objects as go
 import pandas as pd
 
 # Stili CSS per migliorare l'aspetto
@@ -43,6 +42,316 @@ def apply_dashboard_styling():
     </style>
     """, unsafe_allow_html=True)
 
+# Applica colori alla colonna Crescita %
+def color_crescita(val):
+    if isinstance(val, (int, float)):
+        if val > 0:
+            return 'background-color: #90EE90'
+        elif val < 0:
+            return 'background-color: #FFB6C6'
+    return ''
+
+def prezzo_medio_acquisto_frame(rows):
+    """Tabella del prezzo medio di acquisto con la differenza dal prezzo corrente."""
+    df = pd.DataFrame(rows)
+    df["diff_prezzo"] = (df["price"] - df["prezzo_medio_acquisto"]).round(2)
+    return df
+
+def style_prezzo_medio_acquisto(df):
+    return (
+        df.style
+        .map(color_crescita, subset=['diff_prezzo'])
+        .format({
+            'diff_prezzo': '{:.2f}',
+            'costo_investito_eur': '{:.2f}',
+            'prezzo_medio_acquisto': '{:.2f}',
+            'price': '{:.2f}'
+        })
+    )
+
+def style_posizioni(df):
+    return (
+        df.style
+        .map(color_crescita, subset=['Crescita %'])
+        .format({
+            'Crescita %': '{:.2f}',
+            'Prezzo di acquisto': '{:.2f}',
+            'Prezzo corrente': '{:.2f}',
+            'Costo': '{:.2f}',
+            'Market Value': '{:.2f}'
+        })
+    )
+
+# Chiavi di session_state con le distribuzioni mostrate nella tab Analisi
+DISTRIBUZIONI = ["distribuzione_etf", "distribuzione_settore", "distribuzione_valuta_mercato",
+                 "distribuzione_area_geografica"]
+
+class DashboardFrames:
+    """
+    Tabelle e totali derivati dai dati di sessione della dashboard, calcolati
+    una sola volta per versione dei dati e riusati a ogni rerun.
+    Gli oggetti sono condivisi tra i rerun e non vanno modificati.
+    """
+
+    def __init__(self, session_state):
+        self.transactions = pd.DataFrame(session_state["etf_transactions"])
+        columns = self.transactions.columns
+        self.costo_totale = self.transactions['Costo'].sum() if 'Costo' in columns else 0
+        self.market_value_totale = self.transactions['Market Value'].sum() if 'Market Value' in columns else 0
+        self.crescita_totale = self.market_value_totale - self.costo_totale
+        self.rendimento_perc = (self.crescita_totale / self.costo_totale * 100) if self.costo_totale > 0 else 0
+
+        self.prezzo_medio_acquisto = prezzo_medio_acquisto_frame(session_state["prezzo_medio_acquisto"])
+        self.prezzo_medio_acquisto_styled = style_prezzo_medio_acquisto(self.prezzo_medio_acquisto)
+
+        self.posizioni = self.transactions.drop(
+            columns=[col for col in ["id", "created_at", "updated_at"] if col in columns],
+            errors='ignore'
+        )
+        self.posizioni_styled = style_posizioni(self.posizioni) if 'Crescita %' in self.posizioni.columns else None
+
+        self.top_3_etf = pd.DataFrame(session_state["top_3_etf"])
+        self.bottom_3_etf = pd.DataFrame(session_state["bottom_3_etf"])
+        self.distribuzioni = {key: pd.DataFrame(session_state[key]) for key in DISTRIBUZIONI}
+        self.kpi_chart = self._kpi_chart(pd.DataFrame(session_state["kpi_etf"]))
+
+    @staticmethod
+    def _kpi_chart(df_kpi):
+        """Costo e market value per ETF, escludendo i ticker "M." (None se mancano le colonne)."""
+        if df_kpi.empty or not {'ticker', 'costo_investito_eur', 'market_value_attuale'} <= set(df_kpi.columns):
+            return None
+        return (
+            df_kpi[['ticker', 'costo_investito_eur', 'market_value_attuale']]
+            .set_index("ticker")
+            .filter(regex=r"^(?!M\.).*", axis=0)
+            .reset_index()
+        )
+
+def get_dashboard_frames():
+    """
+    Tabelle derivate della dashboard per la versione corrente dei dati di sessione:
+    vengono ricalcolate solo dopo un nuovo caricamento (apply_session_data).
+    
+    Returns:
+        DashboardFrames: Tabelle e totali pronti per il rendering
+    """
+    from data_manager import DATA_VERSION_KEY
+    
+    versione = st.session_state.get(DATA_VERSION_KEY, 0)
+    cached = st.session_state.get("dashboard_frames")
+    if cached is None or cached[0] != versione:
+        cached = (versione, DashboardFrames(st.session_state))
+        st.session_state.dashboard_frames = cached
+    return cached[1]
+
+# ===== TAB RIEPILOGO =====
+@st.fragment
+def render_riepilogo():
+    st.markdown("<div class='section-title'>💰 Statistiche Portafoglio</div>", unsafe_allow_html=True)
+    if st.button("🔄 Aggiorna Prezzi", use_container_width=True):
+        from finance_info import aggiorna_prezzi_eft
+        aggiorna_prezzi_eft()
+    # Calcolo metriche (una volta per versione dei dati)
+    frames = get_dashboard_frames()
+    costo_totale = frames.costo_totale
+    market_value_totale = frames.market_value_totale
+    crescita_totale = frames.crescita_totale
+    rendimento_perc = frames.rendimento_perc
+
+    # Metriche in colonne
+    col1, col2, col3, col4 = st.columns(4, gap="medium")
+    with col1:
+        st.metric("📍 Valore di Mercato", f"€{market_value_totale:,.2f}", 
+                 delta=f"€{crescita_totale:,.2f}" if crescita_totale != 0 else None)
+    with col2:
+        st.metric("💵 Totale Investito", f"€{costo_totale:,.2f}", delta=None)
+    with col3:
+        color = "🟢" if crescita_totale >= 0 else "🔴"
+        st.metric(f"{color} Guadagno/Perdita", f"€{crescita_totale:,.2f}")
+    with col4:
+        st.metric("📊 Rendimento %", f"{rendimento_perc:.2f}%", 
+                 delta=f"{rendimento_perc:.2f}%" if rendimento_perc != 0 else None)
+
+    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+
+    # ===== Tabella prezzo medio di acquisto =====
+    st.markdown("<div class='section-title'>📍 Prezzo Medio di Acquisto</div>", unsafe_allow_html=True)
+    st.dataframe(frames.prezzo_medio_acquisto_styled, width="stretch", height=400, 
+                 column_order=["ticker", "quantita", "costo_investito_eur", "prezzo_medio_acquisto", "price", "diff_prezzo", "ultima_operazione"],
+    column_config={
+        "ticker": st.column_config.TextColumn("Ticker"),
+        "quantita": st.column_config.NumberColumn("Quantità"),
+        "costo_investito_eur": st.column_config.NumberColumn("Costo Investito €"),
+        "prezzo_medio_acquisto": st.column_config.NumberColumn("Prezzo Medio Acquisto €"),
+        "price": st.column_config.NumberColumn("Prezzo Corrente €"),
+        "diff_prezzo": st.column_config.NumberColumn("Differenza Prezzo €"),
+        "ultima_operazione": st.column_config.TextColumn("Ultima Operazione")
+    })
+
+    # Tabella principale con stile
+    st.markdown("<div class='section-title'>📍 Posizioni Attuali</div>", unsafe_allow_html=True)
+    if frames.posizioni_styled is not None:
+        st.dataframe(frames.posizioni_styled, width="stretch", height=400)
+    else:
+        st.dataframe(frames.posizioni, width="stretch", height=400)
+
+# ===== TAB ANALISI =====
+@st.fragment
+def render_analisi():
+    import plotly.graph_objects as go
+    
+    frames = get_dashboard_frames()
+    st.markdown("<div class='section-title'>🎯 Analisi Portfolio</div>", unsafe_allow_html=True)
+    st.markdown("<p style='color: #666; margin-bottom: 20px;'>Distribuzione degli investimenti per diverse dimensioni</p>", unsafe_allow_html=True)
+
+
+    # ETF con migliore e peggiore performance
+    col1, col2 = st.columns(2, gap="large")
+
+    with col1:
+        with st.expander("🏆 Top 3 ETF (Migliori Performance)", expanded=True):
+            df_top_3_etf = frames.top_3_etf
+            if not df_top_3_etf.empty:
+                st.dataframe(df_top_3_etf, width="stretch")
+            else:
+                st.info("Nessun dato disponibile")
+
+    with col2:
+        with st.expander("📉 Bottom 3 ETF (Peggiori Performance)", expanded=True):
+            df_bottom_3_etf = frames.bottom_3_etf
+            if not df_bottom_3_etf.empty:
+                st.dataframe(df_bottom_3_etf, width="stretch")
+            else:
+                st.info("Nessun dato disponibile")
+    # Grafici in layout 2x2
+    col1, col2 = st.columns(2, gap="large")
+
+    with col1:
+        st.markdown("<div class='subsection-title'>ETF</div>", unsafe_allow_html=True)
+        if st.session_state.distribuzione_etf:
+            df_dist_etf = frames.distribuzioni["distribuzione_etf"]
+            if not df_dist_etf.empty:
+                fig1 = go.Figure(data=[go.Pie(
+                    labels=df_dist_etf['ticker'],           
+                    values=df_dist_etf['distribuzione_pct'],
+                    textinfo='label+percent',  # cosa mostrare
+                    textposition='auto',     # fuori dalla fetta
+                    textfont=dict(size=12),     # grandezza testo
+                    hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
+                )])
+                fig1.update_layout(
+                    title="",
+                    height=400,
+                    showlegend=True,
+                    margin=dict(t=10, b=10)
+                )
+                st.plotly_chart(fig1, width="stretch")
+
+    with col2:
+        st.markdown("<div class='subsection-title'>Settore</div>", unsafe_allow_html=True)
+        if st.session_state.distribuzione_settore:
+            df_dist_settore = frames.distribuzioni["distribuzione_settore"]
+            if not df_dist_settore.empty:
+                fig2 = go.Figure(data=[go.Pie(
+                labels=df_dist_settore['settore'],
+                values=df_dist_settore['distribuzione_pct'],
+                textinfo='label+percent',  # cosa mostrare
+                textposition='auto',     # fuori dalla fetta
+                textfont=dict(size=12),     # grandezza testo
+                hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
+            )])
+
+                fig2.update_layout(
+                    title="",
+                    height=400,
+                    showlegend=True,
+                    margin=dict(t=10, b=10)
+                )
+                st.plotly_chart(fig2, width="stretch")
+
+    col3, col4 = st.columns(2, gap="large")
+
+    with col3:
+        st.markdown("<div class='subsection-title'>Valuta di Mercato</div>", unsafe_allow_html=True)
+        if st.session_state.distribuzione_valuta_mercato:
+            df_dist_valuta = frames.distribuzioni["distribuzione_valuta_mercato"]
+            if not df_dist_valuta.empty:
+                fig3 = go.Figure(data=[go.Pie(
+                    labels=df_dist_valuta['valuta_mercato'],
+                    values=df_dist_valuta['distribuzione_pct'],
+                    textinfo='label+percent',  # cosa mostrare
+                    textposition='auto',     # fuori dalla fetta
+                    textfont=dict(size=12),     # grandezza testo
+                    hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
+                )])
+                fig3.update_layout(
+                    title="",
+                    height=400,
+                    showlegend=True,
+                    margin=dict(t=10, b=10)
+                )
+                st.plotly_chart(fig3, width="stretch")
+
+    with col4:
+        st.markdown("<div class='subsection-title'>Area Geografica</div>", unsafe_allow_html=True)
+        if st.session_state.distribuzione_area_geografica:
+            df_dist_area = frames.distribuzioni["distribuzione_area_geografica"]
+            if not df_dist_area.empty:
+                fig4 = go.Figure(data=[go.Pie(
+                    labels=df_dist_area['area_geografica'],
+                    values=df_dist_area['distribuzione_pct'],
+                    textinfo='label+percent',  # cosa mostrare
+                    textposition='auto',     # fuori dalla fetta
+                    textfont=dict(size=12),     # grandezza testo
+                    hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
+                )])
+                fig4.update_layout(
+                    title="",
+                    height=400,
+                    showlegend=True,
+                    margin=dict(t=10, b=10)
+                )
+                st.plotly_chart(fig4, width="stretch")
+
+    # Grafico a barre: Confronto Costo vs Market Value
+    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+    st.markdown("<div class='section-title'>📊 Confronto Costo vs Market Value per ETF</div>", unsafe_allow_html=True)
+
+    if st.session_state.kpi_etf:
+        df_chart_bars = frames.kpi_chart
+        if df_chart_bars is not None:
+            fig_bars = go.Figure(
+                data=[
+                    go.Bar(x=df_chart_bars['ticker'], y=df_chart_bars['costo_investito_eur'], 
+                        name='Costo Investito (EUR)', marker_color='red'),
+                    go.Bar(x=df_chart_bars['ticker'], y=df_chart_bars['market_value_attuale'], 
+                        name='Market Value Attuale', marker_color='green')
+                ]
+            )
+            fig_bars.update_layout(barmode='group', height=400)
+            st.plotly_chart(fig_bars, width="stretch")
+
+# Le pagine complete mostrate nelle tab, eseguite come fragment
+@st.fragment
+def render_tab_impostazioni():
+    from views.impostazioni import render_impostazioni
+    render_impostazioni()
+
+@st.fragment
+def render_tab_metriche():
+    from views.metriche import render_metriche
+    render_metriche()
+
+@st.fragment
+def render_tab_gestione_etf():
+    from views.gestione_eft import render_gestione_etf
+    render_gestione_etf()
+
+@st.fragment
+def render_tab_rendimento_annuo():
+    from views.rendimento_annuo import render_rendimento_annuo
+    render_rendimento_annuo()
+
 # Sezione Dashboard
 def render_dashboard():
     apply_dashboard_styling()
@@ -57,259 +366,37 @@ def render_dashboard():
     """, unsafe_allow_html=True)
 
     if st.session_state.etf_transactions:
-        # Tab per organizzare le sezioni
-        tab1, tab2, tab4, tab5, tab6, tab7 = st.tabs(["📈 Riepilogo", "📊 Analisi", "⚙️ Impostazioni", "🎯 Metriche", "➕ Inserisci Transazione", "🏆 Rendimento annuo"])
+        # Tab con stato: viene eseguito solo il contenuto della tab aperta e
+        # le interazioni con i suoi widget rieseguono solo il suo fragment
+        tab1, tab2, tab4, tab5, tab6, tab7 = st.tabs(
+            ["📈 Riepilogo", "📊 Analisi", "⚙️ Impostazioni", "🎯 Metriche", "➕ Inserisci Transazione", "🏆 Rendimento annuo"],
+            key="dashboard_tab", on_change="rerun"
+        )
         
         # ===== TAB 1: RIEPILOGO =====
-        with tab1:
-            st.markdown("<div class='section-title'>💰 Statistiche Portafoglio</div>", unsafe_allow_html=True)
-            if st.button("🔄 Aggiorna Prezzi", use_container_width=True):
-                from finance_info import aggiorna_prezzi_eft
-                aggiorna_prezzi_eft()
-            # Calcolo metriche
-            df_transaction = pd.DataFrame(st.session_state.etf_transactions)
-            costo_totale = df_transaction['Costo'].sum() if 'Costo' in df_transaction.columns else 0
-            market_value_totale = df_transaction['Market Value'].sum() if 'Market Value' in df_transaction.columns else 0
-            crescita_totale = market_value_totale - costo_totale
-            rendimento_perc = (crescita_totale / costo_totale * 100) if costo_totale > 0 else 0
-            
-            # Metriche in colonne
-            col1, col2, col3, col4 = st.columns(4, gap="medium")
-            with col1:
-                st.metric("📍 Valore di Mercato", f"€{market_value_totale:,.2f}", 
-                         delta=f"€{crescita_totale:,.2f}" if crescita_totale != 0 else None)
-            with col2:
-                st.metric("💵 Totale Investito", f"€{costo_totale:,.2f}", delta=None)
-            with col3:
-                color = "🟢" if crescita_totale >= 0 else "🔴"
-                st.metric(f"{color} Guadagno/Perdita", f"€{crescita_totale:,.2f}")
-            with col4:
-                st.metric("📊 Rendimento %", f"{rendimento_perc:.2f}%", 
-                         delta=f"{rendimento_perc:.2f}%" if rendimento_perc != 0 else None)
-            
-            st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
-            
-            # ===== Tabella prezzo medio di acquisto =====
-            st.markdown("<div class='section-title'>📍 Prezzo Medio di Acquisto</div>", unsafe_allow_html=True)
-            df_prezzo_medio_acquisto = pd.DataFrame(st.session_state.prezzo_medio_acquisto)
-            df_prezzo_medio_acquisto["diff_prezzo"] = (
-                df_prezzo_medio_acquisto["price"]
-                - df_prezzo_medio_acquisto["prezzo_medio_acquisto"]
-            ).round(2)
-            # Applica colori alla colonna Crescita %
-            def color_crescita(val):
-                if isinstance(val, (int, float)):
-                    if val > 0:
-                        return 'background-color: #90EE90'
-                    elif val < 0:
-                        return 'background-color: #FFB6C6'
-                return ''
-            
-            if 'diff_prezzo' in df_prezzo_medio_acquisto.columns:
-                df_prezzo_medio_acquisto_styled = (
-                    df_prezzo_medio_acquisto.style
-                    .map(color_crescita, subset=['diff_prezzo'])
-                    .format({
-                        'diff_prezzo': '{:.2f}',
-                        'costo_investito_eur': '{:.2f}',
-                        'prezzo_medio_acquisto': '{:.2f}',
-                        'price': '{:.2f}'
-                    })
-                )
-            st.dataframe(df_prezzo_medio_acquisto_styled, width="stretch", height=400, 
-                         column_order=["ticker", "quantita", "costo_investito_eur", "prezzo_medio_acquisto", "price", "diff_prezzo", "ultima_operazione"],
-            column_config={
-                "ticker": st.column_config.TextColumn("Ticker"),
-                "quantita": st.column_config.NumberColumn("Quantità"),
-                "costo_investito_eur": st.column_config.NumberColumn("Costo Investito €"),
-                "prezzo_medio_acquisto": st.column_config.NumberColumn("Prezzo Medio Acquisto €"),
-                "price": st.column_config.NumberColumn("Prezzo Corrente €"),
-                "diff_prezzo": st.column_config.NumberColumn("Differenza Prezzo €"),
-                "ultima_operazione": st.column_config.TextColumn("Ultima Operazione")
-            })
-            
-            # Tabella principale con stile
-            st.markdown("<div class='section-title'>📍 Posizioni Attuali</div>", unsafe_allow_html=True)
-            df_transaction_display = df_transaction.drop(
-                columns=[col for col in ["id", "created_at", "updated_at"] if col in df_transaction.columns], 
-                errors='ignore'
-            )
-            
-            
-            if 'Crescita %' in df_transaction_display.columns:
-                styled_df = (
-                    df_transaction_display.style
-                    .map(color_crescita, subset=['Crescita %'])
-                    .format({
-                        'Crescita %': '{:.2f}',
-                        'Prezzo di acquisto': '{:.2f}',
-                        'Prezzo corrente': '{:.2f}',
-                        'Costo': '{:.2f}',
-                        'Market Value': '{:.2f}'
-                    })
-                )
-
-                st.dataframe(styled_df, width="stretch", height=400)
-            else:
-                st.dataframe(df_transaction_display, width="stretch", height=400)
-
-        
+        if tab1.open:
+            with tab1:
+                render_riepilogo()
         # ===== TAB 2: ANALISI =====
-        with tab2:
-            st.markdown("<div class='section-title'>🎯 Analisi Portfolio</div>", unsafe_allow_html=True)
-            st.markdown("<p style='color: #666; margin-bottom: 20px;'>Distribuzione degli investimenti per diverse dimensioni</p>", unsafe_allow_html=True)
-            
-            
-            # ETF con migliore e peggiore performance
-            col1, col2 = st.columns(2, gap="large")
-            
-            with col1:
-                with st.expander("🏆 Top 3 ETF (Migliori Performance)", expanded=True):
-                    df_top_3_etf = pd.DataFrame(st.session_state.top_3_etf)
-                    if not df_top_3_etf.empty:
-                        st.dataframe(df_top_3_etf, width="stretch")
-                    else:
-                        st.info("Nessun dato disponibile")
-            
-            with col2:
-                with st.expander("📉 Bottom 3 ETF (Peggiori Performance)", expanded=True):
-                    df_bottom_3_etf = pd.DataFrame(st.session_state.bottom_3_etf)
-                    if not df_bottom_3_etf.empty:
-                        st.dataframe(df_bottom_3_etf, width="stretch")
-                    else:
-                        st.info("Nessun dato disponibile")
-            # Grafici in layout 2x2
-            col1, col2 = st.columns(2, gap="large")
-            
-            with col1:
-                st.markdown("<div class='subsection-title'>ETF</div>", unsafe_allow_html=True)
-                if st.session_state.distribuzione_etf:
-                    df_dist_etf = pd.DataFrame(st.session_state.distribuzione_etf)
-                    if not df_dist_etf.empty:
-                        fig1 = go.Figure(data=[go.Pie(
-                            labels=df_dist_etf['ticker'],           
-                            values=df_dist_etf['distribuzione_pct'],
-                            textinfo='label+percent',  # cosa mostrare
-                            textposition='auto',     # fuori dalla fetta
-                            textfont=dict(size=12),     # grandezza testo
-                            hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
-                        )])
-                        fig1.update_layout(
-                            title="",
-                            height=400,
-                            showlegend=True,
-                            margin=dict(t=10, b=10)
-                        )
-                        st.plotly_chart(fig1, width="stretch")
-            
-            with col2:
-                st.markdown("<div class='subsection-title'>Settore</div>", unsafe_allow_html=True)
-                if st.session_state.distribuzione_settore:
-                    df_dist_settore = pd.DataFrame(st.session_state.distribuzione_settore)
-                    if not df_dist_settore.empty:
-                        fig2 = go.Figure(data=[go.Pie(
-                        labels=df_dist_settore['settore'],
-                        values=df_dist_settore['distribuzione_pct'],
-                        textinfo='label+percent',  # cosa mostrare
-                        textposition='auto',     # fuori dalla fetta
-                        textfont=dict(size=12),     # grandezza testo
-                        hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
-                    )])
-
-                        fig2.update_layout(
-                            title="",
-                            height=400,
-                            showlegend=True,
-                            margin=dict(t=10, b=10)
-                        )
-                        st.plotly_chart(fig2, width="stretch")
-            
-            col3, col4 = st.columns(2, gap="large")
-            
-            with col3:
-                st.markdown("<div class='subsection-title'>Valuta di Mercato</div>", unsafe_allow_html=True)
-                if st.session_state.distribuzione_valuta_mercato:
-                    df_dist_valuta = pd.DataFrame(st.session_state.distribuzione_valuta_mercato)
-                    if not df_dist_valuta.empty:
-                        fig3 = go.Figure(data=[go.Pie(
-                            labels=df_dist_valuta['valuta_mercato'],
-                            values=df_dist_valuta['distribuzione_pct'],
-                            textinfo='label+percent',  # cosa mostrare
-                            textposition='auto',     # fuori dalla fetta
-                            textfont=dict(size=12),     # grandezza testo
-                            hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
-                        )])
-                        fig3.update_layout(
-                            title="",
-                            height=400,
-                            showlegend=True,
-                            margin=dict(t=10, b=10)
-                        )
-                        st.plotly_chart(fig3, width="stretch")
-            
-            with col4:
-                st.markdown("<div class='subsection-title'>Area Geografica</div>", unsafe_allow_html=True)
-                if st.session_state.distribuzione_area_geografica:
-                    df_dist_area = pd.DataFrame(st.session_state.distribuzione_area_geografica)
-                    if not df_dist_area.empty:
-                        fig4 = go.Figure(data=[go.Pie(
-                            labels=df_dist_area['area_geografica'],
-                            values=df_dist_area['distribuzione_pct'],
-                            textinfo='label+percent',  # cosa mostrare
-                            textposition='auto',     # fuori dalla fetta
-                            textfont=dict(size=12),     # grandezza testo
-                            hovertemplate="<b>%{label}</b><br>%{value:.1f}%<extra></extra>"
-                        )])
-                        fig4.update_layout(
-                            title="",
-                            height=400,
-                            showlegend=True,
-                            margin=dict(t=10, b=10)
-                        )
-                        st.plotly_chart(fig4, width="stretch")
-            
-            # Grafico a barre: Confronto Costo vs Market Value
-            st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
-            st.markdown("<div class='section-title'>📊 Confronto Costo vs Market Value per ETF</div>", unsafe_allow_html=True)
-            
-            if st.session_state.kpi_etf:
-                df_kpi_chart = pd.DataFrame(st.session_state.kpi_etf)
-                if not df_kpi_chart.empty and 'ticker' in df_kpi_chart.columns and 'costo_investito_eur' in df_kpi_chart.columns and 'market_value_attuale' in df_kpi_chart.columns:
-                    df_chart_bars = df_kpi_chart[['ticker', 'costo_investito_eur', 'market_value_attuale']].copy()
-                    df_chart_bars = (
-                        df_chart_bars
-                        .set_index("ticker")
-                        .filter(regex=r"^(?!M\.).*", axis=0)
-                        .reset_index()
-                    )
-                    
-                    fig_bars = go.Figure(
-                        data=[
-                            go.Bar(x=df_chart_bars['ticker'], y=df_chart_bars['costo_investito_eur'], 
-                                name='Costo Investito (EUR)', marker_color='red'),
-                            go.Bar(x=df_chart_bars['ticker'], y=df_chart_bars['market_value_attuale'], 
-                                name='Market Value Attuale', marker_color='green')
-                        ]
-                    )
-                    fig_bars.update_layout(barmode='group', height=400)
-                    st.plotly_chart(fig_bars, width="stretch")
-        
+        if tab2.open:
+            with tab2:
+                render_analisi()
         # ===== TAB 4: IMPOSTAZIONI =====
-        with tab4:
-            from views.impostazioni import render_impostazioni
-            render_impostazioni()
+        if tab4.open:
+            with tab4:
+                render_tab_impostazioni()
         # ==== TAB METRICHE ====
-        with tab5:
-            from views.metriche import render_metriche
-            render_metriche()
+        if tab5.open:
+            with tab5:
+                render_tab_metriche()
         # ==== TAB INSERISCI TRANSAZIONE ====
-        with tab6:
-            from views.gestione_eft import render_gestione_etf
-            render_gestione_etf()
+        if tab6.open:
+            with tab6:
+                render_tab_gestione_etf()
         # ==== TAB RENDIMENTO ANNUO ====
-        with tab7:
-            from views.rendimento_annuo import render_rendimento_annuo
-            render_rendimento_annuo()
+        if tab7.open:
+            with tab7:
+                render_tab_rendimento_annuo()
     
     else:
         # Sezione quando non ci sono transazioni
@@ -3,7 +3,7 @@ from metrics import calculate_metrics
 import pandas as pd
 from datetime import datetime
 from data_manager import save_etf_data, load_etf_data
-from config import INTERMEDIARI
+from config import INTERMEDIARI, VALUTE_SUPPORTATE
 import uuid
 
 # Sezione Gestione ETF
@@ -23,7 +23,7 @@ def render_gestione_etf():
             data_acquisto = st.date_input("Data di acquisto*", value=datetime.now())
             prezzo_corrente = st.number_input("Prezzo corrente*", min_value=0.0, format="%.4f", value=0.0, help="Prezzo corrente per quota")
             descrizione = st.text_area("Descrizione dell'etf", max_chars=200, help="Eventuali note aggiuntive sull'ETF")
-            divisa = st.selectbox("Divisa*", options=["EUR", "USD"] , index=0, help="Divisa di acquisto dell'ETF")
+            divisa = st.selectbox("Divisa*", options=VALUTE_SUPPORTATE, index=0, help="Divisa di acquisto dell'ETF")
         
         col_b1, col_b2, col_b3 = st.columns([1, 2, 1])
         with col_b2:
@@ -33,6 +33,19 @@ def render_gestione_etf():
             if not all([ticker, quantita > 0, prezzo_acquisto > 0, prezzo_corrente >= 0]):
                 st.error("❌ Compila tutti i campi obbligatori (*) con valori validi")
             else:
+                # Gli acquisti in valuta estera vengono convertiti al cambio del giorno
+                importo = -float(quantita * prezzo_acquisto)
+                importo_euro = importo
+                if divisa != "EUR":
+                    from finance_info import amounts_to_base, missing_fx_rates
+                    importo_euro = float(amounts_to_base([importo], [data_acquisto], [divisa])[0])
+                    if pd.isna(importo_euro):
+                        if missing_fx_rates([divisa]):
+                            st.warning(f"⚠️ Cambi {divisa} non ancora scaricati (job \"fx\" dello scheduler), importo in euro non calcolato")
+                        else:
+                            st.warning(f"⚠️ Cambio {divisa} non disponibile per la data indicata, importo in euro non calcolato")
+                        importo_euro = None
+                
                 # MAPPING DAI CAMPI FORM ALLA TABELLA TRANSACTION
                 transazione_db = {
                     "data_operazione": data_acquisto.strftime("%Y-%m-%d"),
@@ -40,7 +53,8 @@ def render_gestione_etf():
                     "tipo_operazione": "Acquisto",
                     "data_valuta": data_acquisto.strftime("%Y-%m-%d"),
                     "descrizione": descrizione,
-                    "importo_euro": -float(quantita * prezzo_acquisto),
+                    "importo_euro": importo_euro,
+                    "importo_divisa": importo if divisa != "EUR" else 0,
                     "quantita": float(quantita),
                     "isin": isin.upper(),
                     "divisa": divisa,
@@ -60,16 +60,21 @@ def render_impostazioni():
                 try:
                     from database import insert_holdings  # Importa la funzione dal modulo database
                     
-                    df_details = pd.read_csv(uploaded_etf_details, sep=';',skiprows=7, encoding='latin-1')
+                    from data_manager import read_holdings_csv
+                    
+                    df_details = read_holdings_csv(uploaded_etf_details)
                     # Salva i dettagli caricati nello stato della sessione
                     st.session_state.etf_details = df_details
                     
                     etf_name = uploaded_etf_details.name.split('.')[0] # Nome etf preso dal nome del file
                     
                     with st.spinner("⏳ Caricamento dati in corso..."):
-                        insert_holdings(etf_name, df_details.to_dict('records'))
+                        esito = insert_holdings(etf_name, df_details.to_dict('records'))
                             
-                    st.success(f"✅ File caricato: {uploaded_etf_details.name}")
+                    st.success(
+                        f"✅ File caricato: {uploaded_etf_details.name} "
+                        f"({esito['inserted']} holding inserite, {esito['removed']} precedenti rimosse)"
+                    )
                     st.write("**Anteprima dati:**")
                     st.dataframe(df_details.head(), width='stretch')
                 except Exception as e:
@@ -1,62 +1,257 @@
 import streamlit as st
-import plotly.graph_objects as go
-# Sezione Metriche (placeholder)
+import pandas as pd
+# Sezione Metriche
 def render_metriche():
+    import plotly.graph_objects as go
+    
     st.header("📐 Metriche Avanzate")
+    from scheduler import load_state, run_job, JobAlreadyRunning
+    
     if st.button("🔄 Aggiorna Storico", use_container_width=True):
-        from finance_info import get_all_etf_history
-        from database import get_etf_list
-        
-        etf_list = get_etf_list()
-        for etf in etf_list:
-            get_all_etf_history(str(etf['etf_ticker']))
-        st.success("✅ Storico aggiornato per tutti gli ETF")
+        try:
+            stato = run_job("history")
+        except JobAlreadyRunning:
+            st.info("⏳ Aggiornamento storico già in corso, riprova tra poco")
+        else:
+            if stato["status"] == "ok":
+                st.success("✅ Storico aggiornato per tutti gli ETF")
+            else:
+                st.error(f"❌ Aggiornamento storico fallito: {stato['error']}")
+    ultimo_storico = load_state().get("history", {}).get("last_success")
+    st.caption(f"Ultimo aggiornamento storico: {ultimo_storico or 'mai'}")
 
     
-    from finance_info import calculate_CAGR
+    from finance_info import calculate_CAGR, calculate_xirr
     cagr = calculate_CAGR()  # Placeholder values
-    st.metric("CAGR", f"{cagr:.2f}%")
-        
-    with st.container():
-        st.info("🚧 Sezione in costruzione - Disponibile nella prossima versione")
-        
-        col1, col2 = st.columns(2)
+    xirr = calculate_xirr()
+    col_m1, col_m2 = st.columns(2)
+    with col_m1:
+        st.metric("CAGR", f"{cagr:.2f}%")
+    with col_m2:
+        xirr_portafoglio = xirr.get("Portafoglio")
+        st.metric("XIRR (money-weighted)", f"{xirr_portafoglio:.2f}%" if pd.notna(xirr_portafoglio) else "N/D")
+    
+    # ===== Correlazione di portafoglio =====
+    st.subheader("🔗 Correlazione Portafoglio")
+    col_c1, col_c2 = st.columns([1, 3])
+    with col_c1:
+        periodo = st.selectbox("Periodo", ["1y", "3y", "5y", "10y", "max"], index=2, key="correlazione_periodo")
+        shrinkage = st.checkbox("Shrinkage Ledoit-Wolf", value=False, key="correlazione_shrinkage")
+    with col_c2:
+        from finance_info import get_portfolio_correlation, period_start
+        from database import get_etf_list
         
-        with col1:
-            st.subheader("📈 Metriche Pianificate")
-            st.markdown("""
-            - **Sharpe Ratio**: Misura del rendimento corretto per il rischio
-            - **Sortino Ratio**: Focalizzato sulla volatilità al ribasso
-            - **Beta vs Benchmark**: Sensibilità al mercato
-            - **Alpha**: Rendimento aggiuntivo vs benchmark
-            - **R²**: Bontà della correlazione con benchmark
-            """)
-            
-            # Simulazione placeholder
-            st.subheader("📊 Simulazione Metrica")
-            sharpe_sim = st.slider("Sharpe Ratio simulato", -2.0, 5.0, 1.5, 0.1)
-            st.metric("Sharpe Ratio", f"{sharpe_sim:.2f}", 
-                     "Buono" if sharpe_sim > 1.0 else "Da migliorare")
+        tickers = [str(etf['etf_ticker']) for etf in get_etf_list()]
+        start = period_start(periodo)
+        df_corr = get_portfolio_correlation(
+            tickers,
+            start=start.strftime("%Y-%m-%d") if start is not None else None,
+            shrinkage="auto" if shrinkage else 0.0
+        )
+        if df_corr.empty:
+            st.info("Nessuno storico disponibile: usa \"Aggiorna Storico\"")
+        else:
+            fig_corr = go.Figure(data=go.Heatmap(
+                z=df_corr.values,
+                x=df_corr.columns,
+                y=df_corr.index,
+                zmin=-1,
+                zmax=1,
+                colorscale="RdBu",
+                reversescale=True,
+                text=df_corr.round(2).values,
+                texttemplate="%{text}",
+                hovertemplate="<b>%{y} / %{x}</b><br>%{z:.2f}<extra></extra>"
+            ))
+            fig_corr.update_layout(height=450, margin=dict(t=10, b=10))
+            st.plotly_chart(fig_corr, width='stretch')
+
+    # ===== Total return e distribuzioni =====
+    st.subheader("💶 Total Return e Distribuzioni")
+    col_d1, col_d2 = st.columns(2)
+    with col_d1:
+        from finance_info import get_total_return_index
+
+        periodo_tr = st.selectbox("Periodo", ["1y", "3y", "5y", "10y", "max"], index=2, key="total_return_periodo")
+        start_tr = period_start(periodo_tr)
+        df_tr = get_total_return_index(
+            tickers,
+            start=start_tr.strftime("%Y-%m-%d") if start_tr is not None else None
+        )
+        if df_tr.empty:
+            st.info("Nessuno storico disponibile: usa \"Aggiorna Storico\"")
+        else:
+            fig_tr = go.Figure()
+            for ticker in df_tr.columns:
+                fig_tr.add_trace(go.Scatter(x=df_tr.index, y=df_tr[ticker], mode='lines', name=ticker))
+            fig_tr.update_layout(height=400, yaxis_title="Indice (base 100)", margin=dict(t=10, b=10))
+            st.plotly_chart(fig_tr, width='stretch')
+    with col_d2:
+        from finance_info import get_distribution_income
+
+        frequenza = st.radio("Distribuzioni", ["Annuali", "Mensili"], horizontal=True, key="distribuzioni_frequenza")
+        df_income = get_distribution_income("Y" if frequenza == "Annuali" else "M")
+        if df_income.empty or not df_income["Totale"].any():
+            st.info("Nessuna distribuzione incassata")
+        else:
+            etichette = df_income.index.strftime("%Y" if frequenza == "Annuali" else "%Y-%m")
+            fig_income = go.Figure()
+            for ticker in df_income.columns.drop("Totale"):
+                if df_income[ticker].any():
+                    fig_income.add_trace(go.Bar(x=etichette, y=df_income[ticker], name=ticker))
+            fig_income.update_layout(barmode='stack', height=400, yaxis_title="€", margin=dict(t=10, b=10))
+            st.plotly_chart(fig_income, width='stretch')
+            st.metric("Totale distribuzioni incassate", f"€{df_income['Totale'].sum():,.2f}")
+
+    # ===== Metriche di rischio =====
+    st.subheader("⚖️ Metriche di Rischio")
+    finestre = {"Dall'inizio": None, "3 mesi": 63, "1 anno": 252, "3 anni": 756}
+    col_r1, col_r2 = st.columns(2)
+    with col_r1:
+        periodo_rischio = st.selectbox("Periodo", ["1y", "3y", "5y", "10y", "max"], index=4, key="rischio_periodo")
+    with col_r2:
+        finestra = st.selectbox("Finestra", list(finestre), index=2, key="rischio_finestra")
+    from finance_info import get_risk_metrics
+    
+    start_rischio = period_start(periodo_rischio)
+    df_rischio = get_risk_metrics(
+        tickers,
+        start=start_rischio.strftime("%Y-%m-%d") if start_rischio is not None else None,
+        window=finestre[finestra]
+    )
+    if df_rischio.empty:
+        st.info("Nessuno storico disponibile: usa \"Aggiorna Storico\"")
+    else:
+        ultimi = df_rischio.ffill().iloc[-1].unstack("metric")
+        portafoglio = ultimi.loc["Portafoglio"]
+        col_k1, col_k2, col_k3, col_k4 = st.columns(4)
+        with col_k1:
+            st.metric("Sharpe Ratio", f"{portafoglio['sharpe']:.2f}" if pd.notna(portafoglio['sharpe']) else "N/D")
+        with col_k2:
+            st.metric("Sortino Ratio", f"{portafoglio['sortino']:.2f}" if pd.notna(portafoglio['sortino']) else "N/D")
+        with col_k3:
+            st.metric("Volatilità Annua", f"{portafoglio['volatility'] * 100:.1f}%" if pd.notna(portafoglio['volatility']) else "N/D")
+        with col_k4:
+            st.metric("Drawdown Attuale", f"{portafoglio['drawdown'] * 100:.1f}%" if pd.notna(portafoglio['drawdown']) else "N/D")
         
-        with col2:
-            st.subheader("📉 Analisi di Rischio")
-            st.markdown("""
-            - **Value at Risk (VaR)**: Perdita massima attesa
-            - **Maximum Drawdown**: Massimo calo storico
-            - **Volatilità Annualizzata**: Rischi di prezzo
-            - **Correlazione Portafoglio**: Diversificazione
-            - **Stress Test**: Performance in scenari critici
-            """)
-            
-            # Grafico placeholder
-            st.subheader("📈 Andamento Rischio/Rendimento")
-            fig = go.Figure()
+        col_g1, col_g2 = st.columns(2)
+        with col_g1:
+            sharpe_mobile = df_rischio["sharpe"].dropna(how="all")
+            fig_sharpe = go.Figure()
+            for ticker in sharpe_mobile.columns:
+                fig_sharpe.add_trace(go.Scatter(
+                    x=sharpe_mobile.index, y=sharpe_mobile[ticker], mode='lines', name=ticker,
+                    line=dict(width=3) if ticker == "Portafoglio" else dict(width=1)
+                ))
+            fig_sharpe.update_layout(height=350, title=f"Sharpe Ratio ({finestra.lower()})", margin=dict(t=40, b=10))
+            st.plotly_chart(fig_sharpe, width='stretch')
+        with col_g2:
+            tabella = pd.DataFrame({
+                "Sharpe": ultimi["sharpe"].round(2),
+                "Sortino": ultimi["sortino"].round(2),
+                "Volatilità %": (ultimi["volatility"] * 100).round(1),
+                "Drawdown %": (ultimi["drawdown"] * 100).round(1),
+            })
+            st.dataframe(tabella, width='stretch')
+
+    # ===== Beta, Alpha e R² =====
+    st.subheader("📏 Beta, Alpha e R² vs Benchmark")
+    from config import BENCHMARKS
+    from finance_info import get_benchmark_stats
+
+    col_b1, col_b2 = st.columns(2)
+    with col_b1:
+        nome_benchmark = st.selectbox("Benchmark", list(BENCHMARKS), key="regressione_benchmark")
+    with col_b2:
+        finestra_beta = st.selectbox("Beta mobile", ["3 mesi", "1 anno", "3 anni"], index=1, key="regressione_finestra")
+    df_beta = get_benchmark_stats(tickers, BENCHMARKS[nome_benchmark], start=start_rischio.strftime("%Y-%m-%d")
+                                  if start_rischio is not None else None)
+    if df_beta["beta"].isna().all():
+        st.info("Storico insufficiente per la regressione sul benchmark")
+    else:
+        col_t1, col_t2 = st.columns([2, 3])
+        with col_t1:
+            st.dataframe(pd.DataFrame({
+                "Beta": df_beta["beta"].round(2),
+                "Alpha %": (df_beta["alpha"] * 100).round(2),
+                "R²": df_beta["r2"].round(2),
+            }), width='stretch')
+        with col_t2:
+            df_beta_mobile = get_benchmark_stats(
+                tickers, BENCHMARKS[nome_benchmark],
+                start=start_rischio.strftime("%Y-%m-%d") if start_rischio is not None else None,
+                window=finestre[finestra_beta]
+            )["beta"].dropna(how="all")
+            fig_beta = go.Figure()
+            for ticker in df_beta_mobile.columns:
+                fig_beta.add_trace(go.Scatter(
+                    x=df_beta_mobile.index, y=df_beta_mobile[ticker], mode='lines', name=ticker,
+                    line=dict(width=3) if ticker == "Portafoglio" else dict(width=1)
+                ))
+            fig_beta.update_layout(height=350, title=f"Beta mobile ({finestra_beta})", margin=dict(t=40, b=10))
+            st.plotly_chart(fig_beta, width='stretch')
+
+    # ===== Value at Risk =====
+    st.subheader("🛡️ Value at Risk")
+    col_v1, col_v2 = st.columns(2)
+    with col_v1:
+        orizzonte = st.selectbox("Orizzonte (giorni)", [1, 5, 10, 20], index=0, key="var_orizzonte")
+    with col_v2:
+        periodo_var = st.selectbox("Periodo di stima", ["1y", "3y", "5y", "10y"], index=1, key="var_periodo")
+    from finance_info import get_portfolio_var
+
+    df_var = get_portfolio_var(confidences=(0.95, 0.99), horizon=orizzonte, period=periodo_var)
+    if df_var["var"].isna().all():
+        st.info("Storico insufficiente per stimare il VaR delle posizioni attuali")
+    else:
+        metodi = {"storico": "Storico", "parametrico": "Parametrico", "monte_carlo": "Monte Carlo"}
+        col_var = st.columns(3)
+        for colonna, (metodo, nome) in zip(col_var, metodi.items()):
+            with colonna:
+                st.metric(f"VaR 95% - {nome}", f"€{df_var.loc[(metodo, 0.95), 'var']:,.0f}",
+                          f"CVaR €{df_var.loc[(metodo, 0.95), 'cvar']:,.0f}", delta_color="off")
+        tabella_var = df_var.reset_index()
+        st.dataframe(pd.DataFrame({
+            "Metodo": tabella_var["method"].map(metodi),
+            "Confidenza": (tabella_var["confidence"] * 100).map("{:.0f}%".format),
+            "VaR €": tabella_var["var"].round(2),
+            "CVaR €": tabella_var["cvar"].round(2),
+        }), hide_index=True, width='stretch')
+
+    # ===== Frontiera efficiente =====
+    st.subheader("🎯 Frontiera Efficiente")
+    col_f1, col_f2 = st.columns(2)
+    with col_f1:
+        periodo_frontiera = st.selectbox("Periodo di stima", ["1y", "3y", "5y", "10y"], index=2, key="frontiera_periodo")
+    with col_f2:
+        peso_massimo = st.slider("Peso massimo per ETF", 0.1, 1.0, 1.0, 0.05, key="frontiera_peso_massimo")
+    from finance_info import get_efficient_frontier
+
+    df_frontiera, punto_portafoglio = get_efficient_frontier(tickers, period=periodo_frontiera, max_weight=peso_massimo)
+    if df_frontiera.empty:
+        st.info("Storico insufficiente per calcolare la frontiera efficiente")
+    else:
+        pesi_frontiera = df_frontiera.drop(columns=["return", "volatility", "aversion"])
+        composizione = pesi_frontiera.apply(
+            lambda pesi: "<br>".join(f"{ticker}: {peso:.0%}" for ticker, peso in pesi[pesi > 0.005].items()), axis=1
+        )
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df_frontiera["volatility"] * 100,
+            y=df_frontiera["return"] * 100,
+            mode='lines+markers',
+            name='Frontiera',
+            text=composizione,
+            hovertemplate="Volatilità %{x:.1f}%<br>Rendimento %{y:.1f}%<br>%{text}<extra></extra>"
+        ))
+        if punto_portafoglio is not None:
             fig.add_trace(go.Scatter(
-                x=[0.1, 0.2, 0.3, 0.4, 0.5],
-                y=[0.05, 0.08, 0.12, 0.15, 0.18],
-                mode='lines+markers',
-                name='Portafoglio'
+                x=[punto_portafoglio["volatility"] * 100],
+                y=[punto_portafoglio["return"] * 100],
+                mode='markers',
+                marker=dict(size=14, symbol='star'),
+                name='Portafoglio attuale'
             ))
-            fig.update_layout(height=300, title="Frontiera Efficiente")
-            st.plotly_chart(fig, width='stretch')
-
+        fig.update_layout(height=450, xaxis_title="Volatilità annua %", yaxis_title="Rendimento atteso annuo %",
+                          margin=dict(t=10, b=10))
+        st.plotly_chart(fig, width='stretch')
@@ -1,21 +1,29 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 
-# Sezione Rendimento Annuo (placeholder)
+# Sezione Rendimento Annuo
 def render_rendimento_annuo():
+    import plotly.graph_objects as go
+    
     st.header("📅 Rendimento Annuo")
     
+    from config import BENCHMARKS
+    from finance_info import calculate_twr, get_benchmark_returns, get_portfolio_valuation
+    
     with st.container():
-        st.info("🚧 Sezione in costruzione - Disponibile nella prossima versione")
-        
-        # Placeholder per performance annuali
         st.subheader("📊 Performance Annuali")
+        nome_benchmark = st.selectbox("Benchmark", list(BENCHMARKS), key="rendimento_benchmark")
         
-        # Dati mock per gli anni
-        anni = ['2020', '2021', '2022', '2023', '2024']
-        rendimenti = [12.5, 8.2, -5.3, 15.7, 10.2]
-        benchmark = [10.1, 7.8, -3.2, 14.3, 9.5]
+        # TWR annuale del portafoglio e rendimento total return del benchmark
+        rendimenti = calculate_twr("Y")
+        rendimenti.index = rendimenti.index.year
+        benchmark = get_benchmark_returns(BENCHMARKS[nome_benchmark], "Y") * 100
+        benchmark.index = benchmark.index.year
+        benchmark = benchmark.reindex(rendimenti.index)
+        anni = [str(anno) for anno in rendimenti.index]
+        
+        if rendimenti.empty:
+            st.info("Nessuna valorizzazione disponibile: usa \"Aggiorna Storico\" nella sezione Metriche")
         
         col1, col2 = st.columns(2)
         
@@ -24,18 +32,18 @@ def render_rendimento_annuo():
             st.subheader("📋 Dettaglio Annuale")
             df_performance = pd.DataFrame({
                 'Anno': anni,
-                'Rendimento %': rendimenti,
-                'Benchmark %': benchmark,
-                'Outperformance': [r - b for r, b in zip(rendimenti, benchmark)]
+                'Rendimento %': rendimenti.round(2).to_numpy(),
+                'Benchmark %': benchmark.round(2).to_numpy(),
+                'Outperformance': (rendimenti - benchmark).round(2).to_numpy()
             })
-            st.dataframe(df_performance, width='stretch')
+            st.dataframe(df_performance, width='stretch', hide_index=True)
         
         with col2:
             # Grafico a barre
             st.subheader("📈 Confronto Annuale")
             fig = go.Figure(data=[
-                go.Bar(name='Portafoglio', x=anni, y=rendimenti),
-                go.Bar(name='Benchmark', x=anni, y=benchmark)
+                go.Bar(name='Portafoglio', x=anni, y=rendimenti.to_numpy()),
+                go.Bar(name=nome_benchmark, x=anni, y=benchmark.to_numpy())
             ])
             fig.update_layout(
                 barmode='group',
@@ -50,10 +58,50 @@ def render_rendimento_annuo():
         col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
         
         with col_stat1:
-            st.metric("Rendimento Medio", "8.3%", "2.1% vs benchmark")
+            if rendimenti.empty:
+                st.metric("Rendimento Medio", "N/D")
+            else:
+                differenza = rendimenti.mean() - benchmark.mean()
+                st.metric("Rendimento Medio", f"{rendimenti.mean():.1f}%",
+                          f"{differenza:+.1f}% vs benchmark" if pd.notna(differenza) else None)
         with col_stat2:
-            st.metric("Volatilità", "12.7%", "±0.5%")
+            rendimenti_giornalieri = get_portfolio_valuation().returns
+            volatilita = rendimenti_giornalieri.std() * 252 ** 0.5 * 100
+            st.metric("Volatilità", f"{volatilita:.1f}%" if pd.notna(volatilita) else "N/D")
         with col_stat3:
-            st.metric("Anni Positivi", "4/5", "80%")
+            positivi = int((rendimenti > 0).sum())
+            st.metric("Anni Positivi", f"{positivi}/{len(rendimenti)}",
+                      f"{positivi / len(rendimenti) * 100:.0f}%" if len(rendimenti) else None, delta_color="off")
         with col_stat4:
-            st.metric("Max Drawdown", "-8.2%", "2022")
+            from finance_info import get_drawdowns
+            from database import get_etf_list
+            
+            episodi, underwater = get_drawdowns([str(etf['etf_ticker']) for etf in get_etf_list()])
+            episodi_portafoglio = episodi[episodi["ticker"] == "Portafoglio"]
+            if episodi_portafoglio.empty:
+                st.metric("Max Drawdown", "N/D")
+            else:
+                peggiore = episodi_portafoglio.loc[episodi_portafoglio["depth"].idxmin()]
+                st.metric("Max Drawdown", f"{peggiore['depth'] * 100:.1f}%", str(peggiore["trough"].year),
+                          delta_color="off")
+        
+        # Drawdown del portafoglio
+        st.subheader("📉 Drawdown")
+        if "Portafoglio" in underwater.columns and underwater["Portafoglio"].notna().any():
+            col_dd1, col_dd2 = st.columns([3, 2])
+            with col_dd1:
+                curva = underwater["Portafoglio"].dropna() * 100
+                fig_dd = go.Figure(go.Scatter(x=curva.index, y=curva, fill='tozeroy', mode='lines', name='Portafoglio'))
+                fig_dd.update_layout(height=350, yaxis_title="Drawdown %", margin=dict(t=10, b=10))
+                st.plotly_chart(fig_dd, width='stretch')
+            with col_dd2:
+                principali = episodi_portafoglio.nsmallest(5, "depth")
+                st.dataframe(pd.DataFrame({
+                    "Massimo": principali["peak"].dt.strftime("%d/%m/%Y"),
+                    "Minimo": principali["trough"].dt.strftime("%d/%m/%Y"),
+                    "Recupero": principali["recovery"].dt.strftime("%d/%m/%Y").fillna("In corso"),
+                    "Profondità %": (principali["depth"] * 100).round(1),
+                    "Durata (gg)": principali["duration"],
+                }), hide_index=True, width='stretch')
+        else:
+            st.info("Nessuno storico disponibile per il calcolo del drawdown")
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 # Sezione Simula ETF (placeholder)
 def render_simula_etf():
+    import plotly.graph_objects as go
+    
     st.header("🔮 Simula ETF")
     
     with st.container():